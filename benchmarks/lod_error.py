@@ -0,0 +1,81 @@
+'''
+Reports the points per shot and the maximum geometric error of level of detail shot paths,
+against the 100 coordinate reference paths, for the sample game and for every made shot on the integer grid.
+
+    python -m benchmarks.lod_error
+'''
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils.basketballShot import BasketballShot, NUM_COORDINATES
+from utils.dataSource import LocalDataSource
+
+def get_grid_shots():
+    '''
+    One made shot per team from every integer coordinate of the half court
+    '''
+    grid_x, grid_y, team = np.meshgrid(np.arange(0, 51), np.arange(-4, 48), ['home', 'away'], indexing='ij')
+
+    return pd.DataFrame({
+        'COORDINATE_X': grid_x.ravel().astype(float),
+        'COORDINATE_Y': grid_y.ravel().astype(float),
+        'SCORING_PLAY': True,
+        'SCORING_TEAM': team.ravel()
+    })
+
+def interpolate_rows(values, num_coordinates, t):
+    '''
+    Evaluates each row's polyline of num_coordinates equal steps at the path parameters t (0 to 1)
+    '''
+    segment = np.minimum(np.floor(t * num_coordinates[:, None]), num_coordinates[:, None] - 1).astype(int)
+    fraction = t * num_coordinates[:, None] - segment
+    rows = np.arange(len(values))[:, None]
+
+    return values[rows, segment] * (1 - fraction) + values[rows, segment + 1] * fraction
+
+def measure_lod(shots_df, **lod_options):
+    '''
+    Compares the level of detail paths of the made shots in shots_df to their reference paths
+    '''
+    shot_start_x = shots_df['COORDINATE_X'].to_numpy()
+    shot_start_y = shots_df['COORDINATE_Y'].to_numpy()
+    shot_made = shots_df['SCORING_PLAY'].to_numpy()
+    team = shots_df['SCORING_TEAM'].to_numpy()
+
+    reference = BasketballShot.calculate_batch_paths(shot_start_x, shot_start_y, shot_made, team)
+    has_path = reference[3]
+    num_coordinates = BasketballShot.calculate_lod_num_coordinates(shot_start_x, shot_start_y, shot_made, team, **lod_options)
+    lod = BasketballShot.calculate_batch_paths(shot_start_x, shot_start_y, shot_made, team, num_coordinates=num_coordinates)
+
+    t = np.linspace(0, 1, NUM_COORDINATES + 1)
+    squared_error = sum(
+        np.square(interpolate_rows(lod_values[has_path], num_coordinates[has_path], t) - reference_values[has_path])
+        for lod_values, reference_values in zip(lod[:3], reference[:3])
+    )
+
+    made_points = num_coordinates[has_path] + 1
+    return {
+        **lod_options,
+        'made_shots': int(has_path.sum()),
+        'reference_points_per_shot': NUM_COORDINATES + 1,
+        'points_per_shot': float(made_points.mean()),
+        'min_points_per_shot': int(made_points.min()),
+        'max_points_per_shot': int(made_points.max()),
+        'point_reduction': float((NUM_COORDINATES + 1) / made_points.mean()),
+        'max_error_feet': float(np.sqrt(squared_error.max()))
+    }
+
+def main():
+    sample_shots_df = LocalDataSource().read_shots()
+    grid_shots_df = get_grid_shots()
+
+    for name, shots_df in [('sample', sample_shots_df), ('grid', grid_shots_df)]:
+        # a budget of 15 points per made shot, plus the single start point of every other shot
+        point_budget = int(shots_df['SCORING_PLAY'].sum()) * 15 + int((~shots_df['SCORING_PLAY']).sum())
+        for lod_options in [{'tolerance': 0.01}, {'tolerance': 0.05}, {'tolerance': 0.1}, {'point_budget': point_budget}]:
+            print(json.dumps({'shots': name, **measure_lod(shots_df, **lod_options)}))
+
+if __name__ == '__main__':
+    main()
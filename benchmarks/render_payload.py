@@ -0,0 +1,50 @@
+'''
+Compares the shot chart's JSON payload size and build/serialization time between the
+trace per shot (before) and the single trace (after) rendering modes, for every game in the local sample data.
+Prints one line per game and mode, then the total payload of each mode and how much smaller the single trace one is.
+
+    python -m benchmarks.render_payload
+'''
+import json
+
+from utils.courtCoordinates import CourtCoordinates
+from utils.dataSource import LocalDataSource
+from utils.shotFigure import build_shot_chart, build_shot_chart_per_shot_traces, measure_figure
+from utils.trajectoryTable import get_trajectory_table
+
+RENDER_MODES = {
+    'trace_per_shot': build_shot_chart_per_shot_traces,
+    'single_trace': build_shot_chart
+}
+
+def main():
+    data_source = LocalDataSource()
+    schedule_df = data_source.get_schedule()
+    court_lines_df = CourtCoordinates().get_court_lines()
+    table = get_trajectory_table()
+
+    results = []
+    for game in schedule_df.itertuples():
+        game_shots_df = data_source.get_game_shots(game.GAME_ID)
+        if game_shots_df.empty:
+            continue
+
+        game_coords_df = table.get_paths(game_shots_df)
+        color_mapping = {'home': game.HOME_COLOR, 'away': game.AWAY_COLOR}
+
+        for render_mode, build_figure in RENDER_MODES.items():
+            _, measurements = measure_figure(build_figure, court_lines_df, game_coords_df, color_mapping)
+            results.append({'game_id': int(game.GAME_ID), 'shots': len(game_shots_df), 'render_mode': render_mode, **measurements})
+
+    for result in results:
+        print(json.dumps(result))
+
+    totals = {render_mode: sum(result['payload_bytes'] for result in results if result['render_mode'] == render_mode) for render_mode in RENDER_MODES}
+    print(json.dumps({
+        'before_payload_bytes': totals['trace_per_shot'],
+        'after_payload_bytes': totals['single_trace'],
+        'reduction': round(totals['trace_per_shot'] / totals['single_trace'], 2) if totals['single_trace'] else None
+    }))
+
+if __name__ == '__main__':
+    main()
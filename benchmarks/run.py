@@ -0,0 +1,204 @@
+'''
+Times every stage of the rows to figure pipeline on the sample game and on synthetic games,
+and writes the results to a JSON file so runs on different commits can be compared. Runs offline.
+
+    python -m benchmarks.run --datasets sample game tournament --output benchmarks/results/run.json
+    python -m benchmarks.run --compare benchmarks/results/before.json benchmarks/results/after.json
+'''
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import plotly
+
+from benchmarks.synthetic import SIZES, load_dataset
+from utils.basketballShot import BasketballShot
+from utils.courtCoordinates import CourtCoordinates
+from utils.shotFigure import build_animated_shot_chart, build_shot_chart, build_shot_chart_per_shot_traces
+from utils.shotPhysics import PhysicsShotModel
+from utils.trajectoryTable import get_trajectory_table
+
+COLOR_MAPPING = {'home': '#0022B4', 'away': '#99bfe5'}
+
+def time_stage(function, repeat=1):
+    '''
+    Runs function repeat times, returns its last result and the fastest run in seconds
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+
+    return result, best
+
+def per_shot_paths(shots_df):
+    '''
+    The original pipeline, one BasketballShot per row
+    '''
+    return [
+        BasketballShot(
+            shot_start_x=row.COORDINATE_X,
+            shot_start_y=row.COORDINATE_Y,
+            shot_id=row.SEQUENCE_NUMBER,
+            play_description=row.TEXT,
+            shot_made=row.SCORING_PLAY,
+            team=row.SCORING_TEAM
+        ).get_shot_path_coordinates()
+        for row in shots_df.itertuples()
+    ]
+
+def concat_incrementally(shot_dfs):
+    '''
+    The original pipeline's concat step, growing the frame one shot at a time
+    '''
+    game_coords_df = pd.DataFrame()
+    for shot_df in shot_dfs:
+        game_coords_df = pd.concat([game_coords_df, shot_df])
+
+    return game_coords_df
+
+def run_dataset(name, shots_df, repeat=3, max_loop_shots=2000, max_figure_games=10):
+    '''
+    Times every stage on one dataset, returns a list of result records
+    '''
+    results = []
+    num_shots = len(shots_df)
+
+    def record(stage, seconds, **measurements):
+        results.append({'dataset': name, 'stage': stage, 'shots': num_shots, 'seconds': seconds, **measurements})
+
+    # the per row loop is only timed on a slice, and extrapolated to the whole dataset
+    loop_shots_df = shots_df.head(max_loop_shots)
+    shot_dfs, seconds = time_stage(lambda: per_shot_paths(loop_shots_df))
+    per_shot_seconds = seconds / max(len(loop_shots_df), 1)
+    record('per_shot_paths', seconds, timed_shots=len(loop_shots_df), seconds_per_shot=per_shot_seconds,
+           extrapolated_seconds=per_shot_seconds * num_shots)
+
+    _, seconds = time_stage(lambda: concat_incrementally(shot_dfs))
+    record('concat_incremental', seconds, timed_shots=len(shot_dfs))
+    _, seconds = time_stage(lambda: pd.concat(shot_dfs), repeat)
+    record('concat_once', seconds, timed_shots=len(shot_dfs))
+
+    shot_paths_df, seconds = time_stage(lambda: BasketballShot.batch_paths(shots_df), repeat)
+    record('batch_paths', seconds, points=len(shot_paths_df), seconds_per_shot=seconds / max(num_shots, 1))
+
+    shot_paths, seconds = time_stage(lambda: BasketballShot.batch_paths(shots_df, normalized=True), repeat)
+    record('batch_paths_normalized', seconds, points=len(shot_paths.coords_df), bytes=shot_paths.memory_usage())
+
+    for stage, model in [('physics_paths', PhysicsShotModel()), ('physics_paths_drag', PhysicsShotModel(drag=True))]:
+        shot_paths, seconds = time_stage(lambda: model.batch_paths(shots_df, normalized=True), repeat)
+        record(stage, seconds, points=len(shot_paths.coords_df), seconds_per_shot=seconds / max(num_shots, 1))
+
+    table = get_trajectory_table()
+    _, seconds = time_stage(lambda: table.get_paths(shots_df, normalized=True), repeat)
+    record('table_paths', seconds)
+
+    def court_lines_cold():
+        CourtCoordinates._court_lines_cache.clear()
+        return CourtCoordinates().get_court_lines()
+
+    court_lines_df, seconds = time_stage(court_lines_cold, repeat)
+    record('court_lines_cold', seconds, points=len(court_lines_df))
+    _, seconds = time_stage(lambda: CourtCoordinates().get_court_lines(), repeat)
+    record('court_lines_cached', seconds)
+
+    # figures are built per game
+    figure_seconds, json_seconds, json_bytes = [], [], []
+    game_ids = shots_df['GAME_ID'].unique()[:max_figure_games]
+    for game_id in game_ids:
+        game_shot_paths = table.get_paths(shots_df[shots_df['GAME_ID'] == game_id], normalized=True)
+        fig, seconds = time_stage(lambda: build_shot_chart(court_lines_df, game_shot_paths, COLOR_MAPPING))
+        figure_seconds.append(seconds)
+        payload, seconds = time_stage(fig.to_json)
+        json_seconds.append(seconds)
+        json_bytes.append(len(payload.encode()))
+
+    record('figure_single_trace', float(np.mean(figure_seconds)), games=len(game_ids), unit='per game')
+    record('to_json_single_trace', float(np.mean(json_seconds)), games=len(game_ids), unit='per game',
+           bytes=float(np.mean(json_bytes)))
+
+    # sequence numbers are only unique within a game
+    first_game_df = BasketballShot.batch_paths(shots_df[shots_df['GAME_ID'] == game_ids[0]])
+    fig, seconds = time_stage(lambda: build_shot_chart_per_shot_traces(court_lines_df, first_game_df, COLOR_MAPPING))
+    record('figure_per_shot_traces', seconds, games=1, unit='per game')
+    payload, seconds = time_stage(fig.to_json)
+    record('to_json_per_shot_traces', seconds, games=1, unit='per game', bytes=len(payload.encode()))
+
+    # the animated chart of the first game, frames only carry which step traces are visible
+    first_game_paths = table.get_paths(shots_df[shots_df['GAME_ID'] == game_ids[0]], normalized=True)
+    fig, seconds = time_stage(lambda: build_animated_shot_chart(court_lines_df, first_game_paths, COLOR_MAPPING), repeat)
+    record('figure_animation', seconds, games=1, unit='per game', frames=len(fig.frames))
+    payload, seconds = time_stage(fig.to_json)
+    frame_bytes = len(json.dumps(json.loads(payload)['frames']).encode())
+    record('to_json_animation', seconds, games=1, unit='per game', bytes=len(payload.encode()),
+           frame_bytes=frame_bytes, bytes_per_frame=frame_bytes / max(len(fig.frames), 1))
+
+    return results
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(before_path, after_path):
+    '''
+    Prints the time ratio of every (dataset, stage) found in both result files
+    '''
+    with open(before_path) as f:
+        before = {(result['dataset'], result['stage']): result for result in json.load(f)['results']}
+    with open(after_path) as f:
+        after = {(result['dataset'], result['stage']): result for result in json.load(f)['results']}
+
+    for key in sorted(before.keys() & after.keys()):
+        before_seconds, after_seconds = before[key]['seconds'], after[key]['seconds']
+        ratio = after_seconds / before_seconds if before_seconds else float('nan')
+        flag = '  REGRESSION' if ratio > 1.2 else ''
+        print(f'{key[0]:>12} {key[1]:<26} {before_seconds:10.4f}s -> {after_seconds:10.4f}s  x{ratio:.2f}{flag}')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the shot chart pipeline')
+    parser.add_argument('--datasets', nargs='+', default=['sample', 'game', 'tournament'], choices=['sample'] + list(SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-loop-shots', type=int, default=2000)
+    parser.add_argument('--output', default=None, help='defaults to benchmarks/results/<commit>.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = []
+    for name in args.datasets:
+        results.extend(run_dataset(name, load_dataset(name), repeat=args.repeat, max_loop_shots=args.max_loop_shots))
+
+    commit = get_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'plotly': plotly.__version__,
+        'results': results
+    }
+
+    output = args.output or os.path.join('benchmarks', 'results', f'{commit or "local"}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for result in results:
+        print(f"{result['dataset']:>12} {result['stage']:<26} {result['seconds']:10.4f}s")
+    print(f'results written to {output}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+'''
+Measures how fast a fresh server process gets going, each in a new Python process:
+the import time of every module main.py imports, and the first run of main.py up to its first element
+(time to first paint) and to its end. Fails when a measurement is over its budget. Runs offline on the sample data.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --import-budget 1.0 --first-paint-budget 0.2 --output benchmarks/results/startup.json
+'''
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+IMPORTS_SCRIPT = '''
+import importlib, json, sys, time
+timings = {}
+for module in sys.argv[1:]:
+    start = time.perf_counter()
+    importlib.import_module(module)
+    timings[module] = time.perf_counter() - start
+print(json.dumps(timings))
+'''
+
+# the app's first element is its title, the time it is drawn at is taken from a wrapped st.title
+FIRST_RUN_SCRIPT = '''
+import json, time
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+first_paint = []
+title = st.title
+def timed_title(*args, **kwargs):
+    first_paint.append(time.perf_counter())
+    return title(*args, **kwargs)
+st.title = timed_title
+
+start = time.perf_counter()
+app = AppTest.from_file('main.py', default_timeout=120)
+app.run()
+end = time.perf_counter()
+print(json.dumps({
+    'first_paint_seconds': first_paint[0] - start if first_paint else None,
+    'first_run_seconds': end - start,
+    'exceptions': [str(exception.value) for exception in app.exception]
+}))
+'''
+
+def get_main_imports(path='main.py'):
+    '''
+    Returns the top level modules main.py imports, in order
+    '''
+    with open(path) as f:
+        tree = ast.parse(f.read())
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+
+    return list(dict.fromkeys(modules))
+
+def run_python(script, *args, env=None):
+    result = subprocess.run([sys.executable, '-c', script, *args], capture_output=True, text=True, check=True, env=env)
+
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the cold start of the app')
+    parser.add_argument('--source', choices=['local', 'replay'], default='local')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--import-budget', type=float, default=1.5, help='seconds')
+    parser.add_argument('--first-paint-budget', type=float, default=0.25, help='seconds')
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    env = {**os.environ, 'MARCH_MADNESS_DATA_SOURCE': args.source, 'MARCH_MADNESS_TIMING_LOG': ''}
+    modules = get_main_imports()
+
+    # the fastest of repeat fresh processes, as in benchmarks.run
+    imports = min((run_python(IMPORTS_SCRIPT, *modules, env=env) for _ in range(args.repeat)), key=lambda timings: sum(timings.values()))
+    first_runs = [run_python(FIRST_RUN_SCRIPT, env=env) for _ in range(args.repeat)]
+    first_run = min(first_runs, key=lambda run: run['first_paint_seconds'] or float('inf'))
+
+    report = {
+        'import_seconds': sum(imports.values()),
+        'imports': dict(sorted(imports.items(), key=lambda item: -item[1])),
+        'first_paint_seconds': first_run['first_paint_seconds'],
+        'first_run_seconds': min(run['first_run_seconds'] for run in first_runs),
+        'exceptions': first_run['exceptions'],
+        'budgets': {'import_seconds': args.import_budget, 'first_paint_seconds': args.first_paint_budget}
+    }
+
+    for module, seconds in list(report['imports'].items())[:5]:
+        print(f'{module:<30} {seconds:8.3f}s')
+    over_budget = []
+    for measurement, budget in report['budgets'].items():
+        seconds = report[measurement]
+        flag = ''
+        if seconds is None or seconds > budget:
+            flag = '  OVER BUDGET'
+            over_budget.append(measurement)
+        print(f'{measurement:<30} {seconds if seconds is not None else float("nan"):8.3f}s  budget {budget:.3f}s{flag}')
+    print(f"{'first_run_seconds':<30} {report['first_run_seconds']:8.3f}s")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if report['exceptions']:
+        print('\n'.join(report['exceptions']))
+    if over_budget or report['exceptions']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+'''
+Synthetic play by play generators for the benchmarks, in the layout the play by play query returns.
+'''
+import numpy as np
+import pandas as pd
+
+from utils.dataSource import LocalDataSource, PLAY_BY_PLAY_COLUMNS
+
+# number of games in each benchmark size
+SIZES = {
+    'game': 1,
+    'tournament': 67,
+    'season': 500
+}
+
+SHOT_TYPES = ['Layup', 'Dunk', 'Jumper', 'Three Point Jumper']
+
+def generate_shots(num_games, shots_per_game=140, made_fraction=0.45, side_on_fraction=0.08,
+                   in_cylinder_fraction=0.02, seed=0) -> pd.DataFrame:
+    '''
+    Generates num_games games of shots with integer coordinates, both teams, and a mix of made, missed,
+    side on (directly in line with the hoop) and in cylinder (under the hoop) shots
+    '''
+    rng = np.random.default_rng(seed)
+    num_shots = num_games * shots_per_game
+
+    # shot distances from the hoop: a third at the rim, a third mid-range and a third from three
+    zone = rng.integers(0, 3, num_shots)
+    distance = np.select(
+        [zone == 0, zone == 1],
+        [rng.uniform(1, 6, num_shots), rng.uniform(6, 21, num_shots)],
+        default=rng.uniform(22.2, 27, num_shots)
+    )
+    angle = rng.uniform(0, np.pi, num_shots)
+    coordinate_x = np.clip(np.round(25 + distance * np.cos(angle)), 0, 50)
+    coordinate_y = np.round(distance * np.sin(angle))
+
+    shot_kind = rng.uniform(size=num_shots)
+    side_on = shot_kind < side_on_fraction
+    in_cylinder = (shot_kind >= side_on_fraction) & (shot_kind < side_on_fraction + in_cylinder_fraction)
+    coordinate_x[side_on | in_cylinder] = 25
+    coordinate_y[in_cylinder] = 0
+
+    made = rng.uniform(size=num_shots) < made_fraction
+    team = np.where(rng.uniform(size=num_shots) < 0.5, 'home', 'away')
+    game_id = 401400000 + np.repeat(np.arange(num_games), shots_per_game)
+    sequence_number = 101800000 + np.tile(np.arange(shots_per_game), num_games) * 100
+
+    shot_type = np.where(zone == 2, 'Three Point Jumper', np.array(SHOT_TYPES[:3])[rng.integers(0, 3, num_shots)])
+    player = rng.integers(1, 13, num_shots).astype(str)
+    result = np.where(made, ' made ', ' missed ')
+    text = pd.Series('Player ' + player + result + shot_type + '.')
+
+    return pd.DataFrame({
+        'SEQUENCE_NUMBER': sequence_number,
+        'COORDINATE_X': coordinate_x,
+        'COORDINATE_Y': coordinate_y,
+        'TEAM_ID': np.where(team == 'home', 1, 2),
+        'TEXT': text,
+        'SCORING_PLAY': made,
+        'SCORING_TEAM': team,
+        'GAME_ID': game_id
+    })[PLAY_BY_PLAY_COLUMNS]
+
+def generate_schedule(shots_df) -> pd.DataFrame:
+    '''
+    Generates a schedule for the games in a synthetic shots frame
+    '''
+    game_ids = np.sort(shots_df['GAME_ID'].unique())[::-1]
+
+    return pd.DataFrame({
+        'GAME': [f'Away {game_id} @ Home {game_id}' for game_id in game_ids],
+        'GAME_ID': game_ids,
+        'HOME_COLOR': '#0022B4',
+        'AWAY_COLOR': '#99bfe5',
+        'HOME_TEAM': [f'Home {game_id}' for game_id in game_ids],
+        'AWAY_TEAM': [f'Away {game_id}' for game_id in game_ids]
+    })
+
+def load_dataset(name, seed=0) -> pd.DataFrame:
+    '''
+    Returns the shots of a named dataset: 'sample' (static/sample.csv) or one of the synthetic SIZES
+    '''
+    if name == 'sample':
+        return LocalDataSource().read_shots()
+
+    return generate_shots(SIZES[name], seed=seed)
@@ -0,0 +1,36 @@
+'''
+Compares the memory held by the flat shot paths dataframe and by the normalized ShotPaths,
+for the sample game and for the sample game repeated into a season sized frame. reduction is
+frame_bytes / normalized_bytes.
+
+    python -m benchmarks.trajectory_memory
+'''
+import json
+
+import pandas as pd
+
+from utils.basketballShot import BasketballShot
+from utils.dataSource import LocalDataSource
+
+def main():
+    sample_shots_df = LocalDataSource().read_shots()
+
+    for name, shots_df in [('game', sample_shots_df), ('season', pd.concat([sample_shots_df] * 60, ignore_index=True))]:
+        shot_paths_df = BasketballShot.batch_paths(shots_df)
+        shot_paths = BasketballShot.batch_paths(shots_df, normalized=True)
+
+        frame_bytes = int(shot_paths_df.memory_usage(deep=True).sum())
+        normalized_bytes = shot_paths.memory_usage()
+        print(json.dumps({
+            'shots': name,
+            'num_shots': len(shots_df),
+            'num_points': len(shot_paths_df),
+            'frame_bytes': frame_bytes,
+            'normalized_bytes': normalized_bytes,
+            'frame_bytes_per_point': frame_bytes / len(shot_paths_df),
+            'normalized_bytes_per_point': normalized_bytes / len(shot_paths_df),
+            'reduction': frame_bytes / normalized_bytes
+        }))
+
+if __name__ == '__main__':
+    main()
@@ -1,178 +1,373 @@
+import os
+import uuid
 import streamlit as st
-import plotly.express as px
+
+# the page shell is drawn before the heavier imports below (pandas, numpy, plotly),
+# so the first session of a fresh server process sees the page at once
+st.set_page_config(layout="wide")
+st.title("UNC vs Kansas Men's Basketball Championship - National Championship 2022 ")
+
 import pandas as pd
 from utils.courtCoordinates import CourtCoordinates
 from utils.basketballShot import BasketballShot
-from snowflake.snowpark import Session
+from utils.trajectoryStore import TrajectoryStore
+from utils.gameLoader import GameShotLoader
+from utils.dataSource import SnowflakeDataSource, LocalDataSource, ReplayDataSource
+from utils.shotFigure import build_shot_chart, build_shot_chart_per_shot_traces, build_animated_shot_chart, build_density_chart, build_multi_game_chart, get_court_traces
+from utils.gamePathPool import GamePathPool
+from utils.liveGame import LiveGame
+from utils.shotIndex import ShotIndex
+from utils.shotZones import ShotZones
+from utils.playIndex import PlayIndex, add_play_columns
+from utils.lruCache import LRUCache
+from utils.sharedStore import SharedStore
+from utils.trajectoryTable import get_trajectory_table
+from utils.shotPhysics import PhysicsShotModel
+from utils.shotDensity import ShotDensity
+from utils.stageTimer import StageTimer
+from utils.warmUp import WarmUp
 
-st.set_page_config(layout="wide")
-st.title("UNC vs Kansas Men's Basketball Championship - National Championship 2022 ")
+# every stage of a run is timed, appended to a JSON lines log and optionally shown in the sidebar.
+# set MARCH_MADNESS_TIMING_LOG to change the log path, or to an empty string to turn the log off
+TIMING_LOG = os.environ.get('MARCH_MADNESS_TIMING_LOG', '.cache/stage_timings.jsonl')
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = uuid.uuid4().hex
+timer = StageTimer(session_id=st.session_state['session_id']).activate()
+
+def finish_timing(show_timings=True):
+    timer.deactivate()
+    if TIMING_LOG:
+        timer.write_jsonl(TIMING_LOG)
+    if show_timings and st.sidebar.checkbox('Show stage timings'):
+        st.sidebar.dataframe(timer.get_summary())
+        st.sidebar.json(shared_store.get_stats())
+        st.sidebar.dataframe(warm_up.get_stats())
+
+# the script body runs in a try block so the timer is always deactivated and logged, also when a run fails
+# or st.rerun() ends it early. The views are branches rather than st.stop() calls, since nothing drawn after
+# st.stop() is shown, and every view ends with the stage timings. Only runs that reach the end draw them: a
+# failing run, or one that st.rerun() or st.stop() ends early with a BaseException, only logs its stages
+show_timings = False
+try:
+    # create a connection, called by the data source's first query
+    def create_session_object():
+        from snowflake.snowpark import Session
+
+        connection_parameters = {
+           "account": "<ACCOUNT>",
+           "user": "<USER>",
+           "password": "<PASSWORD>",
+           "role": "<ROLE>",
+           "warehouse": "<WAREHOUSE>",
+           "database": "<DATABASE>",
+           "schema": "<SCHEMA"
+        }
+        session = Session.builder.configs(connection_parameters).create()
+        return session
+
+    # set MARCH_MADNESS_DATA_SOURCE=local to read the csv files in the static folder instead of Snowflake,
+    # or to replay to stream the csv files' shots as if the games were live (see the Live updates checkbox)
+    @st.cache_resource
+    def create_data_source():
+        source = os.environ.get('MARCH_MADNESS_DATA_SOURCE', 'snowflake')
+        if source == 'local':
+            return LocalDataSource()
+        if source == 'replay':
+            return ReplayDataSource(shots_per_second=float(os.environ.get('MARCH_MADNESS_REPLAY_PACE', 0.5)))
+        return SnowflakeDataSource(create_session=create_session_object)
+
+    data_source = create_data_source()
+
+    # loaded frames and computed paths are kept once per server process and every session gets read only views of them.
+    # set MARCH_MADNESS_CACHE_MB to change the memory ceiling, least recently used entries are evicted past it
+    @st.cache_resource
+    def create_shared_store():
+        return SharedStore(max_bytes=int(float(os.environ.get('MARCH_MADNESS_CACHE_MB', 512)) * 1024 ** 2))
+
+    shared_store = create_shared_store()
+
+    # query the data
+    def load_schedule():
+        return shared_store.get_or_load('schedule', data_source.get_schedule)
+
+    # one loader per server process, keeps the most recently viewed games and prefetches their neighbors.
+    # play descriptions are parsed into shooter, assister and shot type columns as each game is loaded
+    @st.cache_resource
+    def create_game_loader():
+        def fetch_game_shots(game_id):
+            return add_play_columns(data_source.get_game_shots(game_id))
+
+        return GameShotLoader(fetch_game_shots, prefetch=True, cache=shared_store)
+
+    game_loader = create_game_loader()
+
+    # player indexes of the most recently viewed games
+    @st.cache_resource
+    def create_play_index_cache():
+        return LRUCache(max_size=16)
+
+    # computed shot paths are persisted to disk, shared by every session and kept across restarts.
+    # the physics models solve every shot's release and integrate its flight, with misses bouncing off the rim
+    TRAJECTORY_MODELS = ['Parabola', 'Physics', 'Physics with drag']
+
+    @st.cache_resource
+    def create_trajectory_store(trajectory_model='Parabola'):
+        if trajectory_model == 'Parabola':
+            return TrajectoryStore(memory_cache=shared_store)
+
+        model = PhysicsShotModel(drag=trajectory_model == 'Physics with drag')
+        return TrajectoryStore(
+            cache_dir=os.path.join('.cache', 'trajectories', 'physics_drag' if model.drag else 'physics'),
+            compute_paths=lambda game_shots_df: model.batch_paths(game_shots_df, normalized=True),
+            memory_cache=shared_store,
+            model_parameters=model.get_parameters()
+        )
+
+    # the first run of a server process starts loading the schedule, the court, the trajectory table and the
+    # most recent games' paths in the background, the page shell above is drawn without waiting on them.
+    # set MARCH_MADNESS_WARM_UP_GAMES to change the number of games, 0 still warms everything else
+    WARM_UP_GAMES = int(os.environ.get('MARCH_MADNESS_WARM_UP_GAMES', 4))
+
+    @st.cache_resource
+    def start_warm_up(_trajectory_store):
+        def warm_recent_games():
+            recent_game_ids = load_schedule()['GAME_ID'].head(WARM_UP_GAMES).tolist()
+            _trajectory_store.warm(game_loader, game_ids=recent_game_ids)
+
+        return WarmUp([
+            ('schedule', load_schedule),
+            ('court_lines', lambda: CourtCoordinates().get_court_lines()),
+            ('trajectory_table', get_trajectory_table),
+            ('recent_games', warm_recent_games)
+        ]).start()
+
+    warm_up = start_warm_up(create_trajectory_store())
+
+    # waits on the warm up's schedule query when it is still running
+    with timer.stage('load_schedule') as record, st.spinner('Loading the schedule'):
+        schedule_df = load_schedule()
+        record['rows'] = len(schedule_df)
+    game_loader.set_schedule(schedule_df['GAME_ID'])
+
+    # per game bin counts are kept for the life of the server process, so only games not binned yet are loaded
+    @st.cache_resource
+    def create_shot_density(bin_shape):
+        return ShotDensity(bin_shape=bin_shape)
+
+    # per game zone counts are kept for the life of the server process, like the density bins
+    @st.cache_resource
+    def create_shot_zones():
+        return ShotZones()
+
+    # one spatial index over the shots of every game, built once per server process
+    @st.cache_resource
+    def create_shot_index(schedule_game_ids):
+        games = [data_source.get_game_shots(game_id) for game_id in schedule_game_ids]
+        return ShotIndex(pd.concat([game_shots_df for game_shots_df in games if len(game_shots_df)], ignore_index=True))
+
+    # paths of several games are computed in worker processes, one game per task
+    @st.cache_resource
+    def create_game_path_pool():
+        return GamePathPool()
+
+    court = CourtCoordinates()
+    court_lines_df = court.get_court_lines()
+
+    # the court traces are built once per server process and every figure starts from them
+    @st.cache_resource
+    def create_court_traces():
+        return get_court_traces(court_lines_df)
+
+    court_traces = create_court_traces()
+
+    # built figures of the games this session looked at, so switching back to a game only redraws it
+    if 'figure_cache' not in st.session_state:
+        st.session_state['figure_cache'] = LRUCache(max_size=8)
+    figure_cache = st.session_state['figure_cache']
+
+    teams = sorted(set(schedule_df['HOME_TEAM'].astype(str)) | set(schedule_df['AWAY_TEAM'].astype(str)))
+    game_names = schedule_df.set_index('GAME_ID')['GAME'].to_dict()
+
+    view = st.sidebar.radio('View', ['Game', 'Compare games', 'Shot density', 'Shot finder'])
+    if view == 'Shot density':
+        density_scope = st.sidebar.selectbox('Shots by', ['All teams'] + teams)
+        bin_shape = st.sidebar.radio('Bins', ['hex', 'square'])
+        density_value = st.sidebar.radio('Show', ['attempts', 'makes'])
+
+        if density_scope == 'All teams':
+            game_sides = None
+            density_game_ids = schedule_df['GAME_ID'].tolist()
+        else:
+            game_sides = [(game_id, 'home') for game_id in schedule_df.loc[schedule_df['HOME_TEAM'] == density_scope, 'GAME_ID']] + \
+                         [(game_id, 'away') for game_id in schedule_df.loc[schedule_df['AWAY_TEAM'] == density_scope, 'GAME_ID']]
+            density_game_ids = [game_id for game_id, _ in game_sides]
+
+        shot_density = create_shot_density(bin_shape)
+        shot_zones = create_shot_zones()
+        with timer.stage('density_binning', games=len(density_game_ids)) as record:
+            new_game_ids = [game_id for game_id in density_game_ids if not (shot_density.has_game(game_id) and shot_zones.has_game(game_id))]
+            for game_id in new_game_ids:
+                game_shots_df = data_source.get_game_shots(game_id)
+                shot_density.add_game(game_id, game_shots_df)
+                shot_zones.add_game(game_id, game_shots_df)
+            record['cache_hit'] = not new_game_ids
+
+        attempts, makes = shot_density.get_counts(game_sides)
+        st.title(f'{density_scope} - shot density')
+        with timer.stage('build_figure'):
+            density_traces = shot_density.get_traces(attempts if density_value == 'attempts' else makes, name=density_value)
+            fig = build_density_chart(None, density_traces, court_traces=court_traces)
+        with timer.stage('plotly_chart'):
+            st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(shot_zones.get_zone_table(game_sides))
+
+    elif view == 'Shot finder':
+        # regions are measured on one half court, from the baseline and the left sideline
+        region = st.sidebar.radio('Region', ['Corner threes', 'Distance from hoop', 'Rectangle'])
+        with timer.stage('shot_index') as record:
+            shot_index = create_shot_index(tuple(schedule_df['GAME_ID']))
+            if region == 'Corner threes':
+                shot_ids = shot_index.query_corner_threes()
+            elif region == 'Distance from hoop':
+                min_distance, max_distance = st.sidebar.slider('Feet from the hoop', 0.0, 47.0, (22.0, 30.0))
+                shot_ids = shot_index.query_distance_band(min_distance, max_distance)
+            else:
+                x_min, x_max = st.sidebar.slider('Feet from the left sideline', 0.0, 50.0, (0.0, 50.0))
+                y_min, y_max = st.sidebar.slider('Feet from the baseline', 0.0, 47.0, (0.0, 15.0))
+                shot_ids = shot_index.query_rectangle(x_min, y_min, x_max, y_max)
+            record['rows'] = len(shot_ids)
+
+        st.title(f'{region} - {len(shot_ids)} shots')
+        region_shot_paths = get_trajectory_table().get_paths(shot_index.get_shots(shot_ids), normalized=True)
+        with timer.stage('build_figure') as record:
+            fig = build_shot_chart(None, region_shot_paths, {'home': '#0022B4', 'away': '#99bfe5'}, court_traces=court_traces)
+            record['traces'] = len(fig.data)
+        with timer.stage('plotly_chart'):
+            st.plotly_chart(fig, use_container_width=True)
+
+    elif view == 'Compare games':
+        # picking a team preselects all of its games, e.g. its whole tournament run
+        compare_team = st.sidebar.selectbox('Team', ['Any'] + teams)
+        if compare_team == 'Any':
+            default_game_ids = []
+        else:
+            default_game_ids = schedule_df.loc[(schedule_df['HOME_TEAM'] == compare_team) | (schedule_df['AWAY_TEAM'] == compare_team), 'GAME_ID'].tolist()
+        compare_game_ids = st.sidebar.multiselect('Games', schedule_df['GAME_ID'].tolist(), default=default_game_ids, format_func=lambda x: game_names[x])
+        compare_layout = st.sidebar.radio('Layout', ['overlay', 'facet'])
+
+        if not compare_game_ids:
+            st.info('Select a team or games to compare')
+        else:
+            games = {game_id: game_loader.get_game_shots(game_id) for game_id in compare_game_ids}
+            games_paths = create_game_path_pool().get_paths(games)
+
+            # every game keeps its own home and away colors
+            colors_df = schedule_df.set_index('GAME_ID').loc[compare_game_ids, ['HOME_COLOR', 'AWAY_COLOR']]
+            color_mappings = {game_id: {'home': row.HOME_COLOR, 'away': row.AWAY_COLOR} for game_id, row in colors_df.iterrows()}
+
+            st.title(f'{compare_team} - {len(compare_game_ids)} games' if compare_team != 'Any' else f'{len(compare_game_ids)} games')
+            with timer.stage('build_figure', layout=compare_layout) as record:
+                fig = build_multi_game_chart(None, games_paths, color_mappings, game_names, layout=compare_layout, court_traces=court_traces)
+                record['traces'] = len(fig.data)
+            with timer.stage('plotly_chart'):
+                st.plotly_chart(fig, use_container_width=True)
+
+    else:
+        # create single selection option
+        schedule_options = schedule_df[['GAME','GAME_ID']].set_index('GAME_ID')['GAME'].to_dict()
+        game_selection = st.sidebar.selectbox('Select Game', schedule_options.keys(), format_func=lambda x:schedule_options[x])
+
+        # filter game specific values
+        home_color = schedule_df.loc[schedule_df['GAME_ID'] == game_selection]['HOME_COLOR'].item()
+        away_color = schedule_df.loc[schedule_df['GAME_ID'] == game_selection]['AWAY_COLOR'].item()
+        game_text = schedule_options[game_selection]
+        st.title(game_text)
+
+        color_mapping = {
+            'home': home_color,
+            'away': away_color
+        }
+
+        # live updates redraw the chart every few seconds, fetching and drawing only the shots taken since the last refresh
+        if st.sidebar.checkbox('Live updates'):
+            refresh_seconds = st.sidebar.number_input('Refresh every (seconds)', min_value=1, value=5)
+            live_game = st.session_state.get('live_game')
+            if live_game is None or live_game.game_id != game_selection:
+                live_game = st.session_state['live_game'] = LiveGame(game_selection, data_source, court_lines_df, color_mapping)
+
+            @st.fragment(run_every=refresh_seconds)
+            def draw_live_game():
+                live_game.refresh()
+                st.caption(f'{live_game.num_shots} shots')
+                st.plotly_chart(live_game.fig, use_container_width=True)
+
+            draw_live_game()
+        else:
+            game_shots_df = game_loader.get_game_shots(game_selection)
+
+            # player filters are lookups in the game's player index
+            play_index_cache = create_play_index_cache()
+            play_index = play_index_cache.get(game_selection)
+            if play_index is None or play_index.num_shots != len(game_shots_df):
+                play_index = PlayIndex(game_shots_df)
+                play_index_cache.put(game_selection, play_index)
+
+            shooters = st.sidebar.multiselect('Shooters', play_index.get_shooters())
+            assisters = st.sidebar.multiselect('Assisted by', sorted(play_index.assister_index))
+            assist_filter = st.sidebar.radio('Assists', ['All shots', 'Assisted', 'Unassisted'], horizontal=True)
+            trajectory_model = st.sidebar.radio('Trajectory model', TRAJECTORY_MODELS)
+            adaptive_lod = trajectory_model == 'Parabola' and st.sidebar.checkbox('Adaptive level of detail')
+            # single trace rendering sends one trace per team instead of one per shot,
+            # animated plays the game back in shot order with a slider to scrub through it
+            render_mode = st.sidebar.radio('Rendering', ['Single trace', 'Trace per shot', 'Animated'])
+
+            # a figure is built once per game and display options, the shot count keeps a game that is still being played current
+            figure_key = (
+                game_selection, len(game_shots_df), home_color, away_color,
+                tuple(shooters), tuple(assisters), assist_filter, trajectory_model, adaptive_lod, render_mode
+            )
+            with timer.stage('figure_cache') as record:
+                fig = figure_cache.get(figure_key)
+                record['cache_hit'] = fig is not None
+
+            if fig is None:
+                # generate coordinates for shot paths, looked up from the precomputed trajectory table or the on-disk cache.
+                # adaptive level of detail samples each arc with only as many points as its curvature needs (within 0.05ft)
+                if adaptive_lod:
+                    game_shot_paths = BasketballShot.batch_paths(game_shots_df, tolerance=0.05, normalized=True)
+                else:
+                    game_shot_paths = create_trajectory_store(trajectory_model).get_paths(game_selection, game_shots_df)
+
+                # paths are computed for the whole game and cached, filters only pick shots out of them
+                if shooters or assisters or assist_filter != 'All shots':
+                    shot_ids = play_index.get_shot_ids(
+                        shooters=shooters or None,
+                        assisters=assisters or None,
+                        assisted={'All shots': None, 'Assisted': True, 'Unassisted': False}[assist_filter]
+                    )
+                    game_shot_paths = game_shot_paths.take(shot_ids)
+
+                with timer.stage('build_figure', render_mode=render_mode) as record:
+                    if render_mode == 'Single trace':
+                        fig = build_shot_chart(None, game_shot_paths, color_mapping, court_traces=court_traces)
+                    elif render_mode == 'Animated':
+                        fig = build_animated_shot_chart(None, game_shot_paths, color_mapping, court_traces=court_traces)
+                        record['frames'] = len(fig.frames)
+                    else:
+                        fig = build_shot_chart_per_shot_traces(court_lines_df, game_shot_paths, color_mapping)
+                    record['traces'] = len(fig.data)
+                figure_cache.put(figure_key, fig)
+
+            with timer.stage('plotly_chart'):
+                st.plotly_chart(fig, use_container_width=True)
+
+            # zone breakdown of both teams, the game's cached counts are only refreshed when it has new shots
+            shot_zones = create_shot_zones()
+            if shot_zones.get_num_shots(game_selection) != len(game_shots_df) or not shot_zones.has_game(game_selection):
+                shot_zones.add_game(game_selection, game_shots_df)
+            home_zones_df, away_zones_df = [shot_zones.get_zone_table([(game_selection, side)]) for side in ['home', 'away']]
+            st.dataframe(pd.concat({'home': home_zones_df, 'away': away_zones_df}, axis=1))
 
-# create a connection
-@st.cache_resource
-def create_session_object():
-    connection_parameters = {
-       "account": "<ACCOUNT>",
-       "user": "<USER>",
-       "password": "<PASSWORD>",
-       "role": "<ROLE>",
-       "warehouse": "<WAREHOUSE>",
-       "database": "<DATABASE>",
-       "schema": "<SCHEMA"
-    }
-    session = Session.builder.configs(connection_parameters).create()
-    return session
-
-session = create_session_object()
-
-# query the data
-@st.cache_data
-def load_data(query):
-    data = session.sql(query)
-    return data.to_pandas()
-    
-play_by_play_query = """
-    SELECT  sequence_number,
-            coordinate_x,
-            coordinate_y,
-            team_id,
-            text,
-            scoring_play,
-            case 
-                when team_id = home_team_id
-                    then 'home'
-                else 'away'
-            end as scoring_team,
-            game_id
-    FROM    play_by_play
-    WHERE   shooting_play
-    AND     score_value != 1  -- shot charts typically do not include free throws
-"""
-
-schedule_query = """
-    select  concat(away_display_name_short, ' @ ', home_display_name_short, ' - ', notes_headline) as game,
-            game_id,
-            home_color,
-            away_color
-    from    schedule
-    order by game_id desc
-"""
-
-schedule_df = load_data(schedule_query)
-play_by_play_df = load_data(play_by_play_query)
-
-# create single selection option
-schedule_options = schedule_df[['GAME','GAME_ID']].set_index('GAME_ID')['GAME'].to_dict()
-game_selection = st.sidebar.selectbox('Select Game', schedule_options.keys(), format_func=lambda x:schedule_options[x])
-
-# filter game specific values
-game_shots_df = play_by_play_df[(play_by_play_df['GAME_ID'] == game_selection)]
-home_color = schedule_df.loc[schedule_df['GAME_ID'] == game_selection]['HOME_COLOR'].item()
-away_color = schedule_df.loc[schedule_df['GAME_ID'] == game_selection]['AWAY_COLOR'].item()
-game_text = schedule_options[game_selection]
-st.title(game_text)
-
-color_mapping = {
-    'home': home_color,
-    'away': away_color
-}
-
-# draw court lines
-court = CourtCoordinates()
-court_lines_df = court.get_court_lines()
-
-fig = px.line_3d(
-    data_frame=court_lines_df,
-    x='x',
-    y='y',
-    z='z',
-    line_group='line_group',
-    color='color',
-    color_discrete_map={
-        'court': '#000000',
-        'hoop': '#e47041'
-    }
-)
-fig.update_traces(hovertemplate=None, hoverinfo='skip', showlegend=False)
-
-game_coords_df = pd.DataFrame()
-# generate coordinates for shot paths
-for index, row in game_shots_df.iterrows():
-    shot = BasketballShot(
-        shot_start_x=row.COORDINATE_X, 
-        shot_start_y=row.COORDINATE_Y, 
-        shot_id=row.SEQUENCE_NUMBER,
-        play_description=row.TEXT,
-        shot_made=row.SCORING_PLAY,
-        team=row.SCORING_TEAM)
-    shot_df = shot.get_shot_path_coordinates()
-    game_coords_df = pd.concat([game_coords_df, shot_df])
-
-# draw shot paths
-shot_path_fig = px.line_3d(
-    data_frame=game_coords_df,
-    x='x',
-    y='y',
-    z='z',
-    line_group='line_id',
-    color='team',
-    color_discrete_map=color_mapping,
-    custom_data=['description']
-)
-
-hovertemplate='Description: %{customdata[0]}'
-shot_path_fig.update_traces(opacity=0.55, hovertemplate=hovertemplate, showlegend=False)
-
-# shot start scatter plots
-game_coords_start = game_coords_df[game_coords_df['shot_coord_index'] == 0]
-shot_start_fig = px.scatter_3d(
-    data_frame=game_coords_start,
-    x='x',
-    y='y',
-    z='z',
-    custom_data=['description'],
-    color='team',
-    color_discrete_map=color_mapping,
-    symbol='shot_made',
-    symbol_map={'made': 'circle', 'missed': 'x'}
-)
-
-shot_start_fig.update_traces(marker_size=4, hovertemplate=hovertemplate)
-
-# add shot scatter plot to court plot
-for i in range(len(shot_start_fig.data)):
-    fig.add_trace(shot_start_fig.data[i])
-
-# add shot line plot to court plot
-for i in range(len(shot_path_fig.data)):
-    fig.add_trace(shot_path_fig.data[i])
-
-# graph styling
-fig.update_traces(line=dict(width=5))
-fig.update_layout(    
-    margin=dict(l=20, r=20, t=20, b=20),
-    scene_aspectmode="data",
-    height=600,
-    scene_camera=dict(
-        eye=dict(x=1.3, y=0, z=0.7)
-    ),
-    scene=dict(
-        xaxis=dict(title='', showticklabels=False, showgrid=False),
-        yaxis=dict(title='', showticklabels=False, showgrid=False),
-        zaxis=dict(title='',  showticklabels=False, showgrid=False, showbackground=True, backgroundcolor='#f7f0e8'),
-    ),
-    legend=dict(
-        yanchor='bottom',
-        y=0.05,
-        x=0.2,
-        xanchor='left',
-        orientation='h',
-        font=dict(size=15, color='black'),
-        bgcolor='white',
-        title='',
-        itemsizing='constant'
-    ),
-    legend_traceorder="reversed"
-)
-
-st.plotly_chart(fig, use_container_width=True)
+    show_timings = True
+finally:
+    finish_timing(show_timings)
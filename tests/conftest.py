@@ -0,0 +1,18 @@
+import pytest
+
+from utils.dataSource import LocalDataSource
+
+@pytest.fixture(scope='session')
+def data_source(tmp_path_factory):
+    '''
+    The sample csv files, converted to Parquet in a temporary folder
+    '''
+    return LocalDataSource(parquet_dir=str(tmp_path_factory.mktemp('parquet')))
+
+@pytest.fixture(scope='session')
+def game_id(data_source):
+    return data_source.get_schedule()['GAME_ID'].iloc[0]
+
+@pytest.fixture(scope='session')
+def game_shots_df(data_source, game_id):
+    return data_source.get_game_shots(game_id)
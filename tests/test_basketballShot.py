@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.basketballShot import BasketballShot
+from utils.courtCoordinates import CourtCoordinates
+from utils.shotPhysics import PhysicsShotModel
+from utils.trajectoryTable import get_trajectory_table
+
+def get_arrays(game_shots_df):
+    return (
+        game_shots_df['COORDINATE_X'].to_numpy(),
+        game_shots_df['COORDINATE_Y'].to_numpy(),
+        game_shots_df['SCORING_PLAY'].to_numpy(),
+        game_shots_df['SCORING_TEAM'].to_numpy()
+    )
+
+def get_reference_paths(game_shots_df, court=None):
+    '''
+    The paths of the per shot reference implementation, one BasketballShot per row
+    '''
+    return pd.concat([
+        BasketballShot(
+            shot_start_x=row.COORDINATE_X,
+            shot_start_y=row.COORDINATE_Y,
+            shot_id=row.SEQUENCE_NUMBER,
+            play_description=row.TEXT,
+            shot_made=row.SCORING_PLAY,
+            team=row.SCORING_TEAM,
+            court=court
+        ).get_shot_path_coordinates()
+        for row in game_shots_df.itertuples()
+    ])
+
+@pytest.mark.parametrize('dimensions', ['ncaa_men', 'nba'])
+def test_batch_paths_match_the_reference(dimensions, game_shots_df):
+    court = CourtCoordinates(dimensions)
+    reference_df = get_reference_paths(game_shots_df, court=court)
+    batch_df = BasketballShot.batch_paths(game_shots_df, court=court)
+
+    assert len(batch_df) == len(reference_df)
+    np.testing.assert_array_equal(batch_df['shot_coord_index'].to_numpy(), reference_df['shot_coord_index'].to_numpy())
+    np.testing.assert_array_equal(batch_df['line_id'].to_numpy(), reference_df['line_id'].to_numpy())
+    for column in ['x', 'y', 'z']:
+        np.testing.assert_allclose(batch_df[column].to_numpy(), reference_df[column].to_numpy(dtype=float), rtol=1e-12, atol=1e-12)
+
+def get_synthetic_shots(seed=0):
+    '''
+    Shots of both teams, made and missed: random shots on and off the table grid, shots at and around the
+    hoop (inside the hoop cylinder, on its edge and just outside it), side on shots in line with the hoop,
+    and shots from behind the backboard, between it and the baseline
+    '''
+    rng = np.random.default_rng(seed)
+    num_random = 150
+    shot_start_x = np.concatenate([
+        rng.integers(0, 51, num_random),
+        rng.uniform(0, 50, num_random),
+        [25, 25.5, 25.75, 24.2, 25, 25, 25, 25],
+        [25, 25, 22, 28, 19.5, 31, 0, 50]
+    ])
+    shot_start_y = np.concatenate([
+        rng.integers(-4, 48, num_random),
+        rng.uniform(-4, 47, num_random),
+        [0, 0.25, 0, 0, 0.75, 1, 10, 40],
+        [-1, -3, -2, -3.5, -1.5, -4, -4, -2]
+    ])
+    num_shots = len(shot_start_x)
+
+    # every location is taken by both teams, made and missed
+    return pd.DataFrame({
+        'SEQUENCE_NUMBER': np.arange(4 * num_shots),
+        'TEXT': [f'shot {i}' for i in range(4 * num_shots)],
+        'COORDINATE_X': np.tile(shot_start_x, 4).astype(float),
+        'COORDINATE_Y': np.tile(shot_start_y, 4).astype(float),
+        'SCORING_PLAY': np.repeat([True, False, True, False], num_shots),
+        'SCORING_TEAM': np.repeat(['away', 'away', 'home', 'home'], num_shots)
+    })
+
+@pytest.fixture(scope='module', params=['ncaa_men', 'nba'])
+def synthetic_reference(request):
+    '''
+    A court, the synthetic shots and their scalar solver paths, solved once per court
+    '''
+    court = CourtCoordinates(request.param)
+    shots_df = get_synthetic_shots()
+
+    return court, shots_df, get_reference_paths(shots_df, court=court)
+
+@pytest.mark.parametrize('method, tolerance', [('batch', 1e-12), ('table', 4.3e-6)])
+def test_paths_match_the_scalar_solver(synthetic_reference, method, tolerance):
+    court, shots_df, reference_df = synthetic_reference
+    reference_has_path = reference_df.groupby('line_id', sort=False).size().to_numpy() > 1
+
+    shot_arrays = get_arrays(shots_df)
+    if method == 'batch':
+        x, y, z, has_path = BasketballShot.calculate_batch_paths(*shot_arrays, court=court)
+    else:
+        x, y, z, has_path = get_trajectory_table(court=court).lookup_paths(*shot_arrays)
+    paths_df = BasketballShot.paths_to_frame(shots_df, x, y, z, has_path)
+
+    # the hoop, its cylinder and behind the backboard are covered, with and without a path
+    assert reference_has_path.any() and not reference_has_path.all()
+    np.testing.assert_array_equal(has_path, reference_has_path)
+    np.testing.assert_array_equal(paths_df['shot_coord_index'].to_numpy(), reference_df['shot_coord_index'].to_numpy())
+    np.testing.assert_array_equal(paths_df['line_id'].to_numpy(), reference_df['line_id'].to_numpy())
+    for column in ['x', 'y', 'z']:
+        np.testing.assert_allclose(
+            paths_df[column].to_numpy(dtype=float), reference_df[column].to_numpy(dtype=float), rtol=0, atol=tolerance
+        )
+
+@pytest.mark.parametrize('dimensions', ['ncaa_men', 'nba'])
+def test_made_shots_end_in_the_courts_hoop(dimensions, game_shots_df):
+    court = CourtCoordinates(dimensions)
+    shot_start_x, shot_start_y, shot_made, team = get_arrays(game_shots_df)
+    hoop_y = np.where(team == 'home', court.court_length - court.hoop_loc_y, court.hoop_loc_y)
+
+    paths = {
+        'parabola': BasketballShot.calculate_batch_paths(shot_start_x, shot_start_y, shot_made, team, court=court),
+        'physics': PhysicsShotModel(court=court).calculate_batch_paths(shot_start_x, shot_start_y, shot_made, team),
+        'table': get_trajectory_table(court=court).lookup_paths(shot_start_x, shot_start_y, shot_made, team)
+    }
+
+    for x, y, z, has_path in paths.values():
+        made = has_path & shot_made
+        assert made.any()
+        np.testing.assert_allclose(x[made, -1], court.hoop_loc_x, atol=1e-4)
+        np.testing.assert_allclose(y[made, -1], hoop_y[made], atol=1e-4)
+        np.testing.assert_allclose(z[made, -1], court.hoop_loc_z, atol=1e-4)
+
+def test_shot_locations_follow_the_court(game_shots_df):
+    ncaa_x, ncaa_y = BasketballShot.get_shot_locations(game_shots_df)
+    nba_x, nba_y = BasketballShot.get_shot_locations(game_shots_df, court=CourtCoordinates('nba'))
+
+    # the nba hoop is a foot further from the baseline, and shots are measured from it
+    is_home = game_shots_df['SCORING_TEAM'].to_numpy() == 'home'
+    np.testing.assert_allclose(nba_x, ncaa_x)
+    np.testing.assert_allclose(nba_y - ncaa_y, np.where(is_home, -1, 1))
+
+@pytest.mark.parametrize('dimensions', ['ncaa_men', 'nba'])
+def test_arc_heights_follow_the_court(dimensions):
+    court = CourtCoordinates(dimensions)
+    free_throw_line = court.free_throw_distance - court.hoop_loc_y
+    shot_distance = np.array([0, free_throw_line - 0.01, free_throw_line, court.three_arc_distance - 0.01, court.three_arc_distance, 30])
+
+    np.testing.assert_array_equal(BasketballShot.calculate_shot_heights(shot_distance, court=court), [13, 13, 15, 15, 17, 17])
+
+    # a 23 ft shot is beyond the ncaa arc, but inside the nba one
+    expected_height = 17 if court.three_arc_distance <= 23 else 15
+    assert BasketballShot.calculate_shot_heights(np.array([23.0]), court=court)[0] == expected_height
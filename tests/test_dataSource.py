@@ -0,0 +1,32 @@
+import os
+import threading
+
+from utils.dataSource import LocalDataSource
+
+def test_concurrent_conversions(tmp_path):
+    '''
+    Sessions converting and reading the csv files at once all read complete Parquet files
+    '''
+    num_threads = 8
+    barrier = threading.Barrier(num_threads)
+    games, errors = [], []
+
+    def read_shots():
+        data_source = LocalDataSource(parquet_dir=str(tmp_path))
+        barrier.wait()
+        try:
+            for _ in range(5):
+                data_source.convert(force=True)
+                games.append(len(data_source.read_shots()))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read_shots) for _ in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(set(games)) == 1
+    assert sorted(os.listdir(tmp_path)) == ['play_by_play.parquet', 'schedule.parquet']
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from utils import sharedStore
+from utils.sharedStore import SharedStore
+
+def test_views_do_not_change_the_stored_frame(game_shots_df):
+    store = SharedStore()
+    store.put('game', game_shots_df.copy())
+
+    view = store.get('game')
+    view.loc[:, 'COORDINATE_X'] = -1.0
+    view['NEW_COLUMN'] = 1
+
+    stored = store.get('game')
+    np.testing.assert_array_equal(stored['COORDINATE_X'].to_numpy(), game_shots_df['COORDINATE_X'].to_numpy())
+    assert 'NEW_COLUMN' not in stored
+
+def test_views_are_deep_copies_without_copy_on_write(monkeypatch):
+    frame = pd.DataFrame({'x': np.arange(5.0)})
+    store = SharedStore()
+    store.put('frame', frame)
+
+    monkeypatch.setattr(sharedStore, 'is_copy_on_write', lambda: False)
+    view = store.get('frame')
+    assert not np.shares_memory(view['x'].to_numpy(), store.cache.get('frame')['x'].to_numpy())
@@ -0,0 +1,43 @@
+import json
+import os
+
+import pytest
+
+from utils.shotChartExport import ShotChartExporter
+
+class FailingGameSource:
+    '''
+    Returns the sample game's shots for every game, except that one game's shots can not be turned into paths
+    '''
+    def __init__(self, data_source, game_shots_df, failing_game_id):
+        self.data_source = data_source
+        self.game_shots_df = game_shots_df
+        self.failing_game_id = failing_game_id
+
+    def get_schedule(self):
+        return self.data_source.get_schedule()
+
+    def get_game_shots(self, game_id):
+        game_shots_df = self.game_shots_df
+        if game_id == self.failing_game_id:
+            game_shots_df = game_shots_df.assign(COORDINATE_X='not a coordinate')
+        return game_shots_df
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_a_failing_game_keeps_the_others(tmp_path, data_source, game_shots_df, max_workers):
+    game_ids = data_source.get_schedule()['GAME_ID'].tolist()[:3]
+    exporter = ShotChartExporter(
+        FailingGameSource(data_source, game_shots_df, game_ids[1]), output_dir=str(tmp_path), export_format='json', max_workers=max_workers
+    )
+    stats = exporter.export(game_ids=game_ids)
+
+    assert stats['written'] == 2 and stats['failed'] == 1
+    assert list(stats['errors']) == [str(game_ids[1])]
+    with open(exporter.manifest_path) as f:
+        manifest = json.load(f)
+    assert sorted(manifest) == sorted(str(game_id) for game_id in [game_ids[0], game_ids[2]])
+    assert all(os.path.exists(exporter.get_path(game_id)) for game_id in [game_ids[0], game_ids[2]])
+
+    # the recorded games are up to date, only the failed one is attempted again
+    stats = exporter.export(game_ids=game_ids)
+    assert stats['up_to_date'] == 2 and stats['failed'] == 1
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from utils.shotDensity import ShotDensity
+
+TRIANGLES_PER_BIN = {'square': 2, 'hex': 6}
+
+@pytest.mark.parametrize('bin_shape', ['square', 'hex'])
+def test_every_non_empty_bin_is_drawn(bin_shape, game_shots_df):
+    shot_density = ShotDensity(bin_shape=bin_shape)
+    attempts, _ = shot_density.bin_shots(game_shots_df)
+    counts = attempts.sum(axis=0)
+
+    trace, = shot_density.get_traces(counts)
+
+    num_cells = len(trace.i) // TRIANGLES_PER_BIN[bin_shape]
+    assert num_cells == np.count_nonzero(counts)
+    assert len(trace.intensity) == len(trace.i)
+
+def test_square_cells_cover_their_bin(game_shots_df):
+    shot_density = ShotDensity(bin_shape='square')
+    attempts, _ = shot_density.bin_shots(game_shots_df)
+    counts = attempts.sum(axis=0)
+
+    trace, = shot_density.get_traces(counts)
+
+    # every cell's corners are on the bin edges, around the bin the shots were counted in
+    corner_x = np.asarray(trace.x).reshape(-1, 4)
+    corner_y = np.asarray(trace.y).reshape(-1, 4)
+    bins = shot_density.get_bin_index(corner_x.mean(axis=1), corner_y.mean(axis=1))
+    np.testing.assert_array_equal(bins, np.nonzero(counts)[0])
+    np.testing.assert_allclose(corner_x.max(axis=1) - corner_x.min(axis=1), shot_density.cell_size)
+    edges_x = corner_x / shot_density.cell_size
+    np.testing.assert_allclose(edges_x, np.round(edges_x), atol=1e-9)
@@ -0,0 +1,23 @@
+from utils.basketballShot import BasketballShot
+from utils.courtCoordinates import CourtCoordinates
+from utils.shotFigure import append_shot_traces, build_shot_chart
+
+COLOR_MAPPING = {'home': '#0022B4', 'away': '#99bfe5'}
+
+def get_hover_texts(fig):
+    return [text for trace in fig.data if trace.hovertext is not None for text in trace.hovertext if text is not None]
+
+def test_descriptions_are_sent_once(game_shots_df):
+    shot_paths = BasketballShot.batch_paths(game_shots_df, normalized=True)
+    fig = build_shot_chart(CourtCoordinates().get_court_lines(), shot_paths, COLOR_MAPPING)
+
+    assert all(trace.hovertext is None for trace in fig.data if trace.mode == 'lines')
+    assert sorted(get_hover_texts(fig)) == sorted(game_shots_df['TEXT'])
+
+def test_appended_shots_keep_one_description_each(game_shots_df):
+    court_lines_df = CourtCoordinates().get_court_lines()
+    half = len(game_shots_df) // 2
+    fig = build_shot_chart(court_lines_df, BasketballShot.batch_paths(game_shots_df.iloc[:half], normalized=True), COLOR_MAPPING)
+    append_shot_traces(fig, BasketballShot.batch_paths(game_shots_df.iloc[half:], normalized=True), COLOR_MAPPING)
+
+    assert sorted(get_hover_texts(fig)) == sorted(game_shots_df['TEXT'])
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.shotIndex import ShotIndex
+
+def get_synthetic_shots(num_shots=3000, seed=0):
+    '''
+    Random shots of both teams, some of them off the court, plus every quarter foot point of a window of the far
+    half, so polygon and rectangle edges on whole feet pass through shots. Every coordinate is a multiple of a
+    quarter foot, so the adjusted locations are exact
+    '''
+    rng = np.random.default_rng(seed)
+    random_df = pd.DataFrame({
+        'COORDINATE_X': rng.integers(-8, 4 * 52, num_shots) / 4,
+        'COORDINATE_Y': rng.integers(-24, 4 * 90, num_shots) / 4,
+        'SCORING_TEAM': rng.choice(['home', 'away'], num_shots)
+    })
+
+    # away shots are at x = 50 - COORDINATE_X and y = COORDINATE_Y + 4.25
+    window_x, window_y = np.meshgrid(np.arange(40, 81) / 4, np.arange(20, 61) / 4)
+    window_df = pd.DataFrame({
+        'COORDINATE_X': 50 - window_x.ravel(),
+        'COORDINATE_Y': window_y.ravel() - 4.25,
+        'SCORING_TEAM': 'away'
+    })
+
+    return pd.concat([random_df, window_df], ignore_index=True)
+
+def get_even_odd_mask(x, y, vertices):
+    '''
+    The even-odd rule over every shot, without the grid
+    '''
+    inside = np.zeros(len(x), dtype=bool)
+    for (x1, y1), (x2, y2) in zip(vertices, vertices[1:] + vertices[:1]):
+        crosses = (y1 > y) != (y2 > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inside ^= crosses & (x < x1 + (y - y1) * (x2 - x1) / (y2 - y1))
+    return inside
+
+@pytest.fixture(scope='module', params=[1.0, 2.0, 7.5], ids=lambda cell_size: f'cell_size={cell_size}')
+def shot_index(request):
+    return ShotIndex(get_synthetic_shots(), cell_size=request.param)
+
+@pytest.mark.parametrize('bounds', [
+    (10, 5, 20, 15),
+    (12.25, 6.5, 12.25, 14),
+    (-np.inf, -np.inf, 3, 10),
+    (45, -5, np.inf, np.inf),
+    (-10, -10, -1, 60),
+    (20, 5, 10, 15)
+])
+def test_query_rectangle(shot_index, bounds):
+    x_min, y_min, x_max, y_max = bounds
+    x, y = shot_index.x, shot_index.y
+    expected = np.flatnonzero((x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max))
+
+    np.testing.assert_array_equal(shot_index.query_rectangle(*bounds), expected)
+
+@pytest.mark.parametrize('min_distance, max_distance, center', [
+    (0, 5, None),
+    (20, 25, None),
+    (0, 100, None),
+    (2, 3.5, (15, 10)),
+    (0, 4, (-3, 50))
+])
+def test_query_distance_band(shot_index, min_distance, max_distance, center):
+    center_x, center_y = center if center is not None else (shot_index.court.hoop_loc_x, shot_index.court.hoop_loc_y)
+    distance = np.sqrt(np.square(shot_index.x - center_x) + np.square(shot_index.y - center_y))
+    expected = np.flatnonzero((distance >= min_distance) & (distance <= max_distance))
+
+    np.testing.assert_array_equal(shot_index.query_distance_band(min_distance, max_distance, center=center), expected)
+
+@pytest.mark.parametrize('k', [1, 7, 200])
+@pytest.mark.parametrize('point', [(15, 10), (15.1, 9.9), (0.3, 0.2), (49, 46), (-5, 60), (25, 30)])
+def test_query_nearest(shot_index, point, k):
+    shot_ids, distances = shot_index.query_nearest(*point, k=k)
+    all_distances = np.sqrt(np.square(shot_index.x - point[0]) + np.square(shot_index.y - point[1]))
+
+    # ties can come in any order, the distances can not
+    np.testing.assert_array_equal(distances, np.sort(all_distances)[:k])
+    np.testing.assert_array_equal(all_distances[shot_ids], distances)
+    assert len(np.unique(shot_ids)) == k
+
+@pytest.mark.parametrize('vertices', [
+    [(10, 5), (20, 5), (20, 15), (10, 15)],
+    [(10, 5), (20, 15), (10, 15)],
+    [(10, 5), (20, 5), (20, 15)],
+    [(10, 5), (20, 10), (10, 15), (15, 10)],
+    [(-5, -5), (30, 2), (55, 40), (12, 20), (0, 45)],
+    [(11, 6), (19, 6), (19, 14), (11, 14), (11, 8), (17, 8), (17, 12), (13, 12), (13, 6)]
+])
+def test_query_polygon(shot_index, vertices):
+    expected = np.flatnonzero(get_even_odd_mask(shot_index.x, shot_index.y, vertices))
+
+    np.testing.assert_array_equal(shot_index.query_polygon(vertices), expected)
+
+def test_polygon_boundary(shot_index):
+    '''
+    Shots on a rectangle's left and bottom edges are inside, shots on its right and top edges are outside
+    '''
+    x, y = shot_index.x, shot_index.y
+    square = [(10, 5), (20, 5), (20, 15), (10, 15)]
+    half_open = np.flatnonzero((x >= 10) & (x < 20) & (y >= 5) & (y < 15))
+
+    assert np.isin([10, 20], x).all() and np.isin([5, 15], y).all()
+    np.testing.assert_array_equal(shot_index.query_polygon(square), half_open)
+    # the vertex order does not matter
+    np.testing.assert_array_equal(shot_index.query_polygon(square[::-1]), half_open)
+
+    # a shot on a sloped edge is inside when the polygon continues to its right
+    on_diagonal = np.flatnonzero((x - 10 == y - 5) & (x > 10) & (x < 20))
+    assert len(on_diagonal)
+    below_diagonal = shot_index.query_polygon([(10, 5), (20, 5), (20, 15)])
+    above_diagonal = shot_index.query_polygon([(10, 5), (20, 15), (10, 15)])
+    assert np.isin(on_diagonal, below_diagonal).all()
+    assert not np.isin(on_diagonal, above_diagonal).any()
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from utils.basketballShot import BasketballShot
+from utils.shotPaths import ShotPaths
+
+def test_coordinates_are_only_xyz(game_shots_df):
+    '''
+    Shot ids and coordinate indices are derived from the offsets, not stored on every coordinate
+    '''
+    shot_paths = BasketballShot.batch_paths(game_shots_df, normalized=True)
+
+    assert list(shot_paths.coords_df.columns) == ['x', 'y', 'z']
+    assert (shot_paths.coords_df.dtypes == np.float32).all()
+    assert shot_paths.offsets[0] == 0 and shot_paths.offsets[-1] == len(shot_paths.coords_df)
+
+def test_frame_round_trip(game_shots_df):
+    shot_paths_df = BasketballShot.batch_paths(game_shots_df)
+    shot_paths = ShotPaths.from_frame(shot_paths_df)
+
+    pd.testing.assert_frame_equal(shot_paths.to_frame(), BasketballShot.batch_paths(game_shots_df, normalized=True).to_frame())
+    np.testing.assert_array_equal(shot_paths.get_point_indices(), shot_paths_df['shot_coord_index'].to_numpy())
+    np.testing.assert_array_equal(shot_paths.get_start_mask(), shot_paths_df['shot_coord_index'].to_numpy() == 0)
+
+def test_take_matches_the_filtered_frame(game_shots_df):
+    shot_paths = BasketballShot.batch_paths(game_shots_df, normalized=True)
+    shot_ids = np.arange(3, len(shot_paths), 7)
+    taken = shot_paths.take(shot_ids[::-1])
+
+    shot_paths_df = shot_paths.to_frame()
+    expected_df = shot_paths_df[np.isin(shot_paths.get_point_shot_ids(), shot_ids)]
+    pd.testing.assert_frame_equal(taken.to_frame().reset_index(drop=True), expected_df.reset_index(drop=True), check_categorical=False)
+    np.testing.assert_array_equal(taken.get_num_points(), shot_paths.get_num_points()[shot_ids])
+
+def test_save_and_load(tmp_path, game_shots_df):
+    shot_paths = BasketballShot.batch_paths(game_shots_df, normalized=True)
+    path = str(tmp_path / 'paths.npz')
+    shot_paths.save(path)
+    loaded = ShotPaths.load(path)
+
+    np.testing.assert_array_equal(loaded.offsets, shot_paths.offsets)
+    pd.testing.assert_frame_equal(loaded.to_frame(), shot_paths.to_frame())
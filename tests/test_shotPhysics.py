@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from utils.basketballShot import NUM_COORDINATES, BasketballShot
+from utils.shotPhysics import RELEASE_HEIGHT, PhysicsShotModel
+
+MODELS = {
+    'parabola': BasketballShot,
+    'physics': PhysicsShotModel(),
+    'physics_drag': PhysicsShotModel(drag=True)
+}
+
+@pytest.mark.parametrize('model', MODELS.values(), ids=MODELS.keys())
+def test_paths_start_on_the_floor(model, game_shots_df):
+    x, y, z, has_path = model.calculate_batch_paths(
+        game_shots_df['COORDINATE_X'].to_numpy(),
+        game_shots_df['COORDINATE_Y'].to_numpy(),
+        game_shots_df['SCORING_PLAY'].to_numpy(),
+        game_shots_df['SCORING_TEAM'].to_numpy()
+    )
+
+    assert has_path.any()
+    assert z.shape[1] == NUM_COORDINATES + 1
+    # the parabolas evaluate to zero at their roots up to rounding
+    np.testing.assert_allclose(z[:, 0], 0, atol=1e-9)
+
+@pytest.mark.parametrize('drag', [False, True])
+def test_physics_flight_follows_the_floor_point(drag, game_shots_df):
+    x, y, z, has_path = PhysicsShotModel(drag=drag).calculate_batch_paths(
+        game_shots_df['COORDINATE_X'].to_numpy(),
+        game_shots_df['COORDINATE_Y'].to_numpy(),
+        game_shots_df['SCORING_PLAY'].to_numpy(),
+        game_shots_df['SCORING_TEAM'].to_numpy()
+    )
+
+    # the release is straight above the floor point
+    np.testing.assert_allclose(z[has_path, 1], RELEASE_HEIGHT)
+    np.testing.assert_allclose(x[has_path, 1], x[has_path, 0])
+    np.testing.assert_allclose(y[has_path, 1], y[has_path, 0])
@@ -0,0 +1,44 @@
+import glob
+import os
+import threading
+
+import numpy as np
+
+from utils.basketballShot import BasketballShot
+from utils.shotPaths import ShotPaths
+from utils.trajectoryStore import TrajectoryStore
+
+def compute_paths(game_shots_df):
+    return BasketballShot.batch_paths(game_shots_df, normalized=True)
+
+def test_concurrent_saves(tmp_path, game_id, game_shots_df):
+    '''
+    Threads computing the same game at once all get its paths, and leave a single entry behind
+    '''
+    num_threads = 16
+    barrier = threading.Barrier(num_threads)
+    results, errors = [], []
+    entry_path = TrajectoryStore(cache_dir=str(tmp_path), compute_paths=compute_paths).get_path(game_id, game_shots_df)
+
+    def get_paths():
+        store = TrajectoryStore(cache_dir=str(tmp_path), compute_paths=compute_paths)
+        barrier.wait()
+        try:
+            results.append(store.get_paths(game_id, game_shots_df))
+        except Exception as e:
+            errors.append(e)
+
+    for _ in range(20):
+        for path in glob.glob(os.path.join(tmp_path, '*')):
+            os.remove(path)
+        threads = [threading.Thread(target=get_paths) for _ in range(num_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert os.listdir(tmp_path) == [os.path.basename(entry_path)]
+
+    stored = ShotPaths.load(entry_path)
+    np.testing.assert_array_equal(stored.coords_df['z'].to_numpy(), results[0].coords_df['z'].to_numpy())
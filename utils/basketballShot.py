@@ -1,13 +1,34 @@
 import numpy as np
 import pandas as pd
 
+from utils.courtCoordinates import CourtCoordinates
+from utils.shotPaths import ShotPaths
+from utils.stageTimer import record_measurements, timed_stage
+
+NUM_COORDINATES = 100
+HOOP_CYLINDER_RADIUS = 0.75
+
+# arc height guestimates per territory, the territories' distances come from the court (see get_shot_arc_heights)
+SHOT_ARC_HEIGHTS = {
+    'three_point': 17,    # beyond the three point arc
+    'mid_range': 15,      # beyond the free throw line
+    'paint': 13,          # roughly in the paint
+}
+
+SHOT_PATH_COLUMNS = ['shot_coord_index', 'x', 'y', 'z', 'line_id', 'description', 'shot_made', 'team']
+
 class BasketballShot:
-    def __init__(self, shot_start_x, shot_start_y, shot_id, play_description, shot_made, team):
-        self.hoop_loc_x = 25
+    '''
+    Estimates a shot's trajectory on a court, the court's size and hoop location come from its
+    CourtCoordinates (a men's ncaa court by default). The classmethods take the court the same way
+    '''
+    def __init__(self, shot_start_x, shot_start_y, shot_id, play_description, shot_made, team, court=None):
+        self.court = court if court is not None else CourtCoordinates()
+        self.hoop_loc_x = self.court.hoop_loc_x
         self.hoop_loc_y = None
-        self.hoop_loc_z = 10
-        self.hoop_baseline_offset = 4.25
-        self.num_coordinates = 100
+        self.hoop_loc_z = self.court.hoop_loc_z
+        self.hoop_baseline_offset = self.court.hoop_loc_y
+        self.num_coordinates = NUM_COORDINATES
         self.shot_start_x = shot_start_x
         self.shot_start_y = shot_start_y
         self.shot_vertex_z = 0
@@ -25,11 +46,12 @@ class BasketballShot:
         Adjust shot coordinates to align with court view and whether the shot was from the home/away team
         The home team will shoot against the right half-court and the away team will shoot against the left half-court
         '''
+        court_length, court_width = self.court.court_length, self.court.court_width
         if self.team == 'home':
-            self.shot_start_y = 94 - self.shot_start_y - self.hoop_baseline_offset
-            self.hoop_loc_y = 94 - self.hoop_baseline_offset
+            self.shot_start_y = court_length - self.shot_start_y - self.hoop_baseline_offset
+            self.hoop_loc_y = court_length - self.hoop_baseline_offset
         if self.team == 'away':
-            self.shot_start_x = 50 - self.shot_start_x
+            self.shot_start_x = court_width - self.shot_start_x
             self.shot_start_y = self.shot_start_y + self.hoop_baseline_offset
             self.hoop_loc_y = self.hoop_baseline_offset
 
@@ -37,7 +59,7 @@ class BasketballShot:
         '''
         Determine's if a shot is inside the hoop cylinder, as it is unrealisitic to draw a shot path if so 
         '''
-        if self.shot_distance <= 0.75:
+        if self.shot_distance <= HOOP_CYLINDER_RADIUS:
             self.shot_path_possible = False
 
     def __adjust_shot_calculate_perspective(self):
@@ -67,12 +89,20 @@ class BasketballShot:
         self.__calculate_shot_distance()
         self.__calculate_shot_possible()
 
-        if self.shot_distance >= 23:     # 3-point territory
-            self.shot_vertex_z = 17     
-        elif self.shot_distance >= 9:    # mid-range territory
-            self.shot_vertex_z = 15 
-        else:                            # roughly in the paint
-            self.shot_vertex_z = 13
+        shot_arc_heights = get_shot_arc_heights(self.court)
+        for min_shot_distance, shot_vertex_z in shot_arc_heights:
+            if self.shot_distance >= min_shot_distance:
+                self.shot_vertex_z = shot_vertex_z
+                break
+        else:
+            self.shot_vertex_z = shot_arc_heights[-1][1]
+
+    @staticmethod
+    def __calculate_distance(x1, y1, x2, y2):
+        '''
+        Calculates the euclidean distance between two arrays of points
+        '''
+        return np.sqrt(np.square(x2 - x1) + np.square(y2 - y1))
 
     @staticmethod
     def __calculate_shot_vertex_x_quadratic_coefficients(x1, y1, x2, y2, k):
@@ -193,3 +223,280 @@ class BasketballShot:
         self.shot_path_coordinates_df['team'] = self.team
 
         return self.shot_path_coordinates_df
+
+    @staticmethod
+    def adjust_shot_and_hoop_coordinates(shot_start_x, shot_start_y, team, court=None):
+        '''
+        Vectorized version of the home/away adjustment. Given arrays of raw shot coordinates and the
+        'home'/'away' team labels, returns the adjusted shot x, shot y and hoop y arrays
+        '''
+        court = court if court is not None else CourtCoordinates()
+        shot_start_x = np.asarray(shot_start_x, dtype=float)
+        shot_start_y = np.asarray(shot_start_y, dtype=float)
+        is_home = np.asarray(team) == 'home'
+        court_length, hoop_baseline_offset = court.court_length, court.hoop_loc_y
+
+        adjusted_x = np.where(is_home, shot_start_x, court.court_width - shot_start_x)
+        adjusted_y = np.where(is_home, court_length - shot_start_y - hoop_baseline_offset, shot_start_y + hoop_baseline_offset)
+        hoop_y = np.where(is_home, court_length - hoop_baseline_offset, hoop_baseline_offset)
+
+        return adjusted_x, adjusted_y, hoop_y
+
+    @classmethod
+    def get_shot_locations(cls, shots_df, fold=False, court=None):
+        '''
+        Returns the adjusted x and y start of every shot in a play by play dataframe.
+        With fold=True, shots on the near half are turned 180 degrees onto the far half
+        '''
+        court = court if court is not None else CourtCoordinates()
+        x, y, _ = cls.adjust_shot_and_hoop_coordinates(
+            shots_df['COORDINATE_X'].to_numpy(),
+            shots_df['COORDINATE_Y'].to_numpy(),
+            shots_df['SCORING_TEAM'].to_numpy(),
+            court=court
+        )
+
+        if fold:
+            near_half = y > court.court_length / 2
+            x = np.where(near_half, court.court_width - x, x)
+            y = np.where(near_half, court.court_length - y, y)
+
+        return x, y
+
+    @staticmethod
+    def calculate_shot_heights(shot_distance, court=None):
+        '''
+        Vectorized version of the arc height guestimate, given an array of shot distances
+        '''
+        shot_arc_heights = get_shot_arc_heights(court)
+        conditions = [shot_distance >= min_shot_distance for min_shot_distance, _ in shot_arc_heights]
+        heights = [shot_vertex_z for _, shot_vertex_z in shot_arc_heights]
+
+        return np.select(conditions, heights, default=shot_arc_heights[-1][1])
+
+    @staticmethod
+    def __linspace_rows(start, stop, num_coordinates):
+        '''
+        Row-wise np.linspace(start, stop, num_coordinates + 1), num_coordinates may differ per row and the
+        columns past a row's num_coordinates are left unused. np.linspace over arrays switches its rounding
+        when any row has a zero step, so the steps are computed here the same way a scalar np.linspace does
+        '''
+        step = (stop - start) / num_coordinates
+        rows = np.arange(num_coordinates.max(initial=0) + 1) * step[:, None] + start[:, None]
+        rows[np.arange(len(rows)), num_coordinates] = stop
+
+        return rows
+
+    @classmethod
+    def __calculate_batch_parabolas(cls, shot_start_x, shot_start_y, team, court):
+        '''
+        Solves the 2D parabola of every shot, as if every shot was made.
+        Returns a dictionary of per shot arrays
+        '''
+        start_x, start_y, hoop_y = cls.adjust_shot_and_hoop_coordinates(shot_start_x, shot_start_y, team, court=court)
+        hoop_x, hoop_z = court.hoop_loc_x, court.hoop_loc_z
+
+        shot_distance = cls.__calculate_distance(start_x, start_y, hoop_x, hoop_y)
+        shot_vertex_z = cls.calculate_shot_heights(shot_distance, court=court)
+        side_on = start_x == hoop_x
+
+        # the parabola is solved along x by default, and along y for shots directly inline with the hoop
+        parabola_start = np.where(side_on, start_y, start_x)
+        parabola_end = np.where(side_on, hoop_y, hoop_x)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            a, b, c = cls.__calculate_shot_vertex_x_quadratic_coefficients(parabola_start, 0, parabola_end, hoop_z, shot_vertex_z)
+            shot_vertex_h1, shot_vertex_h2 = cls.__calculate_quadratic_values(a, b, c)
+
+            # choose the vertex h that lies between the shot and hoop
+            h1_between = ((parabola_start <= shot_vertex_h1) & (shot_vertex_h1 <= parabola_end)) | \
+                         ((parabola_end <= shot_vertex_h1) & (shot_vertex_h1 <= parabola_start))
+            shot_vertex_h = np.where(h1_between, shot_vertex_h1, shot_vertex_h2)
+            coefficient_a = cls.__calculate_2d_parabola_coefficient_a(parabola_start, 0, shot_vertex_h, shot_vertex_z)
+
+        return {
+            'start_x': start_x,
+            'start_y': start_y,
+            'hoop_x': hoop_x,
+            'hoop_y': hoop_y,
+            'shot_distance': shot_distance,
+            'shot_vertex_z': shot_vertex_z,
+            'side_on': side_on,
+            'parabola_start': parabola_start,
+            'parabola_end': parabola_end,
+            'shot_vertex_h': shot_vertex_h,
+            'coefficient_a': coefficient_a
+        }
+
+    @classmethod
+    def calculate_batch_paths(cls, shot_start_x, shot_start_y, shot_made, team, num_coordinates=NUM_COORDINATES, court=None):
+        '''
+        Computes the shot paths of every shot in one numpy pass.
+        num_coordinates is either one value for every shot or an array with a value per shot.
+        Returns a tuple of (x, y, z, has_path) where x, y and z are (N x max(num_coordinates) + 1) arrays and has_path
+        flags the shots that get a full path. Shots without a path (missed or inside the hoop cylinder) only
+        have a meaningful first column, the shot start coordinate
+        '''
+        shot_made = np.asarray(shot_made, dtype=bool)
+        court = court if court is not None else CourtCoordinates()
+        parabolas = cls.__calculate_batch_parabolas(shot_start_x, shot_start_y, team, court)
+        start_x, start_y, side_on = parabolas['start_x'], parabolas['start_y'], parabolas['side_on']
+        shot_vertex_h, shot_vertex_z = parabolas['shot_vertex_h'], parabolas['shot_vertex_z']
+        num_coordinates = np.broadcast_to(np.asarray(num_coordinates, dtype=int), start_x.shape)
+
+        has_path = shot_made & (parabolas['shot_distance'] > HOOP_CYLINDER_RADIUS)
+
+        with np.errstate(invalid='ignore'):
+            along = cls.__linspace_rows(parabolas['parabola_start'], parabolas['parabola_end'], num_coordinates)
+            z = parabolas['coefficient_a'][:, None] * np.square(along - shot_vertex_h[:, None]) + shot_vertex_z[:, None]
+
+        index = np.arange(along.shape[1])
+
+        # the coordinate not used to solve the parabola moves linearly from the shot to the hoop
+        across_start = np.where(side_on, start_x, start_y)
+        across_end = np.where(side_on, parabolas['hoop_x'], parabolas['hoop_y'])
+        across = across_start[:, None] + ((across_end - across_start) / num_coordinates)[:, None] * index
+
+        x = np.where(side_on[:, None], across, along)
+        y = np.where(side_on[:, None], along, across)
+
+        # shots without a path stay at their start coordinate on the floor
+        x[~has_path, 0] = start_x[~has_path]
+        y[~has_path, 0] = start_y[~has_path]
+        z[~has_path, 0] = 0
+
+        return x, y, z, has_path
+
+    @classmethod
+    def calculate_lod_num_coordinates(cls, shot_start_x, shot_start_y, shot_made, team, tolerance=0.05, point_budget=None,
+                                      min_coordinates=4, max_coordinates=NUM_COORDINATES, court=None):
+        '''
+        Picks the number of coordinates of every shot path from its length and curvature.
+        A parabola z = a(s - h)**2 sampled in n equal steps over a run of length L strays at most
+        |a| * L**2 / (4 * n**2) from its chords, so n is the smallest count keeping that within tolerance (in feet).
+        With a point_budget, the tolerance is instead chosen so the paths' total number of points fits the budget
+        '''
+        court = court if court is not None else CourtCoordinates()
+        parabolas = cls.__calculate_batch_parabolas(shot_start_x, shot_start_y, team, court)
+        has_path = np.asarray(shot_made, dtype=bool) & (parabolas['shot_distance'] > HOOP_CYLINDER_RADIUS)
+        run = np.abs(parabolas['parabola_end'] - parabolas['parabola_start'])
+        curvature = np.nan_to_num(np.abs(parabolas['coefficient_a']), posinf=0)
+        chord_scale = run * np.sqrt(curvature / 4)
+
+        def get_num_coordinates(tolerance):
+            return np.clip(np.ceil(chord_scale / np.sqrt(tolerance)), min_coordinates, max_coordinates).astype(int)
+
+        if point_budget is not None:
+            # bisect the tolerance on a log scale, the point count only drops as the tolerance grows
+            low, high = -8.0, 4.0
+            for _ in range(40):
+                middle = (low + high) / 2
+                if np.where(has_path, get_num_coordinates(10 ** middle) + 1, 1).sum() > point_budget:
+                    low = middle
+                else:
+                    high = middle
+            tolerance = 10 ** high
+
+        return get_num_coordinates(tolerance)
+
+    @classmethod
+    @timed_stage('batch_paths')
+    def batch_paths(cls, shots_df, num_coordinates=NUM_COORDINATES, tolerance=None, point_budget=None, dtype=None, normalized=False, court=None):
+        '''
+        Returns the estimated shot trajectories of every shot in a play by play dataframe
+        (COORDINATE_X, COORDINATE_Y, SEQUENCE_NUMBER, TEXT, SCORING_PLAY, SCORING_TEAM columns).
+        By default the output matches concatenating get_shot_path_coordinates() of each row (up to floating point
+        rounding), without the per row loop.
+        Passing a tolerance (in feet) or a point_budget for all the paths switches to level of detail sampling,
+        where each shot gets up to num_coordinates coordinates depending on its length and curvature.
+        dtype (e.g. np.float32) sets the coordinate type, and court the CourtCoordinates the shots are on.
+        With normalized=True a ShotPaths is returned instead, with the metadata stored once per shot
+        '''
+        if shots_df.empty and not normalized:
+            return pd.DataFrame(columns=SHOT_PATH_COLUMNS)
+
+        shot_start_x = shots_df['COORDINATE_X'].to_numpy()
+        shot_start_y = shots_df['COORDINATE_Y'].to_numpy()
+        team = shots_df['SCORING_TEAM'].to_numpy()
+
+        if tolerance is not None or point_budget is not None:
+            num_coordinates = cls.calculate_lod_num_coordinates(
+                shot_start_x, shot_start_y, shots_df['SCORING_PLAY'].to_numpy(), team,
+                tolerance=tolerance if tolerance is not None else 0.05,
+                point_budget=point_budget,
+                max_coordinates=num_coordinates,
+                court=court
+            )
+
+        x, y, z, has_path = cls.calculate_batch_paths(
+            shot_start_x,
+            shot_start_y,
+            shots_df['SCORING_PLAY'].to_numpy(),
+            team,
+            num_coordinates=num_coordinates,
+            court=court
+        )
+
+        record_measurements(rows=len(shots_df), points=int(np.sum(np.where(has_path, np.asarray(num_coordinates) + 1, 1))))
+
+        if normalized:
+            return ShotPaths.from_arrays(shots_df, x, y, z, has_path, num_coordinates=num_coordinates)
+
+        if dtype is not None:
+            x, y, z = x.astype(dtype), y.astype(dtype), z.astype(dtype)
+
+        return cls.paths_to_frame(shots_df, x, y, z, has_path, num_coordinates=num_coordinates)
+
+    @staticmethod
+    def paths_to_frame(shots_df, x, y, z, has_path, num_coordinates=None) -> pd.DataFrame:
+        '''
+        Flattens (N x num_coordinates + 1) path arrays into the get_shot_path_coordinates() dataframe layout.
+        Made shots keep every coordinate of their path, the rest keep their start coordinate only.
+        num_coordinates, one value or one per shot, defaults to the width of the arrays
+        '''
+        if num_coordinates is None:
+            num_coordinates = x.shape[1] - 1
+
+        num_points = np.where(has_path, np.asarray(num_coordinates) + 1, 1)
+        keep = np.arange(x.shape[1]) < num_points[:, None]
+        shot_position = np.repeat(np.arange(len(shots_df)), num_points)
+        shot_coord_index = np.nonzero(keep)[1]
+
+        shot_made = np.where(shots_df['SCORING_PLAY'].to_numpy(dtype=bool), 'made', 'missed')
+
+        shot_paths_df = pd.DataFrame({
+            'shot_coord_index': shot_coord_index,
+            'x': x[keep],
+            'y': y[keep],
+            'z': z[keep],
+            'line_id': shots_df['SEQUENCE_NUMBER'].to_numpy()[shot_position],
+            'description': shots_df['TEXT'].to_numpy()[shot_position],
+            'shot_made': shot_made[shot_position],
+            'team': shots_df['SCORING_TEAM'].to_numpy()[shot_position]
+        }, index=shot_coord_index)
+
+        return shot_paths_df
+
+def get_shot_arc_heights(court=None):
+    '''
+    Returns the (minimum shot distance, arc height) guestimates of a court, checked in order.
+    Three point territory starts at the court's three point arc and mid-range at its free throw line
+    '''
+    court = court if court is not None else CourtCoordinates()
+
+    return (
+        (court.three_arc_distance, SHOT_ARC_HEIGHTS['three_point']),
+        (court.free_throw_distance - court.hoop_loc_y, SHOT_ARC_HEIGHTS['mid_range']),
+        (0, SHOT_ARC_HEIGHTS['paint']),
+    )
+
+def get_geometry_parameters():
+    '''
+    Returns every parameter that shapes a shot path, so cached paths can be invalidated when one changes.
+    The hoop location and the arc height territories are part of the court dimensions
+    '''
+    return {
+        'hoop_cylinder_radius': HOOP_CYLINDER_RADIUS,
+        'num_coordinates': NUM_COORDINATES,
+        'shot_arc_heights': SHOT_ARC_HEIGHTS,
+    }
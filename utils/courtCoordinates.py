@@ -1,26 +1,97 @@
-import pandas as pd 
-import numpy as np 
+import pandas as pd
+import numpy as np
+
+from utils.stageTimer import record_measurements, timed_stage
+
+# court dimensions in feet
+COURT_DIMENSIONS = {
+    # according to https://modutile.com/basketball-half-court-dimensions/#
+    'ncaa_men': {
+        'court_length': 94,                # the court is 94 feet long
+        'court_width': 50,                 # the court is 50 feet wide
+        'hoop_loc_x': 25,                  # we will build a court with the center, length-wise, being right at 0 on the x-axis
+        'hoop_loc_y': 4.25,                # the center of the hoop is 63 inches from the baseline
+        'hoop_loc_z': 10,                  # the hoop is 10 feet off the ground
+        'hoop_radius': .75,
+        'three_arc_distance': 22.146,      # the NCAA men's three arc is 22ft and 1.75in from the center of the hoop
+        'three_straight_distance': 21,     # the NCAA men's three straight section is 21ft 8in from the center of the hoop
+        'three_straight_length': 8.89,     # the NCAA men's three straight section length is 8ft and 10.75in
+        'backboard_width': 6,              # backboard is 6ft wide
+        'backboard_height': 4,             # backboard is 4ft tall
+        'backboard_baseline_offset': 3,    # backboard is 3ft from the baseline
+        'backboard_floor_offset': 9,       # backboard is 9ft from the floor
+        'lane_width': 12,                  # the lane (the paint) is 12ft wide
+        'free_throw_distance': 19,         # the free throw line is 19ft from the baseline
+        'restricted_area_radius': 4,       # the restricted area arc is 4ft from the center of the hoop
+    },
+    # the NCAA women's game moved to the men's three point distance in 2021-22, the court is otherwise the same
+    'ncaa_women': {
+        'court_length': 94,
+        'court_width': 50,
+        'hoop_loc_x': 25,
+        'hoop_loc_y': 4.25,
+        'hoop_loc_z': 10,
+        'hoop_radius': .75,
+        'three_arc_distance': 22.146,
+        'three_straight_distance': 21,
+        'three_straight_length': 8.89,
+        'backboard_width': 6,
+        'backboard_height': 4,
+        'backboard_baseline_offset': 3,
+        'backboard_floor_offset': 9,
+        'lane_width': 12,
+        'free_throw_distance': 19,
+        'restricted_area_radius': 4,
+    },
+    'nba': {
+        'court_length': 94,
+        'court_width': 50,
+        'hoop_loc_x': 25,
+        'hoop_loc_y': 5.25,                # the center of the hoop is 63 inches from the baseline
+        'hoop_loc_z': 10,
+        'hoop_radius': .75,
+        'three_arc_distance': 23.75,       # the NBA three arc is 23ft 9in from the center of the hoop
+        'three_straight_distance': 22,     # the NBA corner three is 22ft from the center of the hoop
+        'three_straight_length': 14,       # the NBA corner three runs 14ft out from the baseline
+        'backboard_width': 6,
+        'backboard_height': 4,
+        'backboard_baseline_offset': 4,    # backboard is 4ft from the baseline
+        'backboard_floor_offset': 9,
+        'lane_width': 16,                  # the NBA lane is 16ft wide
+        'free_throw_distance': 19,
+        'restricted_area_radius': 4,
+    },
+}
 
 class CourtCoordinates:
     '''
-    Stores court dimensions and calculates the (x,y,z) coordinates of the outside perimeter, 
+    Stores court dimensions and calculates the (x,y,z) coordinates of the outside perimeter,
     three point line, backboard, and hoop.
-    The default dimensions of a men's ncaa court according to https://modutile.com/basketball-half-court-dimensions/#
+    The dimensions are one of the COURT_DIMENSIONS presets, a men's ncaa court by default.
+    The court lines of each set of dimensions are only calculated once per process.
     '''
-    def __init__(self):
-        self.court_length = 94                 # the court is 94 feet long
-        self.court_width = 50                  # the court is 50 feet wide
-        self.hoop_loc_x = 25                   # we will build a court with the center, length-wise, being right at 0 on the x-axis
-        self.hoop_loc_y = 4.25                 # the center of the hoop is 63 inches from the baseline
-        self.hoop_loc_z = 10                   # the hoop is 10 feet off the ground
-        self.hoop_radius = .75
-        self.three_arc_distance = 22.146       # the NCAA men's three arc is 22ft and 1.75in from the center of the hoop
-        self.three_straight_distance = 21      # the NCAA men's three straight section is 21ft 8in from the center of the hoop
-        self.three_straight_length = 8.89      # the NCAA men's three straight section length is 8ft and 10.75in
-        self.backboard_width = 6               # backboard is 6ft wide
-        self.backboard_height = 4              # backboard is 4ft tall
-        self.backboard_baseline_offset = 3     # backboard is 3ft from the baseline
-        self.backboard_floor_offset = 9        # backboard is 9ft from the floor
+    _court_lines_cache = {}
+
+    def __init__(self, dimensions='ncaa_men'):
+        if isinstance(dimensions, str):
+            dimensions = COURT_DIMENSIONS[dimensions]
+
+        self.court_length = dimensions['court_length']
+        self.court_width = dimensions['court_width']
+        self.hoop_loc_x = dimensions['hoop_loc_x']
+        self.hoop_loc_y = dimensions['hoop_loc_y']
+        self.hoop_loc_z = dimensions['hoop_loc_z']
+        self.hoop_radius = dimensions['hoop_radius']
+        self.three_arc_distance = dimensions['three_arc_distance']
+        self.three_straight_distance = dimensions['three_straight_distance']
+        self.three_straight_length = dimensions['three_straight_length']
+        self.backboard_width = dimensions['backboard_width']
+        self.backboard_height = dimensions['backboard_height']
+        self.backboard_baseline_offset = dimensions['backboard_baseline_offset']
+        self.backboard_floor_offset = dimensions['backboard_floor_offset']
+        self.lane_width = dimensions['lane_width']
+        self.free_throw_distance = dimensions['free_throw_distance']
+        self.restricted_area_radius = dimensions['restricted_area_radius']
 
     @staticmethod
     def calculate_quadratic_values(a, b, c):
@@ -33,6 +104,18 @@ class CourtCoordinates:
 
         return x1, x2
 
+    def get_dimensions(self):
+        '''
+        Returns the court dimensions as a dictionary
+        '''
+        return {key: getattr(self, key) for key in COURT_DIMENSIONS['ncaa_men']}
+
+    def get_dimensions_key(self):
+        '''
+        Returns a hashable key identifying the court dimensions
+        '''
+        return tuple(sorted(self.get_dimensions().items()))
+
     def __get_court_perimeter_coordinates(self):
         '''
         Returns coordinates of full court perimeter lines. A court that is 50 feet wide and 94 feet long
@@ -41,37 +124,29 @@ class CourtCoordinates:
         width = self.court_width
         length = self.court_length
         court_perimeter_bounds = [
-            [0, 0, 0], 
-            [width, 0, 0], 
-            [width, length, 0], 
-            [0, length, 0], 
+            [0, 0, 0],
+            [width, 0, 0],
+            [width, length, 0],
+            [0, length, 0],
             [0, 0, 0]
         ]
 
-        court_df = pd.DataFrame(court_perimeter_bounds, columns=['x','y','z'])
-        court_df['line_group'] = 'outside_perimeter'
-        court_df['color'] = 'court'
-        
-        return court_df
-    
+        return np.array(court_perimeter_bounds, dtype=float)
+
     def __get_half_court_coordinates(self):
         '''
         Returns coordinates for the half court line.
         '''
-        width = self.court_width 
+        width = self.court_width
         half_length = self.court_length / 2
         half_court_bounds = [[0, half_length, 0], [width, half_length, 0]]
 
-        half_df = pd.DataFrame(half_court_bounds, columns=['x','y','z'])
-        half_df['line_group'] = 'half_court'
-        half_df['color'] = 'court'
-
-        return half_df
+        return np.array(half_court_bounds, dtype=float)
 
     def __get_backboard_coordinates(self, loc):
         '''
         Returns coordinates of the backboard on both ends of the court
-        A backboard is 6 feet wide, 4 feet tall 
+        A backboard is 6 feet wide, 4 feet tall
         '''
 
         backboard_start = (self.court_width/2)  -  (self.backboard_width/2)
@@ -84,25 +159,21 @@ class CourtCoordinates:
             offset = self.court_length - self.backboard_baseline_offset
 
         backboard_bounds = [
-            [backboard_start, offset, floor_offset], 
-            [backboard_start, offset, floor_offset + height], 
-            [backboard_end, offset, floor_offset + height], 
-            [backboard_end, offset, floor_offset], 
+            [backboard_start, offset, floor_offset],
+            [backboard_start, offset, floor_offset + height],
+            [backboard_end, offset, floor_offset + height],
+            [backboard_end, offset, floor_offset],
             [backboard_start, offset, floor_offset]
         ]
 
-        backboard_df = pd.DataFrame(backboard_bounds, columns=['x','y','z'])
-        backboard_df['line_group'] = f'{loc}_backboard'
-        backboard_df['color'] = 'court'
+        return np.array(backboard_bounds, dtype=float)
 
-        return  backboard_df
-    
     def __get_three_point_coordinates(self, loc):
         '''
         Returns coordinates of the three point line on both ends of the court
         Given that the ncaa men's three point line is 22ft and 1.5in from the center of the hoop
         '''
-        
+
         # init values
         hoop_loc_x, hoop_loc_y = self.hoop_loc_x, self.hoop_loc_y
         strt_dst_start = (self.court_width/2) - self.three_straight_distance
@@ -115,52 +186,40 @@ class CourtCoordinates:
             [strt_dst_start,strt_len,0]
         ]
         end_straight = [
-            [strt_dst_end,strt_len,0], 
+            [strt_dst_end,strt_len,0],
             [strt_dst_end,0,0]
         ]
-        line_coordinates = []
 
-        if loc == 'near': 
+        if loc == 'near':
             crt_len = self.court_length
             hoop_loc_y = crt_len - hoop_loc_y
             start_straight = [[strt_dst_start,crt_len,0],[strt_dst_start,crt_len-strt_len,0]]
             end_straight = [[strt_dst_end,crt_len-strt_len,0], [strt_dst_end,crt_len,0]]
 
-        # drawing the three point line
-        line_coordinates.extend(start_straight)
-        
+        # drawing the three point arc, solving for every point at once
         a = 1
         b = -2 * hoop_loc_y
-        d = arc_dst 
-        for x_coord in np.linspace(int(strt_dst_start), int(strt_dst_end), 100):
-            c = hoop_loc_y ** 2 + (x_coord - 25) ** 2 - (d) ** 2
+        d = arc_dst
+        x_coords = np.linspace(int(strt_dst_start), int(strt_dst_end), 100)
+        c = hoop_loc_y ** 2 + (x_coords - hoop_loc_x) ** 2 - (d) ** 2
 
-            y1, y2 = self.calculate_quadratic_values(a, b, c)
-            if loc == 'far':
-                y_coord = y1
-            if loc == 'near':
-                y_coord = y2
-        
-            line_coordinates.append([x_coord, y_coord, 0])
-
-        line_coordinates.extend(end_straight)
+        y1, y2 = self.calculate_quadratic_values(a, b, c)
+        if loc == 'far':
+            y_coords = y1
+        if loc == 'near':
+            y_coords = y2
 
-        far_three_df = pd.DataFrame(line_coordinates, columns=['x', 'y', 'z'])
-        far_three_df['line_group'] = f'{loc}_three'
-        far_three_df['color'] = 'court'
+        arc = np.column_stack([x_coords, y_coords, np.zeros_like(x_coords)])
 
-        return far_three_df
+        return np.concatenate([start_straight, arc, end_straight])
 
     def __get_hoop_coordinates(self, loc):
         '''
         Returns the hoop coordinates of the far/near hoop
         '''
-        hoop_coordinates_top_half = []
-        hoop_coordinates_bottom_half = []
-
         hoop_loc_x, hoop_loc_y, hoop_loc_z = (self.hoop_loc_x, self.hoop_loc_y, self.hoop_loc_z)
 
-        if loc == 'near': 
+        if loc == 'near':
             hoop_loc_y = self.court_length - hoop_loc_y
 
         hoop_radius = self.hoop_radius
@@ -169,34 +228,82 @@ class CourtCoordinates:
 
         a = 1
         b = -2 * hoop_loc_y
-        for hoop_coord_x in np.arange(hoop_min_x, hoop_max_x + hoop_step/2, hoop_step):
-            c = hoop_loc_y ** 2 + (hoop_loc_x - round(hoop_coord_x,2)) ** 2 - hoop_radius ** 2
-            hoop_coord_y1, hoop_coord_y2 = self.calculate_quadratic_values(a, b, c)
+        hoop_coords_x = np.arange(hoop_min_x, hoop_max_x + hoop_step/2, hoop_step)
+        c = hoop_loc_y ** 2 + (hoop_loc_x - np.round(hoop_coords_x, 2)) ** 2 - hoop_radius ** 2
+        hoop_coords_y1, hoop_coords_y2 = self.calculate_quadratic_values(a, b, c)
+        hoop_coords_z = np.full_like(hoop_coords_x, hoop_loc_z)
+
+        # top half of the hoop, then the bottom half back to the start
+        hoop_coordinates_top_half = np.column_stack([hoop_coords_x, hoop_coords_y1, hoop_coords_z])
+        hoop_coordinates_bottom_half = np.column_stack([hoop_coords_x, hoop_coords_y2, hoop_coords_z])
 
-            hoop_coordinates_top_half.append([hoop_coord_x, hoop_coord_y1, hoop_loc_z])
-            hoop_coordinates_bottom_half.append([hoop_coord_x, hoop_coord_y2, hoop_loc_z])
+        return np.concatenate([hoop_coordinates_top_half, hoop_coordinates_bottom_half[::-1]])
+
+    def __calculate_court_lines(self):
+        '''
+        Calculates every court line and assembles them into a single DataFrame
+        '''
+        court_lines = [
+            (self.__get_court_perimeter_coordinates(), 'outside_perimeter', 'court'),
+            (self.__get_half_court_coordinates(), 'half_court', 'court'),
+            (self.__get_backboard_coordinates('near'), 'near_backboard', 'court'),
+            (self.__get_backboard_coordinates('far'), 'far_backboard', 'court'),
+            (self.__get_hoop_coordinates('near'), 'near_hoop', 'hoop'),
+            (self.__get_hoop_coordinates('far'), 'far_hoop', 'hoop'),
+            (self.__get_three_point_coordinates('near'), 'near_three', 'court'),
+            (self.__get_three_point_coordinates('far'), 'far_three', 'court'),
+        ]
 
-        hoop_coordinates_df = pd.DataFrame(hoop_coordinates_top_half + hoop_coordinates_bottom_half[::-1], columns=['x','y','z'])
-        hoop_coordinates_df['line_group'] = f'{loc}_hoop'
-        hoop_coordinates_df['color'] = 'hoop'
-        
-        return hoop_coordinates_df
+        coordinates = np.concatenate([line for line, _, _ in court_lines])
+        line_lengths = [len(line) for line, _, _ in court_lines]
+        court_lines_df = pd.DataFrame(coordinates, columns=['x', 'y', 'z'])
+        court_lines_df['line_group'] = np.repeat([line_group for _, line_group, _ in court_lines], line_lengths)
+        court_lines_df['color'] = np.repeat([color for _, _, color in court_lines], line_lengths)
 
+        return court_lines_df
 
+    @timed_stage('court_lines')
     def get_court_lines(self):
         '''
-        Returns a concatenated DataFrame of all the court coordinates 
+        Returns a DataFrame of all the court coordinates.
+        The DataFrame is shared by every court with the same dimensions, treat it as read only
+        '''
+        key = self.get_dimensions_key()
+        record_measurements(cache_hit=key in self._court_lines_cache)
+        if key not in self._court_lines_cache:
+            self._court_lines_cache[key] = self.__calculate_court_lines()
+
+        return self._court_lines_cache[key]
+
+    def save_court_lines(self, path):
+        '''
+        Writes the court lines to a prebuilt .parquet or .npz asset, that load_court_lines() can read back
+        at startup instead of calculating the lines
         '''
+        court_lines_df = self.get_court_lines()
+
+        if str(path).endswith('.parquet'):
+            court_lines_df.to_parquet(path, index=False)
+        else:
+            np.savez(
+                path,
+                coordinates=court_lines_df[['x', 'y', 'z']].to_numpy(),
+                line_group=court_lines_df['line_group'].to_numpy(dtype=str),
+                color=court_lines_df['color'].to_numpy(dtype=str)
+            )
 
-        court_df = self.__get_court_perimeter_coordinates()
-        half_df = self.__get_half_court_coordinates()
-        backboard_home = self.__get_backboard_coordinates('near')
-        backboard_away = self.__get_backboard_coordinates('far')
-        hoop_away = self.__get_hoop_coordinates('near')
-        hoop_home = self.__get_hoop_coordinates('far')
-        three_home = self.__get_three_point_coordinates('near')
-        three_away = self.__get_three_point_coordinates('far')
+    def load_court_lines(self, path):
+        '''
+        Reads court lines written by save_court_lines() into the cache for this court's dimensions
+        '''
+        if str(path).endswith('.parquet'):
+            court_lines_df = pd.read_parquet(path)
+        else:
+            with np.load(path) as asset:
+                court_lines_df = pd.DataFrame(asset['coordinates'], columns=['x', 'y', 'z'])
+                court_lines_df['line_group'] = asset['line_group']
+                court_lines_df['color'] = asset['color']
 
-        court_lines_df = pd.concat([court_df, half_df, backboard_home, backboard_away, hoop_away, hoop_home, three_home, three_away])
+        self._court_lines_cache[self.get_dimensions_key()] = court_lines_df
 
         return court_lines_df
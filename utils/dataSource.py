@@ -0,0 +1,290 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# shots of a single game, game_id is bound as a query parameter
+PLAY_BY_PLAY_QUERY = """
+    SELECT  sequence_number,
+            coordinate_x,
+            coordinate_y,
+            team_id,
+            text,
+            scoring_play,
+            case
+                when team_id = home_team_id
+                    then 'home'
+                else 'away'
+            end as scoring_team,
+            game_id
+    FROM    play_by_play
+    WHERE   game_id = ?
+    AND     shooting_play
+    AND     score_value != 1  -- shot charts typically do not include free throws
+"""
+
+# shots of a single game after the last one already seen, for live games
+NEW_PLAY_BY_PLAY_QUERY = PLAY_BY_PLAY_QUERY + """    AND     sequence_number > ?
+    ORDER BY sequence_number
+"""
+
+SCHEDULE_QUERY = """
+    select  concat(away_display_name_short, ' @ ', home_display_name_short, ' - ', notes_headline) as game,
+            game_id,
+            home_color,
+            away_color,
+            home_display_name_short as home_team,
+            away_display_name_short as away_team
+    from    schedule
+    order by game_id desc
+"""
+
+PLAY_BY_PLAY_COLUMNS = ['SEQUENCE_NUMBER', 'COORDINATE_X', 'COORDINATE_Y', 'TEAM_ID', 'TEXT', 'SCORING_PLAY', 'SCORING_TEAM', 'GAME_ID']
+
+class SnowflakeDataSource:
+    '''
+    Reads the schedule and play by play tables through a Snowpark session.
+    Given create_session instead of a session, the connection is only opened by the first query
+    '''
+    def __init__(self, session=None, create_session=None):
+        if session is None and create_session is None:
+            raise ValueError('either session or create_session is required')
+
+        self.create_session = create_session
+        self.__session = session
+        self.__lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self.__lock:
+            if self.__session is None:
+                self.__session = self.create_session()
+
+        return self.__session
+
+    def get_schedule(self) -> pd.DataFrame:
+        '''
+        Returns every game with its display name and team colors, most recent game first
+        '''
+        return self.session.sql(SCHEDULE_QUERY).to_pandas()
+
+    def get_game_shots(self, game_id) -> pd.DataFrame:
+        '''
+        Returns the shots of a single game
+        '''
+        return self.session.sql(PLAY_BY_PLAY_QUERY, params=[game_id]).to_pandas()
+
+    def get_new_game_shots(self, game_id, after_sequence_number) -> pd.DataFrame:
+        '''
+        Returns the shots of a single game with a SEQUENCE_NUMBER above after_sequence_number
+        '''
+        return self.session.sql(NEW_PLAY_BY_PLAY_QUERY, params=[game_id, after_sequence_number]).to_pandas()
+
+class LocalDataSource:
+    '''
+    Reads the schedule and play by play data from the csv files in the static folder, without a Snowflake account.
+    The csv files are converted once to typed Parquet files (int32 ids, bool flags, categorical team columns),
+    which are then read through memory mapped Arrow with the game_id filter pushed down to the Parquet reader.
+    Requires pyarrow.
+    '''
+    def __init__(self, play_by_play_csv='static/sample.csv', schedule_csv='static/sample_schedule.csv', parquet_dir='static/parquet'):
+        self.play_by_play_csv = play_by_play_csv
+        self.schedule_csv = schedule_csv
+        self.play_by_play_parquet = os.path.join(parquet_dir, 'play_by_play.parquet')
+        self.schedule_parquet = os.path.join(parquet_dir, 'schedule.parquet')
+        self.parquet_dir = parquet_dir
+
+    @staticmethod
+    def __is_stale(source_path, target_path):
+        '''
+        Whether target_path is missing or older than the file it was converted from
+        '''
+        return not os.path.exists(target_path) or os.path.getmtime(target_path) < os.path.getmtime(source_path)
+
+    @staticmethod
+    def __write_parquet(df, path, **kwargs):
+        '''
+        Writes df to path through a temporary file of its own, so concurrent conversions never
+        write to the same file and readers only ever see a complete file
+        '''
+        temporary_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            df.to_parquet(temporary_path, **kwargs)
+            os.replace(temporary_path, path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def __convert_play_by_play(self):
+        '''
+        Converts the play by play csv to Parquet with compact dtypes, sorted by game so the
+        row group statistics let the reader skip other games
+        '''
+        play_by_play_df = pd.read_csv(self.play_by_play_csv, index_col=0)
+        play_by_play_df = play_by_play_df.astype({
+            'game_id': 'int32',
+            'score_value': 'int8',
+            'shooting_play': 'bool',
+            'sequence_number': 'int32',
+            'coordinate_x': 'float32',
+            'coordinate_y': 'float32',
+            'team_id': 'Int32',
+            'scoring_play': 'bool',
+            'away_team_id': 'int32',
+            'home_team_id': 'int32'
+        })
+        play_by_play_df = play_by_play_df.sort_values(['game_id', 'sequence_number'])
+        self.__write_parquet(play_by_play_df, self.play_by_play_parquet, index=False, row_group_size=10_000)
+
+    def __convert_schedule(self):
+        '''
+        Converts the schedule csv to Parquet with categorical team columns
+        '''
+        schedule_df = pd.read_csv(self.schedule_csv, index_col=0)
+        schedule_df['game_id'] = schedule_df['game_id'].astype('int32')
+        for column in ['notes_headline', 'away_short_display_name', 'home_short_display_name', 'away_color', 'home_color']:
+            schedule_df[column] = schedule_df[column].astype('category')
+
+        self.__write_parquet(schedule_df, self.schedule_parquet, index=False)
+
+    def convert(self, force=False):
+        '''
+        Writes the Parquet files, if they are missing or older than the csv files
+        '''
+        os.makedirs(self.parquet_dir, exist_ok=True)
+
+        if force or self.__is_stale(self.play_by_play_csv, self.play_by_play_parquet):
+            self.__convert_play_by_play()
+        if force or self.__is_stale(self.schedule_csv, self.schedule_parquet):
+            self.__convert_schedule()
+
+    def get_schedule(self) -> pd.DataFrame:
+        '''
+        Returns every game with its display name and team colors, most recent game first
+        '''
+        import pyarrow.parquet as pq
+
+        self.convert()
+        schedule_df = pq.read_table(self.schedule_parquet, memory_map=True).to_pandas()
+
+        game = (
+            schedule_df['away_short_display_name'].astype(str) + ' @ ' +
+            schedule_df['home_short_display_name'].astype(str) + ' - ' +
+            schedule_df['notes_headline'].astype(str)
+        )
+        schedule_df = pd.DataFrame({
+            'GAME': game,
+            'GAME_ID': schedule_df['game_id'],
+            'HOME_COLOR': ('#' + schedule_df['home_color'].astype(str)).astype('category'),
+            'AWAY_COLOR': ('#' + schedule_df['away_color'].astype(str)).astype('category'),
+            'HOME_TEAM': schedule_df['home_short_display_name'],
+            'AWAY_TEAM': schedule_df['away_short_display_name']
+        })
+
+        return schedule_df.sort_values('GAME_ID', ascending=False, ignore_index=True)
+
+    def read_shots(self, filters=None) -> pd.DataFrame:
+        '''
+        Returns the shooting plays matching the optional Parquet filters, in the play by play query's layout
+        '''
+        import pyarrow.parquet as pq
+
+        self.convert()
+        # the play by play query's WHERE clause, pushed down to the reader
+        shot_filters = [('shooting_play', '=', True), ('score_value', '!=', 1)] + list(filters or [])
+        columns = ['sequence_number', 'coordinate_x', 'coordinate_y', 'team_id', 'text', 'scoring_play', 'home_team_id', 'game_id']
+        shots_df = pq.read_table(self.play_by_play_parquet, columns=columns, filters=shot_filters, memory_map=True).to_pandas()
+
+        shots_df['scoring_team'] = pd.Categorical(
+            np.where(shots_df['team_id'].eq(shots_df['home_team_id']).fillna(False), 'home', 'away'),
+            categories=['home', 'away']
+        )
+        shots_df.columns = shots_df.columns.str.upper()
+
+        return shots_df[PLAY_BY_PLAY_COLUMNS].reset_index(drop=True)
+
+    def get_game_shots(self, game_id) -> pd.DataFrame:
+        '''
+        Returns the shots of a single game
+        '''
+        return self.read_shots(filters=[('game_id', '=', int(game_id))])
+
+    def get_new_game_shots(self, game_id, after_sequence_number) -> pd.DataFrame:
+        '''
+        Returns the shots of a single game with a SEQUENCE_NUMBER above after_sequence_number
+        '''
+        return self.read_shots(filters=[('game_id', '=', int(game_id)), ('sequence_number', '>', int(after_sequence_number))])
+
+class ReplayDataSource:
+    '''
+    Stand-in for a live feed, for testing live mode without a live game. Replays the shots of another data source
+    (the local csv files by default) in SEQUENCE_NUMBER order, releasing shots_per_second shots as time passes,
+    counted from the first time each game is read. Everything else is passed through to the wrapped source.
+    '''
+    def __init__(self, data_source=None, shots_per_second=0.5, start_shots=0, clock=time.monotonic):
+        self.data_source = data_source if data_source is not None else LocalDataSource()
+        self.shots_per_second = shots_per_second
+        self.start_shots = start_shots
+        self.clock = clock
+        self.__games = {}                      # game_id -> (every shot in sequence order, replay start time)
+        self.__lock = threading.Lock()
+
+    def get_schedule(self) -> pd.DataFrame:
+        return self.data_source.get_schedule()
+
+    def restart(self, game_id=None):
+        '''
+        Starts replaying a game (or every game) from the beginning again
+        '''
+        with self.__lock:
+            if game_id is None:
+                self.__games.clear()
+            else:
+                self.__games.pop(game_id, None)
+
+    def __get_released_shots(self, game_id):
+        '''
+        Returns the shots of a game released so far
+        '''
+        with self.__lock:
+            if game_id not in self.__games:
+                game_shots_df = self.data_source.get_game_shots(game_id).sort_values('SEQUENCE_NUMBER', ignore_index=True)
+                self.__games[game_id] = (game_shots_df, self.clock())
+            game_shots_df, start_time = self.__games[game_id]
+
+        num_released = self.start_shots + int((self.clock() - start_time) * self.shots_per_second)
+
+        return game_shots_df.head(num_released)
+
+    def get_game_shots(self, game_id) -> pd.DataFrame:
+        '''
+        Returns the shots of a single game released so far
+        '''
+        return self.__get_released_shots(game_id).copy()
+
+    def get_new_game_shots(self, game_id, after_sequence_number) -> pd.DataFrame:
+        '''
+        Returns the shots of a single game released so far with a SEQUENCE_NUMBER above after_sequence_number
+        '''
+        game_shots_df = self.__get_released_shots(game_id)
+
+        return game_shots_df[game_shots_df['SEQUENCE_NUMBER'] > after_sequence_number].reset_index(drop=True)
+
+def create_data_source(source='local', connection_file=None):
+    '''
+    Creates a data source by name, for scripts that run outside of the Streamlit app.
+    The Snowflake source reads its connection parameters from a json file
+    '''
+    if source == 'local':
+        return LocalDataSource()
+
+    from snowflake.snowpark import Session
+
+    with open(connection_file) as f:
+        connection_parameters = json.load(f)
+
+    return SnowflakeDataSource(Session.builder.configs(connection_parameters).create())
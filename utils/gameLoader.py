@@ -0,0 +1,102 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.lruCache import LRUCache
+from utils.stageTimer import record_measurements, timed_stage
+
+class GameShotLoader:
+    '''
+    Loads the shots of one game at a time and keeps the most recently used games in a bounded LRU cache.
+    fetch_game_shots is any callable that takes a game_id and returns that game's shots DataFrame,
+    e.g. a query with the game_id bound as a parameter.
+    With prefetch enabled, the games next to the requested one in the schedule are loaded in the background.
+    cache replaces the default LRUCache of max_games games, e.g. with a SharedStore bounded by memory.
+    '''
+    def __init__(self, fetch_game_shots, max_games=8, prefetch=False, schedule_game_ids=None, max_workers=2, cache=None):
+        self.fetch_game_shots = fetch_game_shots
+        self.cache = cache if cache is not None else LRUCache(max_size=max_games)
+        self.prefetch = prefetch
+        self.schedule_game_ids = list(schedule_game_ids) if schedule_game_ids is not None else []
+        self.__pending = {}
+        self.__lock = threading.Lock()
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers) if prefetch else None
+
+    def set_schedule(self, game_ids):
+        '''
+        Sets the game order used to find a game's neighbors for prefetching
+        '''
+        self.schedule_game_ids = list(game_ids)
+
+    def __fetch(self, game_id):
+        '''
+        Fetches a game and stores it in the cache, used for both foreground loads and prefetches
+        '''
+        try:
+            # a SharedStore returns a view of what it stored
+            return self.cache.put(game_id, self.fetch_game_shots(game_id))
+        finally:
+            with self.__lock:
+                self.__pending.pop(game_id, None)
+
+    def get_adjacent_game_ids(self, game_id):
+        '''
+        Returns the game ids right before and after game_id in the schedule
+        '''
+        if game_id not in self.schedule_game_ids:
+            return []
+
+        position = self.schedule_game_ids.index(game_id)
+        neighbors = self.schedule_game_ids[max(position - 1, 0):position + 2]
+
+        return [neighbor for neighbor in neighbors if neighbor != game_id]
+
+    def prefetch_adjacent(self, game_id):
+        '''
+        Loads the games adjacent to game_id in the background, if they are not cached or already loading
+        '''
+        if self.__executor is None:
+            return
+
+        for adjacent_game_id in self.get_adjacent_game_ids(game_id):
+            with self.__lock:
+                if adjacent_game_id in self.__pending or adjacent_game_id in self.cache:
+                    continue
+                self.__pending[adjacent_game_id] = self.__executor.submit(self.__fetch, adjacent_game_id)
+
+    @timed_stage('game_shots')
+    def get_game_shots(self, game_id):
+        '''
+        Returns the shots of game_id, from the cache when possible
+        '''
+        game_shots_df = self.cache.get(game_id)
+        record_measurements(cache_hit=game_shots_df is not None)
+
+        if game_shots_df is None:
+            with self.__lock:
+                pending = self.__pending.get(game_id)
+            record_measurements(prefetched=pending is not None)
+
+            # wait on an in flight prefetch of this game rather than querying it twice
+            if pending is not None:
+                game_shots_df = pending.result()
+            else:
+                game_shots_df = self.__fetch(game_id)
+
+        if self.prefetch:
+            self.prefetch_adjacent(game_id)
+
+        record_measurements(rows=len(game_shots_df))
+
+        return game_shots_df
+
+    def evict(self, game_id):
+        '''
+        Removes a game from the cache
+        '''
+        return self.cache.evict(game_id)
+
+    def get_stats(self):
+        '''
+        Returns the cache counters
+        '''
+        return self.cache.get_stats()
@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.basketballShot import NUM_COORDINATES
+from utils.shotPaths import ShotPaths
+from utils.stageTimer import record_measurements, timed_stage
+from utils.trajectoryTable import get_trajectory_table
+
+def _compute_game_paths(shared_memory_name, total_shots, offset, num_coordinates, shot_start_x, shot_start_y, shot_made, team):
+    '''
+    Worker task: computes one game's paths and writes them into its rows of the shared (3, total_shots, points) block.
+    Only has_path is sent back
+    '''
+    block = shared_memory.SharedMemory(name=shared_memory_name)
+    try:
+        paths = np.ndarray((3, total_shots, num_coordinates + 1), dtype=np.float32, buffer=block.buf)
+        x, y, z, has_path = get_trajectory_table(num_coordinates).lookup_paths(shot_start_x, shot_start_y, shot_made, team)
+
+        game_rows = slice(offset, offset + len(shot_start_x))
+        paths[0, game_rows] = x
+        paths[1, game_rows] = y
+        paths[2, game_rows] = z
+        del paths
+    finally:
+        block.close()
+
+    return has_path
+
+class GamePathPool:
+    '''
+    Computes the shot paths of several games at once in a process pool, one task per game.
+    The parent allocates a single shared memory block for the paths of every game and each worker writes its game
+    straight into its own rows, so only the shot coordinates are pickled to the workers and nothing but the
+    has_path flags is pickled back. Workers answer from their own copy of the trajectory table.
+    '''
+    def __init__(self, max_workers=None, num_coordinates=NUM_COORDINATES, mp_context='spawn'):
+        self.max_workers = max_workers or os.cpu_count()
+        self.num_coordinates = num_coordinates
+        # spawn rather than fork, forking a process that is running other threads (e.g. streamlit) is unsafe
+        self.__executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context(mp_context))
+
+    @timed_stage('game_path_pool')
+    def get_paths(self, games) -> dict:
+        '''
+        games maps game_id to that game's shots dataframe. Returns a dict of game_id to ShotPaths, in the same order
+        '''
+        num_shots = [len(game_shots_df) for game_shots_df in games.values()]
+        total_shots = sum(num_shots)
+        record_measurements(games=len(games), rows=total_shots)
+
+        # shared memory blocks can't be empty, games without shots are never sent to a worker
+        block = shared_memory.SharedMemory(create=True, size=max(1, 3 * total_shots * (self.num_coordinates + 1) * np.dtype(np.float32).itemsize))
+        try:
+            offsets = np.cumsum([0] + num_shots[:-1])
+            futures = {
+                game_id: self.__executor.submit(
+                    _compute_game_paths,
+                    block.name,
+                    total_shots,
+                    int(offset),
+                    self.num_coordinates,
+                    game_shots_df['COORDINATE_X'].to_numpy(dtype=float),
+                    game_shots_df['COORDINATE_Y'].to_numpy(dtype=float),
+                    game_shots_df['SCORING_PLAY'].to_numpy(dtype=bool),
+                    np.asarray(game_shots_df['SCORING_TEAM'].to_numpy(), dtype=str)
+                )
+                for (game_id, game_shots_df), offset in zip(games.items(), offsets)
+                if len(game_shots_df)
+            }
+
+            paths = np.ndarray((3, total_shots, self.num_coordinates + 1), dtype=np.float32, buffer=block.buf)
+            games_paths = {}
+            for (game_id, game_shots_df), offset in zip(games.items(), offsets):
+                has_path = futures[game_id].result() if game_id in futures else np.zeros(0, dtype=bool)
+                game_rows = slice(offset, offset + len(game_shots_df))
+                # from_arrays copies the kept points out of the block
+                games_paths[game_id] = ShotPaths.from_arrays(
+                    game_shots_df, paths[0, game_rows], paths[1, game_rows], paths[2, game_rows], has_path
+                )
+            del paths
+        finally:
+            block.close()
+            block.unlink()
+
+        return games_paths
+
+    def shutdown(self):
+        self.__executor.shutdown()
@@ -0,0 +1,53 @@
+import threading
+
+from utils.shotFigure import append_shot_traces, build_shot_chart
+from utils.stageTimer import record_measurements, timed_stage
+from utils.trajectoryTable import get_trajectory_table
+
+class LiveGame:
+    '''
+    Keeps the shot chart of a game in progress up to date. It remembers the highest SEQUENCE_NUMBER already drawn,
+    and each refresh only fetches the shots after it, computes the paths of those shots and appends them to the
+    existing figure's traces. data_source needs get_game_shots(game_id) and
+    get_new_game_shots(game_id, after_sequence_number), e.g. SnowflakeDataSource or ReplayDataSource.
+    '''
+    def __init__(self, game_id, data_source, court_lines_df, color_mapping, compute_paths=None):
+        self.game_id = game_id
+        self.data_source = data_source
+        self.court_lines_df = court_lines_df
+        self.color_mapping = color_mapping
+        self.compute_paths = compute_paths if compute_paths is not None else get_trajectory_table().get_paths
+        self.last_sequence_number = None
+        self.num_shots = 0
+        self.fig = None
+        self.__lock = threading.Lock()
+
+    @timed_stage('live_refresh')
+    def refresh(self) -> int:
+        '''
+        Draws the shots taken since the last refresh, returns how many there were
+        '''
+        with self.__lock:
+            if self.last_sequence_number is None:
+                new_shots_df = self.data_source.get_game_shots(self.game_id)
+            else:
+                new_shots_df = self.data_source.get_new_game_shots(self.game_id, self.last_sequence_number)
+
+            # a row can only be drawn once, even if the source sends it again
+            if self.last_sequence_number is not None:
+                new_shots_df = new_shots_df[new_shots_df['SEQUENCE_NUMBER'] > self.last_sequence_number]
+            new_shots_df = new_shots_df.sort_values('SEQUENCE_NUMBER')
+            record_measurements(rows=len(new_shots_df))
+
+            if self.fig is None:
+                self.fig = build_shot_chart(self.court_lines_df, self.compute_paths(new_shots_df, normalized=True), self.color_mapping)
+            elif len(new_shots_df):
+                append_shot_traces(self.fig, self.compute_paths(new_shots_df, normalized=True), self.color_mapping)
+
+            if len(new_shots_df):
+                self.last_sequence_number = int(new_shots_df['SEQUENCE_NUMBER'].iloc[-1])
+            elif self.last_sequence_number is None:
+                self.last_sequence_number = -1
+            self.num_shots += len(new_shots_df)
+
+            return len(new_shots_df)
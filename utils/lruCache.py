@@ -0,0 +1,106 @@
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    '''
+    Thread safe, size bounded least recently used cache.
+    Bounded by number of entries (max_size), by the total bytes of the entries (max_bytes, each entry measured
+    once with get_size when it is stored), or both; None disables a bound. The most recently stored entry is
+    kept even when it alone is larger than max_bytes.
+    Keeps hit, miss and eviction counters so cache effectiveness can be reported.
+    '''
+    def __init__(self, max_size=8, max_bytes=None, get_size=None):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.get_size = get_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.resident_bytes = 0
+        self.__entries = OrderedDict()
+        self.__sizes = {}
+        self.__lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self.__lock:
+            return key in self.__entries
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__entries)
+
+    def get(self, key, default=None):
+        '''
+        Returns the cached value for key and marks it as most recently used, or default on a miss
+        '''
+        with self.__lock:
+            if key not in self.__entries:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self.__entries.move_to_end(key)
+            return self.__entries[key]
+
+    def put(self, key, value):
+        '''
+        Stores value under key, evicting the least recently used entries past max_size or max_bytes,
+        and returns value
+        '''
+        size = self.get_size(value) if self.get_size is not None else 0
+
+        with self.__lock:
+            self.resident_bytes += size - self.__sizes.get(key, 0)
+            self.__entries[key] = value
+            self.__sizes[key] = size
+            self.__entries.move_to_end(key)
+
+            while (
+                (self.max_size is not None and len(self.__entries) > self.max_size) or
+                (self.max_bytes is not None and self.resident_bytes > self.max_bytes and len(self.__entries) > 1)
+            ):
+                evicted_key, _ = self.__entries.popitem(last=False)
+                self.resident_bytes -= self.__sizes.pop(evicted_key)
+                self.evictions += 1
+
+        return value
+
+    def evict(self, key):
+        '''
+        Explicitly removes key from the cache, returns whether it was cached
+        '''
+        with self.__lock:
+            if key not in self.__entries:
+                return False
+
+            del self.__entries[key]
+            self.resident_bytes -= self.__sizes.pop(key)
+            self.evictions += 1
+            return True
+
+    def clear(self):
+        '''
+        Removes every entry, counters are kept
+        '''
+        with self.__lock:
+            self.evictions += len(self.__entries)
+            self.__entries.clear()
+            self.__sizes.clear()
+            self.resident_bytes = 0
+
+    def get_stats(self):
+        '''
+        Returns the cache size and hit/miss/eviction counters
+        '''
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.__entries),
+                'max_size': self.max_size,
+                'resident_bytes': self.resident_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+# e.g. "Ochai Agbaji made Three Point Jumper. Assisted by Christian Braun."
+PLAY_TEXT_PATTERN = r'^(?P<shooter>.+?) (?P<result>made|missed) (?P<shot_type>.+?)\.(?: Assisted by (?P<assister>.+?)\.)?$'
+PLAY_COLUMNS = ['SHOOTER', 'ASSISTER', 'SHOT_TYPE']
+
+def parse_play_text(text) -> pd.DataFrame:
+    '''
+    Extracts the shooter, assister and shot type of every play description in one vectorized pass.
+    Descriptions that do not match PLAY_TEXT_PATTERN get missing values
+    '''
+    parsed_df = pd.Series(text, dtype=object).str.extract(PLAY_TEXT_PATTERN)
+
+    return pd.DataFrame({
+        'SHOOTER': parsed_df['shooter'].astype('category'),
+        'ASSISTER': parsed_df['assister'].astype('category'),
+        'SHOT_TYPE': parsed_df['shot_type'].astype('category')
+    }, index=getattr(text, 'index', None))
+
+def add_play_columns(shots_df) -> pd.DataFrame:
+    '''
+    Returns the shots with the parsed SHOOTER, ASSISTER and SHOT_TYPE columns added, for use at ingestion
+    so the descriptions are only parsed once per game
+    '''
+    shots_df = shots_df.copy()
+    shots_df[PLAY_COLUMNS] = parse_play_text(shots_df['TEXT'])
+
+    return shots_df
+
+class PlayIndex:
+    '''
+    Inverted index from players to the shots they took and assisted, built from the parsed play description columns
+    (parsing TEXT first when they are missing). Lookups return shot ids: sorted row positions in the indexed
+    shots frame, which are also the shot ids of the ShotPaths computed from that frame.
+    '''
+    def __init__(self, shots_df):
+        if not set(PLAY_COLUMNS).issubset(shots_df.columns):
+            shots_df = add_play_columns(shots_df)
+
+        self.num_shots = len(shots_df)
+        self.shooter_index = self.__build_index(shots_df['SHOOTER'])
+        self.assister_index = self.__build_index(shots_df['ASSISTER'])
+        self.shot_type_index = self.__build_index(shots_df['SHOT_TYPE'])
+        self.assisted = np.nonzero(shots_df['ASSISTER'].notna().to_numpy())[0]
+
+    @staticmethod
+    def __build_index(column):
+        '''
+        Returns a dict of value to the sorted row positions holding it, from one pass over the category codes
+        '''
+        column = column.astype('category')
+        codes = column.cat.codes.to_numpy()
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(column.cat.categories) + 1))
+
+        return {
+            value: order[start:end]
+            for value, start, end in zip(column.cat.categories, bounds[:-1], bounds[1:])
+            if end > start
+        }
+
+    def get_players(self):
+        '''
+        Returns every player who took or assisted a shot
+        '''
+        return sorted(set(self.shooter_index) | set(self.assister_index))
+
+    def get_shooters(self):
+        return sorted(self.shooter_index)
+
+    def get_shot_ids(self, shooters=None, assisters=None, assisted=None, shot_types=None):
+        '''
+        Returns the ids of the shots matching every given filter. shooters, assisters and shot_types are lists
+        of accepted values, assisted=True/False keeps only assisted/unassisted shots
+        '''
+        shot_ids = np.arange(self.num_shots)
+
+        for index, values in [(self.shooter_index, shooters), (self.assister_index, assisters), (self.shot_type_index, shot_types)]:
+            if values is not None:
+                matches = [index[value] for value in values if value in index]
+                shot_ids = np.intersect1d(shot_ids, np.concatenate(matches) if matches else np.array([], dtype=int), assume_unique=True)
+
+        if assisted is not None:
+            is_assisted = np.isin(shot_ids, self.assisted, assume_unique=True)
+            shot_ids = shot_ids[is_assisted if assisted else ~is_assisted]
+
+        return shot_ids
@@ -0,0 +1,130 @@
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.lruCache import LRUCache
+from utils.shotPaths import ShotPaths
+
+def get_nbytes(value):
+    '''
+    Returns the bytes held by a stored value
+    '''
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, ShotPaths):
+        return value.memory_usage()
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+
+    return sys.getsizeof(value)
+
+def freeze(value):
+    '''
+    Marks a value's arrays read only before it is shared
+    '''
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+
+    return value
+
+def is_copy_on_write():
+    '''
+    Whether pandas copy on write is on: always from pandas 3, and with the mode.copy_on_write option before it
+    '''
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    try:
+        return pd.get_option('mode.copy_on_write') is True
+    except KeyError:
+        # pandas versions without the option
+        return False
+
+def get_view(value):
+    '''
+    Returns what a session gets for a stored value. With pandas copy on write, frames are shallow copies
+    which share the stored buffers, and writing to a shallow copy copies only what is written, so sessions
+    can never change the stored value or each other's views. Without it, frames are deep copies
+    '''
+    deep = not is_copy_on_write()
+    if isinstance(value, pd.DataFrame):
+        return value.copy(deep=deep)
+    if isinstance(value, ShotPaths):
+        return ShotPaths(value.coords_df.copy(deep=deep), value.shots_df.copy(deep=deep), value.offsets.view())
+    if isinstance(value, np.ndarray):
+        return value.view()
+
+    return value
+
+class SharedStore:
+    '''
+    Process wide, read only store for loaded frames and computed trajectories, shared by every session of the app.
+    Each value is kept once, and every get hands out a view of it (see get_view) instead of a copy.
+    The store is bounded by max_bytes and evicts least recently used values past it.
+    It can stand in for the LRUCache of GameShotLoader, with the same get/put/evict/get_stats methods.
+    Frames are only shared without copying under pandas copy on write, which is always on from pandas 3
+    and can be turned on with pd.set_option('mode.copy_on_write', True) before it.
+    '''
+    def __init__(self, max_bytes=512 * 1024 ** 2):
+        self.cache = LRUCache(max_size=None, max_bytes=max_bytes, get_size=get_nbytes)
+        self.__loading = {}
+        self.__lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def __len__(self):
+        return len(self.cache)
+
+    def get(self, key, default=None):
+        '''
+        Returns a view of the value stored under key, or default
+        '''
+        value = self.cache.get(key)
+
+        return default if value is None else get_view(value)
+
+    def put(self, key, value):
+        '''
+        Stores value under key and returns a view of it. The caller should not change value afterwards
+        '''
+        self.cache.put(key, freeze(value))
+
+        return get_view(value)
+
+    def get_or_load(self, key, load):
+        '''
+        Returns a view of the value stored under key, calling load() to store it on a miss.
+        Sessions asking for the same key at the same time wait on a single load
+        '''
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self.__lock:
+            key_lock = self.__loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # another session may have loaded it while this one waited
+            value = self.cache.get(key) if key in self.cache else None
+            if value is None:
+                value = freeze(load())
+                self.cache.put(key, value)
+
+        with self.__lock:
+            self.__loading.pop(key, None)
+
+        return get_view(value)
+
+    def evict(self, key):
+        return self.cache.evict(key)
+
+    def clear(self):
+        self.cache.clear()
+
+    def get_stats(self):
+        '''
+        Returns the number of stored values, resident bytes, hit rate and eviction counts
+        '''
+        return self.cache.get_stats()
@@ -0,0 +1,190 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.courtCoordinates import CourtCoordinates
+from utils.shotFigure import build_shot_chart, get_court_traces
+from utils.trajectoryStore import TrajectoryStore, get_geometry_version
+from utils.trajectoryTable import get_trajectory_table
+
+EXPORT_FORMATS = ['html', 'json']
+
+# court and court traces of the current worker process, built once by _init_worker
+_court = None
+_court_traces = None
+
+def _init_worker(court_dimensions, court_lines_df):
+    global _court, _court_traces
+    _court = CourtCoordinates(court_dimensions)
+    _court_traces = get_court_traces(court_lines_df)
+
+def _export_game(path, export_format, include_plotlyjs, game_shots_df, color_mapping, title):
+    '''
+    Worker task: computes one game's paths, builds its chart on the shared court traces and writes it to path
+    '''
+    shot_paths = get_trajectory_table(court=_court).get_paths(game_shots_df, normalized=True)
+    fig = build_shot_chart(None, shot_paths, color_mapping, court_traces=_court_traces)
+    fig.update_layout(title=title, margin=dict(t=60))
+
+    # written next to the output and renamed, so a half written file is never taken as up to date
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    if export_format == 'html':
+        fig.write_html(temporary_path, include_plotlyjs=include_plotlyjs, full_html=True)
+    else:
+        fig.write_json(temporary_path)
+    os.replace(temporary_path, path)
+
+    return path
+
+class ShotChartExporter:
+    '''
+    Writes a standalone shot chart (HTML or plotly JSON) for every game in the schedule, across a process pool.
+    The court traces are built once per worker and shared by every chart. A manifest in the output directory
+    records a key for each written chart (the game's shots, colors and title, the trajectory geometry and
+    the output options), and games whose key has not changed since their chart was written are skipped.
+    A game whose export fails is reported in the run's stats and left out of the manifest, the other games
+    are still written and recorded.
+    '''
+    def __init__(self, data_source, output_dir='exports', export_format='html', include_plotlyjs=True, max_workers=None, court=None):
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f'export_format must be one of {EXPORT_FORMATS}, not {export_format}')
+
+        self.data_source = data_source
+        self.output_dir = output_dir
+        self.export_format = export_format
+        self.include_plotlyjs = include_plotlyjs
+        self.max_workers = max_workers or os.cpu_count()
+        self.court = court if court is not None else CourtCoordinates()
+        self.manifest_path = os.path.join(output_dir, 'manifest.json')
+
+    def get_path(self, game_id):
+        return os.path.join(self.output_dir, f'{game_id}.{self.export_format}')
+
+    def get_export_key(self, game_shots_df, color_mapping, title):
+        '''
+        Returns the key a chart is up to date with
+        '''
+        key = json.dumps([
+            TrajectoryStore.get_shots_hash(game_shots_df),
+            get_geometry_version(self.court),
+            color_mapping,
+            title,
+            self.export_format,
+            str(self.include_plotlyjs)
+        ])
+
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def __load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def __save_manifest(self, manifest):
+        temporary_path = f'{self.manifest_path}.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(temporary_path, self.manifest_path)
+
+    def export(self, game_ids=None, force=False):
+        '''
+        Writes the charts of every game in the schedule, or of the given game ids, and returns the run's stats
+        '''
+        start = time.perf_counter()
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = self.__load_manifest()
+
+        schedule_df = self.data_source.get_schedule().set_index('GAME_ID')
+        if game_ids is None:
+            game_ids = schedule_df.index.tolist()
+
+        # the data source is read in this process, workers only get the shots of their game
+        tasks = {}
+        for game_id in game_ids:
+            game = schedule_df.loc[game_id]
+            game_shots_df = self.data_source.get_game_shots(game_id)
+            color_mapping = {'home': str(game['HOME_COLOR']), 'away': str(game['AWAY_COLOR'])}
+            title = str(game['GAME'])
+            key = self.get_export_key(game_shots_df, color_mapping, title)
+
+            path = self.get_path(game_id)
+            if not force and manifest.get(str(game_id)) == key and os.path.exists(path):
+                continue
+            tasks[game_id] = (key, (path, self.export_format, self.include_plotlyjs, game_shots_df, color_mapping, title))
+
+        court_lines_df = self.court.get_court_lines()
+        errors = {}
+        try:
+            if self.max_workers == 1 or len(tasks) <= 1:
+                _init_worker(self.court.get_dimensions(), court_lines_df)
+                for game_id, (key, arguments) in tasks.items():
+                    try:
+                        _export_game(*arguments)
+                    except Exception as e:
+                        errors[str(game_id)] = f'{type(e).__name__}: {e}'
+                    else:
+                        manifest[str(game_id)] = key
+            elif tasks:
+                with ProcessPoolExecutor(
+                    max_workers=min(self.max_workers, len(tasks)),
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.court.get_dimensions(), court_lines_df)
+                ) as executor:
+                    futures = {executor.submit(_export_game, *arguments): game_id for game_id, (_, arguments) in tasks.items()}
+                    for future in as_completed(futures):
+                        game_id = futures[future]
+                        try:
+                            future.result()
+                        except Exception as e:
+                            errors[str(game_id)] = f'{type(e).__name__}: {e}'
+                        else:
+                            manifest[str(game_id)] = tasks[game_id][0]
+        finally:
+            # the games written so far are recorded, also when the run is interrupted
+            self.__save_manifest(manifest)
+        seconds = time.perf_counter() - start
+
+        return {
+            'games': len(game_ids),
+            'written': len(tasks) - len(errors),
+            'up_to_date': len(game_ids) - len(tasks),
+            'failed': len(errors),
+            'errors': errors,
+            'seconds': seconds,
+            'games_per_second': len(game_ids) / seconds if seconds else float('inf'),
+            'written_per_second': (len(tasks) - len(errors)) / seconds if seconds else float('inf')
+        }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Writes a standalone shot chart for every game in the schedule')
+    parser.add_argument('--source', choices=['local', 'snowflake'], default='local')
+    parser.add_argument('--connection', help='json file of Snowflake connection parameters, for --source snowflake')
+    parser.add_argument('--output-dir', default='exports')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='html')
+    parser.add_argument('--plotlyjs', choices=['inline', 'cdn'], default='inline',
+                        help='embed plotly.js in every html file (standalone), or load it from a CDN (smaller files)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--games', nargs='+', type=int, help='only these game ids')
+    parser.add_argument('--force', action='store_true', help='rewrite charts that are up to date')
+    args = parser.parse_args()
+
+    from utils.dataSource import create_data_source
+
+    exporter = ShotChartExporter(
+        create_data_source(args.source, connection_file=args.connection),
+        output_dir=args.output_dir,
+        export_format=args.format,
+        include_plotlyjs=True if args.plotlyjs == 'inline' else 'cdn',
+        max_workers=args.workers
+    )
+    stats = exporter.export(game_ids=args.games, force=args.force)
+    print(json.dumps(stats, indent=2))
+    if stats['failed']:
+        sys.exit(1)
@@ -0,0 +1,216 @@
+import threading
+
+import numpy as np
+import plotly.graph_objects as go
+
+from utils.basketballShot import BasketballShot
+from utils.courtCoordinates import CourtCoordinates
+
+TEAM_SIDES = ['home', 'away']
+
+class ShotDensity:
+    '''
+    Bins shot starting locations into square or hexagonal cells over the court, for views over many games.
+    Shots are placed with the same home/away adjustment BasketballShot uses, and with fold=True every shot is
+    turned onto the far half of the court so one team's shots land on the same end whether it was home or away.
+    Bin counts are kept per game and per team side, and the season totals are updated incrementally as games are
+    added, so adding a game only bins that game's shots.
+    '''
+    def __init__(self, bin_shape='hex', cell_size=1.5, fold=True, court=None):
+        self.bin_shape = bin_shape
+        self.cell_size = cell_size
+        self.fold = fold
+        self.court = court if court is not None else CourtCoordinates()
+        self.court_width = self.court.court_width
+        self.court_length = self.court.court_length / 2 if fold else self.court.court_length
+
+        if bin_shape == 'square':
+            self.num_cols = int(np.ceil(self.court_width / cell_size))
+            self.num_rows = int(np.ceil(self.court_length / cell_size))
+        elif bin_shape == 'hex':
+            # pointy top hexagons of circumradius cell_size, in offset rows
+            self.hex_width = np.sqrt(3) * cell_size
+            self.row_height = 1.5 * cell_size
+            self.num_cols = int(np.ceil(self.court_width / self.hex_width)) + 1
+            self.num_rows = int(np.ceil(self.court_length / self.row_height)) + 1
+        else:
+            raise ValueError(f'bin_shape must be square or hex, not {bin_shape}')
+
+        self.num_bins = self.num_cols * self.num_rows
+        self.game_counts = {}                  # game_id -> (attempts, makes), each a (2 team sides, num_bins) array
+        self.total_attempts = np.zeros((2, self.num_bins), dtype=np.int64)
+        self.total_makes = np.zeros((2, self.num_bins), dtype=np.int64)
+        self.__lock = threading.Lock()
+
+    def get_shot_locations(self, shots_df):
+        '''
+        Returns the x and y court location of every shot start
+        '''
+        return BasketballShot.get_shot_locations(shots_df, fold=self.fold, court=self.court)
+
+    def get_bin_index(self, x, y):
+        '''
+        Returns the flat bin index of every location, locations off the court are clipped to the nearest bin
+        '''
+        if self.bin_shape == 'square':
+            cols = np.floor(x / self.cell_size)
+            rows = np.floor(y / self.cell_size)
+        else:
+            # every odd row is shifted half a hexagon to the right, pick the closest of the candidate centers
+            row_guess = np.floor(y / self.row_height)
+            candidates = []
+            for row_offset in (0, 1):
+                rows = row_guess + row_offset
+                shift = (rows % 2) * self.hex_width / 2
+                cols = np.round((x - shift) / self.hex_width)
+                center_x = cols * self.hex_width + shift
+                center_y = rows * self.row_height
+                candidates.append((np.square(x - center_x) + np.square(y - center_y), cols, rows))
+
+            closer = candidates[0][0] <= candidates[1][0]
+            cols = np.where(closer, candidates[0][1], candidates[1][1])
+            rows = np.where(closer, candidates[0][2], candidates[1][2])
+
+        cols = np.clip(cols, 0, self.num_cols - 1).astype(int)
+        rows = np.clip(rows, 0, self.num_rows - 1).astype(int)
+
+        return rows * self.num_cols + cols
+
+    def get_bin_centers(self):
+        '''
+        Returns the x and y center of every bin
+        '''
+        rows, cols = np.divmod(np.arange(self.num_bins), self.num_cols)
+
+        if self.bin_shape == 'square':
+            return (cols + 0.5) * self.cell_size, (rows + 0.5) * self.cell_size
+
+        return cols * self.hex_width + (rows % 2) * self.hex_width / 2, rows * self.row_height
+
+    def bin_shots(self, shots_df):
+        '''
+        Returns the (attempts, makes) bin counts of a frame of shots, each a (2 team sides, num_bins) array
+        '''
+        x, y = self.get_shot_locations(shots_df)
+        bins = self.get_bin_index(x, y)
+        side = np.where(shots_df['SCORING_TEAM'].to_numpy() == 'home', 0, 1)
+        made = shots_df['SCORING_PLAY'].to_numpy(dtype=bool)
+
+        flat_index = side * self.num_bins + bins
+        attempts = np.bincount(flat_index, minlength=2 * self.num_bins).reshape(2, self.num_bins)
+        makes = np.bincount(flat_index[made], minlength=2 * self.num_bins).reshape(2, self.num_bins)
+
+        return attempts, makes
+
+    def has_game(self, game_id):
+        return game_id in self.game_counts
+
+    def add_game(self, game_id, game_shots_df):
+        '''
+        Bins one game and merges it into the totals. Adding a game again replaces its previous counts
+        '''
+        attempts, makes = self.bin_shots(game_shots_df)
+
+        with self.__lock:
+            if game_id in self.game_counts:
+                previous_attempts, previous_makes = self.game_counts[game_id]
+                self.total_attempts -= previous_attempts
+                self.total_makes -= previous_makes
+
+            self.game_counts[game_id] = (attempts, makes)
+            self.total_attempts += attempts
+            self.total_makes += makes
+
+    def remove_game(self, game_id):
+        '''
+        Takes a game back out of the totals
+        '''
+        with self.__lock:
+            attempts, makes = self.game_counts.pop(game_id)
+            self.total_attempts -= attempts
+            self.total_makes -= makes
+
+    def get_counts(self, game_sides=None):
+        '''
+        Returns the (attempts, makes) per bin.
+        Without game_sides, these are the running totals of every game and both teams.
+        game_sides is a list of (game_id, 'home'/'away') pairs, e.g. the games of one team and the side it played on
+        '''
+        if game_sides is None:
+            return self.total_attempts.sum(axis=0), self.total_makes.sum(axis=0)
+
+        attempts = np.zeros(self.num_bins, dtype=np.int64)
+        makes = np.zeros(self.num_bins, dtype=np.int64)
+        for game_id, side in game_sides:
+            game_attempts, game_makes = self.game_counts[game_id]
+            attempts += game_attempts[TEAM_SIDES.index(side)]
+            makes += game_makes[TEAM_SIDES.index(side)]
+
+        return attempts, makes
+
+    def get_traces(self, counts, colorscale='YlOrRd', name='shots'):
+        '''
+        Returns the traces drawing every non empty bin as its own cell on the court floor, colored by count
+        '''
+        counts = np.asarray(counts)
+        center_x, center_y = self.get_bin_centers()
+        filled = np.nonzero(counts)[0]
+
+        if self.bin_shape == 'square':
+            # one square per non empty bin, drawn as 2 triangles over its 4 corners
+            half = self.cell_size / 2
+            corner_x = center_x[filled, None] + np.array([-half, half, half, -half])
+            corner_y = center_y[filled, None] + np.array([-half, -half, half, half])
+            first_vertex = np.arange(len(filled))[:, None] * 4
+
+            return [self.__get_mesh_trace(
+                corner_x.ravel(),
+                corner_y.ravel(),
+                (first_vertex + [0, 0]).ravel(),
+                (first_vertex + [1, 2]).ravel(),
+                (first_vertex + [2, 3]).ravel(),
+                np.repeat(counts[filled], 2),
+                colorscale, name
+            )]
+
+        # one hexagon per non empty bin, drawn as a fan of 6 triangles around its center
+        angles = np.pi / 6 + np.arange(6) * np.pi / 3
+        corner_x = center_x[filled, None] + self.cell_size * np.cos(angles)
+        corner_y = center_y[filled, None] + self.cell_size * np.sin(angles)
+
+        vertex_x = np.column_stack([center_x[filled], corner_x]).ravel()
+        vertex_y = np.column_stack([center_y[filled], corner_y]).ravel()
+        first_vertex = np.arange(len(filled))[:, None] * 7
+        corners = np.arange(6)
+
+        return [self.__get_mesh_trace(
+            vertex_x,
+            vertex_y,
+            np.repeat(first_vertex, 6, axis=1).ravel(),
+            (first_vertex + 1 + corners).ravel(),
+            (first_vertex + 1 + (corners + 1) % 6).ravel(),
+            np.repeat(counts[filled], 6),
+            colorscale, name
+        )]
+
+    @staticmethod
+    def __get_mesh_trace(vertex_x, vertex_y, i, j, k, intensity, colorscale, name):
+        '''
+        Returns a flat mesh of triangles just above the court floor, each colored by its own intensity
+        '''
+        return go.Mesh3d(
+            x=vertex_x,
+            y=vertex_y,
+            z=np.full(len(vertex_x), 0.02),
+            i=i,
+            j=j,
+            k=k,
+            intensity=intensity,
+            intensitymode='cell',
+            colorscale=colorscale,
+            cmin=0,
+            showscale=True,
+            colorbar=dict(title=name),
+            hovertemplate=f'{name}: %{{intensity}}<extra></extra>',
+            flatshading=True
+        )
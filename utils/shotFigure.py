@@ -0,0 +1,467 @@
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.colors import hex_to_rgb
+from plotly.subplots import make_subplots
+
+from utils.shotPaths import ShotPaths
+from utils.stageTimer import record_measurements, timed, timed_stage
+
+COURT_COLOR_MAPPING = {
+    'court': '#000000',
+    'hoop': '#e47041'
+}
+SHOT_SYMBOL_MAPPING = {'made': 'circle', 'missed': 'x'}
+HOVERTEMPLATE = 'Description: %{customdata[0]}'
+SINGLE_TRACE_HOVERTEMPLATE = 'Description: %{hovertext}<extra></extra>'
+
+def separate_lines(line_starts, *columns, dtype=np.float32):
+    '''
+    Joins many lines into one array per column with a NaN (or None) row between consecutive lines,
+    so a single Scatter3d trace draws them as separate lines.
+    line_starts flags the first row of every line, the rows of a line must be contiguous.
+    Numeric columns are cast to dtype, other columns become object arrays with None separators
+    '''
+    line_starts = np.asarray(line_starts, dtype=bool)
+    num_rows = len(line_starts)
+    if num_rows == 0:
+        return [np.array([], dtype=dtype) for _ in columns]
+
+    # every row shifts right by one slot per line started before it, leaving a gap after each line
+    line_number = np.cumsum(line_starts) - 1
+    positions = np.arange(num_rows) + line_number
+    output_length = num_rows + line_number[-1]
+
+    separated = []
+    for column in columns:
+        column = np.asarray(column)
+        if np.issubdtype(column.dtype, np.number):
+            output = np.full(output_length, np.nan, dtype=dtype)
+        else:
+            output = np.full(output_length, None, dtype=object)
+        output[positions] = column
+        separated.append(output)
+
+    return separated
+
+@timed_stage('court_traces')
+def get_court_traces(court_lines_df):
+    '''
+    Returns one Scatter3d trace per court line color, with every line of that color separated by NaNs
+    '''
+    traces = []
+    for color, color_df in court_lines_df.groupby('color', sort=False):
+        line_starts = color_df['line_group'].ne(color_df['line_group'].shift()).to_numpy()
+        x, y, z = separate_lines(line_starts, color_df['x'], color_df['y'], color_df['z'])
+        traces.append(go.Scatter3d(
+            x=x, y=y, z=z,
+            mode='lines',
+            line=dict(color=COURT_COLOR_MAPPING[color], width=5),
+            hoverinfo='skip',
+            showlegend=False,
+            name=color
+        ))
+
+    return traces
+
+def as_shot_paths(shot_paths):
+    '''
+    Accepts either ShotPaths or a get_shot_path_coordinates() layout dataframe
+    '''
+    return shot_paths if isinstance(shot_paths, ShotPaths) else ShotPaths.from_frame(shot_paths)
+
+@timed_stage('shot_path_traces')
+def get_shot_path_traces(shot_paths, color_mapping):
+    '''
+    Returns one Scatter3d trace per team with all of the team's shot paths, separated by NaNs.
+    Shots with a single coordinate (missed shots) have no path to draw and are left out.
+    The paths carry no hover text, each description is sent once, on its shot's start marker
+    '''
+    shot_paths = as_shot_paths(shot_paths)
+    coords_df = shot_paths.coords_df
+    point_team = shot_paths.get_shot_column('team')
+    num_points = shot_paths.get_num_points()
+    point_has_path = np.repeat(num_points > 1, num_points)
+    is_start = shot_paths.get_start_mask()
+
+    traces = []
+    for team in shot_paths.shots_df['team'].unique():
+        mask = (point_team == team) & point_has_path
+        if not mask.any():
+            continue
+
+        x, y, z = separate_lines(
+            is_start[mask],
+            coords_df['x'].to_numpy()[mask],
+            coords_df['y'].to_numpy()[mask],
+            coords_df['z'].to_numpy()[mask]
+        )
+        traces.append(go.Scatter3d(
+            x=x, y=y, z=z,
+            mode='lines',
+            line=dict(color=color_mapping[team], width=5),
+            opacity=0.55,
+            hoverinfo='skip',
+            showlegend=False,
+            name=team
+        ))
+
+    record_measurements(points=int(point_has_path.sum()), traces=len(traces))
+
+    return traces
+
+@timed_stage('shot_start_traces')
+def get_shot_start_traces(shot_paths, color_mapping):
+    '''
+    Returns one Scatter3d marker trace per team and shot result with every shot's starting location
+    '''
+    shot_paths = as_shot_paths(shot_paths)
+    coords_df = shot_paths.coords_df
+    start_df = coords_df.iloc[shot_paths.offsets[:-1]]
+    shots_df = shot_paths.shots_df
+
+    traces = []
+    for (team, shot_made), group_index in shots_df.groupby(['team', 'shot_made'], sort=False, observed=True).indices.items():
+        group_df = start_df.iloc[group_index]
+        traces.append(go.Scatter3d(
+            x=group_df['x'].to_numpy(dtype=np.float32),
+            y=group_df['y'].to_numpy(dtype=np.float32),
+            z=group_df['z'].to_numpy(dtype=np.float32),
+            hovertext=shots_df['description'].to_numpy(dtype=object)[group_index],
+            mode='markers',
+            marker=dict(color=color_mapping[team], symbol=SHOT_SYMBOL_MAPPING[shot_made], size=4),
+            hovertemplate=SINGLE_TRACE_HOVERTEMPLATE,
+            name=f'{team}, {shot_made}'
+        ))
+
+    return traces
+
+def style_shot_chart(fig):
+    '''
+    Applies the shot chart's camera, axes and legend styling
+    '''
+    fig.update_layout(
+        margin=dict(l=20, r=20, t=20, b=20),
+        scene_aspectmode="data",
+        height=600,
+        scene_camera=dict(
+            eye=dict(x=1.3, y=0, z=0.7)
+        ),
+        scene=dict(
+            xaxis=dict(title='', showticklabels=False, showgrid=False),
+            yaxis=dict(title='', showticklabels=False, showgrid=False),
+            zaxis=dict(title='',  showticklabels=False, showgrid=False, showbackground=True, backgroundcolor='#f7f0e8'),
+        ),
+        legend=dict(
+            yanchor='bottom',
+            y=0.05,
+            x=0.2,
+            xanchor='left',
+            orientation='h',
+            font=dict(size=15, color='black'),
+            bgcolor='white',
+            title='',
+            itemsizing='constant'
+        ),
+        legend_traceorder="reversed"
+    )
+
+    return fig
+
+def build_shot_chart(court_lines_df, shot_paths, color_mapping, court_traces=None) -> go.Figure:
+    '''
+    Builds the shot chart with one trace per court line color, one path trace per team and one marker trace
+    per team and shot result. Coordinates are sent to the browser as float32 typed arrays.
+    shot_paths is either ShotPaths or a get_shot_path_coordinates() layout dataframe.
+    court_traces from get_court_traces can be passed instead of court_lines_df, to reuse them across many charts
+    '''
+    shot_paths = as_shot_paths(shot_paths)
+    if court_traces is None:
+        court_traces = get_court_traces(court_lines_df)
+    fig = go.Figure(
+        data=list(court_traces) +
+             get_shot_start_traces(shot_paths, color_mapping) +
+             get_shot_path_traces(shot_paths, color_mapping)
+    )
+
+    return style_shot_chart(fig)
+
+@timed_stage('append_shot_traces')
+def append_shot_traces(fig, shot_paths, color_mapping) -> go.Figure:
+    '''
+    Adds shots to a figure made by build_shot_chart in place: the new shots are appended to the existing path and
+    shot start traces of their team (and shot result), and only traces that do not exist yet are added
+    '''
+    existing_traces = {trace.name: trace for trace in fig.data}
+    shot_paths = as_shot_paths(shot_paths)
+
+    for trace in get_shot_start_traces(shot_paths, color_mapping) + get_shot_path_traces(shot_paths, color_mapping):
+        existing_trace = existing_traces.get(trace.name)
+        if existing_trace is None:
+            fig.add_trace(trace)
+            continue
+
+        # new paths are separated from the ones already drawn like any two paths in the trace
+        gap = 1 if trace.mode == 'lines' else 0
+        for column in ['x', 'y', 'z']:
+            existing_trace[column] = np.concatenate([existing_trace[column], np.full(gap, np.nan), trace[column]]).astype(np.float32)
+        if trace.hovertext is not None:
+            existing_trace.hovertext = np.concatenate([existing_trace.hovertext, np.full(gap, None), trace.hovertext])
+
+    record_measurements(rows=len(shot_paths), traces=len(fig.data))
+
+    return fig
+
+def build_shot_chart_per_shot_traces(court_lines_df, game_coords_df, color_mapping) -> go.Figure:
+    '''
+    Builds the shot chart with plotly express, one trace per court line and per shot
+    '''
+    # plotly express is only imported by this builder, it adds a noticeable share of the app's import time
+    import plotly.express as px
+
+    if isinstance(game_coords_df, ShotPaths):
+        game_coords_df = game_coords_df.to_frame()
+
+    with timed('court_line_3d', points=len(court_lines_df)):
+        fig = px.line_3d(
+            data_frame=court_lines_df,
+            x='x',
+            y='y',
+            z='z',
+            line_group='line_group',
+            color='color',
+            color_discrete_map=COURT_COLOR_MAPPING
+        )
+        fig.update_traces(hovertemplate=None, hoverinfo='skip', showlegend=False)
+
+    # draw shot paths
+    with timed('shot_path_line_3d', points=len(game_coords_df)):
+        shot_path_fig = px.line_3d(
+            data_frame=game_coords_df,
+            x='x',
+            y='y',
+            z='z',
+            line_group='line_id',
+            color='team',
+            color_discrete_map=color_mapping,
+            custom_data=['description']
+        )
+        shot_path_fig.update_traces(opacity=0.55, hovertemplate=HOVERTEMPLATE, showlegend=False)
+
+    # shot start scatter plots
+    game_coords_start = game_coords_df[game_coords_df['shot_coord_index'] == 0]
+    with timed('shot_start_scatter_3d', points=len(game_coords_start)):
+        shot_start_fig = px.scatter_3d(
+            data_frame=game_coords_start,
+            x='x',
+            y='y',
+            z='z',
+            custom_data=['description'],
+            color='team',
+            color_discrete_map=color_mapping,
+            symbol='shot_made',
+            symbol_map=SHOT_SYMBOL_MAPPING
+        )
+        shot_start_fig.update_traces(marker_size=4, hovertemplate=HOVERTEMPLATE)
+
+    # add shot scatter plot and shot line plot to court plot
+    with timed('add_traces', traces=len(shot_start_fig.data) + len(shot_path_fig.data)):
+        fig.add_traces(shot_start_fig.data)
+        fig.add_traces(shot_path_fig.data)
+
+    fig.update_traces(line=dict(width=5))
+
+    return style_shot_chart(fig)
+
+@timed_stage('step_traces')
+def get_step_traces(shot_paths, color_mapping, shot_step, num_steps):
+    '''
+    Returns one trace per animation step with the paths and start markers of its shots, shot_step being
+    the step of each shot. Both teams share a step's trace, with team colors and result symbols set per point
+    '''
+    coords_df = shot_paths.coords_df
+    path_colors = [
+        f'rgba({",".join(map(str, hex_to_rgb(color_mapping[team])))}, 0.55)' for team in ['home', 'away']
+    ]
+    point_step = np.repeat(shot_step, shot_paths.get_num_points())
+    is_start = shot_paths.get_start_mask()
+    point_team = (shot_paths.get_shot_column('team') == 'away').astype(np.float32)
+    point_size = np.where(is_start, 4, 0).astype(np.float32)
+    point_missed = (shot_paths.get_shot_column('shot_made') == 'missed').astype(np.float32)
+    hover_text = shot_paths.get_hover_text()
+
+    traces = []
+    for step in range(num_steps):
+        mask = point_step == step
+        x, y, z, team, size, missed, description = separate_lines(
+            is_start[mask],
+            coords_df['x'].to_numpy()[mask],
+            coords_df['y'].to_numpy()[mask],
+            coords_df['z'].to_numpy()[mask],
+            point_team[mask],
+            point_size[mask],
+            point_missed[mask],
+            hover_text[mask]
+        )
+        # separator rows have no coordinates, only the marker sizes and colors have to be valid there
+        team, size = np.nan_to_num(team), np.nan_to_num(size)
+        symbol = np.where(missed == 1, SHOT_SYMBOL_MAPPING['missed'], SHOT_SYMBOL_MAPPING['made'])
+        traces.append(go.Scatter3d(
+            x=x, y=y, z=z,
+            hovertext=description,
+            mode='lines+markers',
+            line=dict(color=team, colorscale=[[0, path_colors[0]], [1, path_colors[1]]], cmin=0, cmax=1, width=5),
+            marker=dict(color=team, colorscale=[[0, color_mapping['home']], [1, color_mapping['away']]], cmin=0, cmax=1,
+                        size=size, symbol=symbol, line=dict(width=0)),
+            hovertemplate=SINGLE_TRACE_HOVERTEMPLATE,
+            showlegend=False,
+            name=f'step {step}'
+        ))
+
+    return traces
+
+def build_animated_shot_chart(court_lines_df, shot_paths, color_mapping, max_steps=30, frame_duration=300, court_traces=None) -> go.Figure:
+    '''
+    Builds a shot chart that plays a game back in SEQUENCE_NUMBER order, with a slider to scrub through it.
+    Shots are split in order into at most max_steps steps, and each step gets its own trace.
+    Every coordinate is sent once, in the figure's traces: a frame only sets which step traces are visible,
+    the steps up to its own and not the tail after it, so the slider can also jump back or ahead.
+    The court traces are not part of any frame
+    '''
+    shot_paths = as_shot_paths(shot_paths)
+    if court_traces is None:
+        court_traces = get_court_traces(court_lines_df)
+
+    num_shots = len(shot_paths)
+    num_steps = max(1, min(max_steps, num_shots))
+    order = np.argsort(shot_paths.shots_df['line_id'].to_numpy(), kind='stable')
+    step_ends = np.array([len(step) for step in np.array_split(order, num_steps)]).cumsum()
+    shot_step = np.empty(num_shots, dtype=np.int64)
+    shot_step[order] = np.searchsorted(step_ends, np.arange(num_shots), side='right')
+
+    step_traces = get_step_traces(shot_paths, color_mapping, shot_step, num_steps)
+    for trace in step_traces[1:]:
+        trace.visible = False
+
+    # frames are given as dicts, which plotly validates much faster than trace objects
+    step_trace_indices = list(range(len(court_traces), len(court_traces) + num_steps))
+    frames = [
+        dict(
+            name=str(step),
+            data=[dict(type='scatter3d', visible=trace_step <= step) for trace_step in range(num_steps)],
+            traces=step_trace_indices
+        )
+        for step in range(num_steps)
+    ]
+    fig = go.Figure(data=list(court_traces) + step_traces, frames=frames)
+
+    def get_animate_args(frames, duration, **options):
+        return [frames, dict(mode='immediate', frame=dict(duration=duration, redraw=True), transition=dict(duration=0), **options)]
+
+    style_shot_chart(fig)
+    fig.update_layout(
+        # keeps the camera where the user turned it while frames are drawn
+        uirevision='animation',
+        margin=dict(b=90),
+        updatemenus=[dict(
+            type='buttons',
+            direction='left',
+            x=0, y=0, xanchor='left', yanchor='top',
+            buttons=[
+                dict(label='Play', method='animate', args=get_animate_args(None, frame_duration, fromcurrent=True)),
+                dict(label='Pause', method='animate', args=get_animate_args([None], 0))
+            ]
+        )],
+        sliders=[dict(
+            active=0,
+            x=0.12, y=0, len=0.88, yanchor='top',
+            currentvalue=dict(prefix='Shots: '),
+            steps=[
+                dict(label=str(step_end), method='animate', args=get_animate_args([str(step)], 0))
+                for step, step_end in enumerate(step_ends)
+            ]
+        )]
+    )
+
+    return fig
+
+def build_multi_game_chart(court_lines_df, games_paths, color_mappings, game_names, layout='overlay', court_traces=None) -> go.Figure:
+    '''
+    Builds one chart of several games. games_paths maps game_id to ShotPaths (or the dataframe layout),
+    color_mappings maps game_id to that game's home/away colors, and game_names maps game_id to its legend name.
+    layout='overlay' draws every game on one court with a legend group per game,
+    layout='facet' draws each game on its own court, in two columns.
+    court_traces from get_court_traces can be passed instead of court_lines_df, as in build_shot_chart
+    '''
+    game_ids = list(games_paths)
+    if court_traces is None:
+        court_traces = get_court_traces(court_lines_df)
+
+    def get_game_traces(game_id):
+        shot_paths = as_shot_paths(games_paths[game_id])
+        traces = get_shot_start_traces(shot_paths, color_mappings[game_id]) + get_shot_path_traces(shot_paths, color_mappings[game_id])
+        for trace in traces:
+            trace.update(legendgroup=str(game_id), name=f'{game_names[game_id]}, {trace.name}')
+        return traces
+
+    if layout == 'overlay':
+        fig = go.Figure(data=list(court_traces) + [trace for game_id in game_ids for trace in get_game_traces(game_id)])
+        return style_shot_chart(fig)
+
+    if layout != 'facet':
+        raise ValueError(f'layout must be overlay or facet, not {layout}')
+
+    num_cols = min(2, len(game_ids)) or 1
+    num_rows = max(1, -(-len(game_ids) // num_cols))
+    fig = make_subplots(
+        rows=num_rows,
+        cols=num_cols,
+        specs=[[{'type': 'scene'}] * num_cols] * num_rows,
+        subplot_titles=[game_names[game_id] for game_id in game_ids],
+        vertical_spacing=0.05,
+        horizontal_spacing=0.02
+    )
+    for i, game_id in enumerate(game_ids):
+        row, col = divmod(i, num_cols)
+        fig.add_traces(list(court_traces) + get_game_traces(game_id), rows=row + 1, cols=col + 1)
+
+    style_shot_chart(fig)
+    fig.update_scenes(
+        aspectmode='data',
+        camera=dict(eye=dict(x=1.3, y=0, z=0.7)),
+        xaxis=dict(title='', showticklabels=False, showgrid=False),
+        yaxis=dict(title='', showticklabels=False, showgrid=False),
+        zaxis=dict(title='', showticklabels=False, showgrid=False, showbackground=True, backgroundcolor='#f7f0e8')
+    )
+    fig.update_layout(height=500 * num_rows, showlegend=False)
+
+    return fig
+
+def build_density_chart(court_lines_df, density_traces, court_traces=None) -> go.Figure:
+    '''
+    Builds a court figure with shot density traces (see ShotDensity.get_traces) on its floor
+    '''
+    if court_traces is None:
+        court_traces = get_court_traces(court_lines_df)
+    fig = go.Figure(data=list(court_traces) + density_traces)
+
+    return style_shot_chart(fig)
+
+def measure_figure(build_figure, *args):
+    '''
+    Builds a figure and serializes it as the browser would receive it.
+    Returns the figure, its JSON payload size in bytes, and the build and serialization times in seconds
+    '''
+    start = time.perf_counter()
+    fig = build_figure(*args)
+    built = time.perf_counter()
+    payload = fig.to_json()
+    serialized = time.perf_counter()
+
+    return fig, {
+        'traces': len(fig.data),
+        'payload_bytes': len(payload.encode()),
+        'build_seconds': built - start,
+        'serialize_seconds': serialized - built
+    }
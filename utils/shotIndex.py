@@ -0,0 +1,159 @@
+import numpy as np
+
+from utils.basketballShot import BasketballShot
+from utils.courtCoordinates import CourtCoordinates
+
+class ShotIndex:
+    '''
+    Uniform grid index over shot start locations, for region and nearest neighbor queries over many games.
+    Locations are in the court frame BasketballShot.adjust_shot_and_hoop_coordinates produces. With fold=True
+    (the default) every shot is turned onto the far half as ShotDensity does, so regions are described once,
+    relative to the far hoop at (hoop_loc_x, hoop_loc_y) and the baseline at y=0.
+    Shots are sorted by grid cell and each cell's range is kept in an offsets array, so a query only looks at the
+    shots in the cells it overlaps. Queries return shot ids: sorted row positions in the indexed shots frame.
+    '''
+    def __init__(self, shots_df, cell_size=2.0, fold=True, court=None):
+        self.shots_df = shots_df.reset_index(drop=True)
+        self.cell_size = cell_size
+        self.fold = fold
+        self.court = court if court is not None else CourtCoordinates()
+
+        self.x, self.y = BasketballShot.get_shot_locations(self.shots_df, fold=fold, court=self.court)
+        court_length = self.court.court_length / 2 if fold else self.court.court_length
+        self.num_cols = int(np.ceil(self.court.court_width / cell_size)) + 1
+        self.num_rows = int(np.ceil(court_length / cell_size)) + 1
+
+        # shots outside the court are kept in the edge cells
+        cells = self.__get_rows(self.y) * self.num_cols + self.__get_cols(self.x)
+        self.order = np.argsort(cells, kind='stable')
+        self.sorted_x = self.x[self.order]
+        self.sorted_y = self.y[self.order]
+        self.offsets = np.searchsorted(cells[self.order], np.arange(self.num_cols * self.num_rows + 1))
+
+    def __len__(self):
+        return len(self.shots_df)
+
+    def __get_cols(self, x):
+        return np.clip(np.floor(np.asarray(x) / self.cell_size), 0, self.num_cols - 1).astype(int)
+
+    def __get_rows(self, y):
+        return np.clip(np.floor(np.asarray(y) / self.cell_size), 0, self.num_rows - 1).astype(int)
+
+    def __get_candidates(self, x_min, y_min, x_max, y_max):
+        '''
+        Returns the sorted positions of the shots in every cell overlapping the bounding box
+        '''
+        col_min, col_max = self.__get_cols(x_min), self.__get_cols(x_max)
+        row_min, row_max = self.__get_rows(y_min), self.__get_rows(y_max)
+        if x_min > x_max or y_min > y_max:
+            return np.array([], dtype=int)
+
+        # the cells of one grid row are contiguous in the sorted shots
+        rows = np.arange(row_min, row_max + 1)
+        starts = self.offsets[rows * self.num_cols + col_min]
+        ends = self.offsets[rows * self.num_cols + col_max + 1]
+
+        return np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+
+    def __to_shot_ids(self, positions):
+        return np.sort(self.order[positions])
+
+    def query_rectangle(self, x_min, y_min, x_max, y_max):
+        '''
+        Returns the ids of the shots inside the rectangle, edges included
+        '''
+        positions = self.__get_candidates(x_min, y_min, x_max, y_max)
+        x, y = self.sorted_x[positions], self.sorted_y[positions]
+        inside = (x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)
+
+        return self.__to_shot_ids(positions[inside])
+
+    def query_polygon(self, vertices):
+        '''
+        Returns the ids of the shots inside a polygon given as a sequence of (x, y) vertices, by the even-odd rule.
+        A shot on the boundary counts as inside when the polygon continues to its right, or above it on a
+        horizontal edge: a rectangle's left and bottom edges are inside and its right and top edges outside,
+        so rectangles sharing an edge never both hold a shot
+        '''
+        vertices = np.asarray(vertices, dtype=float)
+        positions = self.__get_candidates(*vertices.min(axis=0), *vertices.max(axis=0))
+        x, y = self.sorted_x[positions], self.sorted_y[positions]
+
+        # even-odd rule, one ray cast to the right of every shot, one polygon edge at a time
+        inside = np.zeros(len(positions), dtype=bool)
+        for (x1, y1), (x2, y2) in zip(vertices, np.roll(vertices, -1, axis=0)):
+            crosses = (y1 > y) != (y2 > y)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                crossing_x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            inside ^= crosses & (x < crossing_x)
+
+        return self.__to_shot_ids(positions[inside])
+
+    def query_distance_band(self, min_distance, max_distance, center=None):
+        '''
+        Returns the ids of the shots between min_distance and max_distance feet from center, the hoop by default
+        '''
+        center_x, center_y = center if center is not None else (self.court.hoop_loc_x, self.court.hoop_loc_y)
+        positions = self.__get_candidates(center_x - max_distance, center_y - max_distance, center_x + max_distance, center_y + max_distance)
+        distance = np.sqrt(np.square(self.sorted_x[positions] - center_x) + np.square(self.sorted_y[positions] - center_y))
+        inside = (distance >= min_distance) & (distance <= max_distance)
+
+        return self.__to_shot_ids(positions[inside])
+
+    def query_corner_threes(self):
+        '''
+        Returns the ids of the shots beyond the straight sections of the three point line
+        '''
+        left_line = self.court.hoop_loc_x - self.court.three_straight_distance
+        right_line = self.court.hoop_loc_x + self.court.three_straight_distance
+        length = self.court.three_straight_length
+
+        shot_ids = np.concatenate([
+            self.query_rectangle(-np.inf, -np.inf, left_line, length),
+            self.query_rectangle(right_line, -np.inf, np.inf, length)
+        ])
+        # shots on the line are two pointers
+        on_line = (self.x[shot_ids] == left_line) | (self.x[shot_ids] == right_line)
+
+        return np.sort(shot_ids[~on_line])
+
+    def query_nearest(self, x, y, k=1):
+        '''
+        Returns the ids of the k shots nearest to (x, y) and their distances, nearest first.
+        The search widens one ring of cells at a time until the k-th nearest shot can't be beaten
+        '''
+        k = min(k, len(self))
+        if k == 0:
+            return np.array([], dtype=int), np.array([])
+
+        col, row = int(self.__get_cols(x)), int(self.__get_rows(y))
+        for ring in range(max(self.num_cols, self.num_rows) + 1):
+            positions = self.__get_candidates(
+                (col - ring) * self.cell_size, (row - ring) * self.cell_size,
+                (col + ring) * self.cell_size, (row + ring) * self.cell_size
+            )
+            if len(positions) < k:
+                continue
+
+            distance = np.sqrt(np.square(self.sorted_x[positions] - x) + np.square(self.sorted_y[positions] - y))
+            nearest = np.argpartition(distance, k - 1)[:k]
+            nearest = nearest[np.argsort(distance[nearest], kind='stable')]
+
+            # every shot outside the searched cells is at least this far away, past the edge cells there are none
+            searched_distance = min([np.inf] + [
+                side_distance for side_distance, has_cells_beyond in [
+                    (x - (col - ring) * self.cell_size, col - ring > 0),
+                    ((col + ring + 1) * self.cell_size - x, col + ring < self.num_cols - 1),
+                    (y - (row - ring) * self.cell_size, row - ring > 0),
+                    ((row + ring + 1) * self.cell_size - y, row + ring < self.num_rows - 1)
+                ]
+                if has_cells_beyond
+            ])
+            if distance[nearest[-1]] <= searched_distance:
+                return self.order[positions[nearest]], distance[nearest]
+
+    def get_shots(self, shot_ids):
+        '''
+        Returns the play by play rows of the given shot ids, ready for the trajectory solvers
+        '''
+        return self.shots_df.iloc[shot_ids]
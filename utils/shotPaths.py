@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+class ShotPaths:
+    '''
+    Normalized shot trajectories. Instead of repeating every shot's metadata on each of its coordinates,
+    the coordinates are one compact float32 x/y/z table with every shot's points stored contiguously, an offsets
+    array holds where each shot starts, and the metadata is one row per shot with categorical columns.
+    Shot ids and coordinate indices are derived from the offsets, and the tables are only joined when asked for.
+    '''
+    def __init__(self, coords_df, shots_df, offsets):
+        self.coords_df = coords_df             # x, y, z
+        self.shots_df = shots_df               # indexed by shot_id: line_id, description, shot_made, team
+        self.offsets = offsets                 # num_shots + 1 int32 coordinate offsets, shot i is rows offsets[i]:offsets[i + 1]
+
+    @staticmethod
+    def get_offsets(num_points):
+        '''
+        Returns the offsets of shots with the given numbers of coordinates
+        '''
+        offsets = np.zeros(len(num_points) + 1, dtype=np.int32)
+        np.cumsum(num_points, out=offsets[1:])
+        return offsets
+
+    @classmethod
+    def from_arrays(cls, shots_df, x, y, z, has_path, num_coordinates=None):
+        '''
+        Builds the normalized tables from (N x num_coordinates + 1) path arrays, as returned by
+        BasketballShot.calculate_batch_paths, and the play by play rows they were computed from
+        '''
+        if num_coordinates is None:
+            num_coordinates = x.shape[1] - 1
+
+        num_points = np.where(has_path, np.asarray(num_coordinates) + 1, 1)
+        keep = np.arange(x.shape[1]) < num_points[:, None]
+
+        coords_df = pd.DataFrame({
+            'x': x[keep].astype(np.float32),
+            'y': y[keep].astype(np.float32),
+            'z': z[keep].astype(np.float32)
+        })
+
+        shot_paths_shots_df = pd.DataFrame({
+            'line_id': shots_df['SEQUENCE_NUMBER'].to_numpy(),
+            'description': pd.Categorical(shots_df['TEXT'].to_numpy()),
+            'shot_made': pd.Categorical(np.where(shots_df['SCORING_PLAY'].to_numpy(dtype=bool), 'made', 'missed'), categories=['made', 'missed']),
+            'team': pd.Categorical(np.asarray(shots_df['SCORING_TEAM'].to_numpy(), dtype=str), categories=['home', 'away'])
+        }, index=pd.RangeIndex(len(shots_df), name='shot_id'))
+
+        return cls(coords_df, shot_paths_shots_df, cls.get_offsets(num_points))
+
+    @classmethod
+    def from_frame(cls, shot_paths_df):
+        '''
+        Normalizes a get_shot_path_coordinates() layout dataframe, where every shot starts at shot_coord_index 0
+        '''
+        is_start = shot_paths_df['shot_coord_index'].to_numpy() == 0
+        first_rows = shot_paths_df[is_start]
+
+        coords_df = pd.DataFrame({
+            'x': shot_paths_df['x'].to_numpy(dtype=np.float32),
+            'y': shot_paths_df['y'].to_numpy(dtype=np.float32),
+            'z': shot_paths_df['z'].to_numpy(dtype=np.float32)
+        })
+
+        shots_df = pd.DataFrame({
+            'line_id': first_rows['line_id'].to_numpy(),
+            'description': pd.Categorical(first_rows['description'].to_numpy()),
+            'shot_made': pd.Categorical(first_rows['shot_made'].to_numpy(dtype=str), categories=['made', 'missed']),
+            'team': pd.Categorical(first_rows['team'].to_numpy(dtype=str), categories=['home', 'away'])
+        }, index=pd.RangeIndex(len(first_rows), name='shot_id'))
+
+        offsets = np.append(np.flatnonzero(is_start), len(shot_paths_df)).astype(np.int32)
+
+        return cls(coords_df, shots_df, offsets)
+
+    def __len__(self):
+        return len(self.shots_df)
+
+    def get_num_points(self):
+        '''
+        Returns the number of coordinates of every shot, 1 for shots without a path
+        '''
+        return np.diff(self.offsets)
+
+    def get_point_shot_ids(self):
+        '''
+        Returns the shot id of every coordinate
+        '''
+        return np.repeat(np.arange(len(self.shots_df), dtype=np.int32), self.get_num_points())
+
+    def get_point_indices(self):
+        '''
+        Returns the shot_coord_index of every coordinate, its position within its shot's path
+        '''
+        return np.arange(len(self.coords_df), dtype=np.int32) - np.repeat(self.offsets[:-1], self.get_num_points())
+
+    def get_start_mask(self):
+        '''
+        Returns True for the first coordinate of every shot
+        '''
+        is_start = np.zeros(len(self.coords_df), dtype=bool)
+        is_start[self.offsets[:-1]] = True
+        return is_start
+
+    def take(self, shot_ids):
+        '''
+        Returns the paths of the given shot ids only, e.g. the matches of a filter, renumbered from 0 in shot id order
+        '''
+        shot_ids = np.unique(np.asarray(shot_ids, dtype=np.int64))
+        keep = np.zeros(len(self.shots_df), dtype=bool)
+        keep[shot_ids] = True
+
+        num_points = self.get_num_points()
+        coords_df = self.coords_df[np.repeat(keep, num_points)].reset_index(drop=True)
+
+        shots_df = self.shots_df.iloc[shot_ids].reset_index(drop=True)
+        shots_df.index = pd.RangeIndex(len(shot_ids), name='shot_id')
+        shots_df['description'] = shots_df['description'].cat.remove_unused_categories()
+
+        return ShotPaths(coords_df, shots_df, self.get_offsets(num_points[shot_ids]))
+
+    def get_shot_column(self, column):
+        '''
+        Returns a per shot metadata column broadcast onto every coordinate, without building the joined frame
+        '''
+        return np.repeat(self.shots_df[column].to_numpy(), self.get_num_points())
+
+    def get_hover_text(self):
+        '''
+        Returns the play description of every coordinate
+        '''
+        return self.get_shot_column('description')
+
+    def to_frame(self) -> pd.DataFrame:
+        '''
+        Joins the coordinates and metadata back into the get_shot_path_coordinates() layout
+        '''
+        shot_coord_index = self.get_point_indices().astype(np.int64)
+        shot_paths_df = pd.DataFrame({
+            'shot_coord_index': shot_coord_index,
+            'x': self.coords_df['x'].to_numpy(),
+            'y': self.coords_df['y'].to_numpy(),
+            'z': self.coords_df['z'].to_numpy(),
+            'line_id': self.get_shot_column('line_id'),
+            'description': self.get_shot_column('description'),
+            'shot_made': self.get_shot_column('shot_made'),
+            'team': self.get_shot_column('team')
+        })
+
+        return shot_paths_df.set_index(shot_coord_index)
+
+    def memory_usage(self):
+        '''
+        Returns the bytes held by the coordinate table, the offsets and the metadata table
+        '''
+        return int(self.coords_df.memory_usage(deep=True).sum() + self.offsets.nbytes + self.shots_df.memory_usage(deep=True).sum())
+
+    def save(self, path):
+        '''
+        Writes both tables and the offsets to a single .npz file
+        '''
+        np.savez(
+            path,
+            offsets=self.offsets,
+            x=self.coords_df['x'].to_numpy(),
+            y=self.coords_df['y'].to_numpy(),
+            z=self.coords_df['z'].to_numpy(),
+            line_id=self.shots_df['line_id'].to_numpy(),
+            description=self.shots_df['description'].to_numpy(dtype=str),
+            shot_made=self.shots_df['shot_made'].to_numpy(dtype=str),
+            team=self.shots_df['team'].to_numpy(dtype=str)
+        )
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Reads a file written by save()
+        '''
+        with np.load(path) as stored:
+            coords_df = pd.DataFrame({column: stored[column] for column in ['x', 'y', 'z']})
+            shots_df = pd.DataFrame({
+                'line_id': stored['line_id'],
+                'description': pd.Categorical(stored['description']),
+                'shot_made': pd.Categorical(stored['shot_made'], categories=['made', 'missed']),
+                'team': pd.Categorical(stored['team'], categories=['home', 'away'])
+            }, index=pd.RangeIndex(len(stored['line_id']), name='shot_id'))
+            offsets = stored['offsets']
+
+        return cls(coords_df, shots_df, offsets)
@@ -0,0 +1,223 @@
+import numpy as np
+import pandas as pd
+
+from utils.basketballShot import HOOP_CYLINDER_RADIUS, NUM_COORDINATES, SHOT_PATH_COLUMNS, BasketballShot
+from utils.courtCoordinates import CourtCoordinates
+from utils.shotPaths import ShotPaths
+from utils.stageTimer import record_measurements, timed_stage
+
+GRAVITY = 32.174               # ft/s^2
+RELEASE_HEIGHT = 7             # ft, where the ball leaves the shooter's hands
+ARC_ANGLE = 3                  # degrees added to the minimum speed release angle
+DRAG_CONSTANT = 0.0072         # 1/ft, air density * drag coefficient * ball cross section / (2 * ball mass)
+RIM_RADIUS = 0.75              # ft
+RESTITUTION = 0.6              # share of the ball's speed kept when it bounces off the rim
+RIM_OUT_SHARE = 0.7            # share of a missed shot's coordinates spent before it hits the rim
+SPEED_ITERATIONS = 8           # secant iterations solving the release speed with drag
+
+class PhysicsShotModel:
+    '''
+    Physics based alternative to the fixed apex parabolas of BasketballShot. Every shot is released from
+    release_height at its location, at the minimum speed angle for its distance plus arc_angle degrees, and the
+    release speed is solved so the ball reaches the hoop. With drag=True air drag slows the ball along the way,
+    and the release speed is solved by secant iterations. Missed shots hit the front or back of the rim and
+    bounce off it to the floor (with rim_out=True) instead of staying a single start point.
+    The hoop is placed by court, a CourtCoordinates (a men's ncaa court by default).
+    Like the BasketballShot paths, every path starts on the floor at the shot location (index 0),
+    and the flight from release_height follows from index 1.
+    Every shot is integrated at once: one fixed step (Heun) integrator steps along the horizontal distance
+    to the hoop, over arrays with a row per shot.
+    calculate_batch_paths and batch_paths return the same layouts as the BasketballShot methods of the same name
+    '''
+    def __init__(self, drag=False, release_height=RELEASE_HEIGHT, arc_angle=ARC_ANGLE, drag_constant=DRAG_CONSTANT,
+                 restitution=RESTITUTION, rim_out=True, court=None):
+        self.drag = drag
+        self.release_height = release_height
+        self.arc_angle = arc_angle
+        self.drag_constant = drag_constant if drag else 0
+        self.restitution = restitution
+        self.rim_out = rim_out
+        self.court = court if court is not None else CourtCoordinates()
+
+    def get_parameters(self):
+        '''
+        Returns every parameter that shapes a path, so cached paths can be invalidated when one changes
+        '''
+        return {
+            'model': 'physics',
+            'gravity': GRAVITY,
+            'release_height': self.release_height,
+            'arc_angle': self.arc_angle,
+            'drag_constant': self.drag_constant,
+            'rim_radius': RIM_RADIUS,
+            'restitution': self.restitution,
+            'rim_out': self.rim_out,
+            'rim_out_share': RIM_OUT_SHARE,
+            'speed_iterations': SPEED_ITERATIONS,
+            'start': 'floor',
+            'court': self.court.get_dimensions()
+        }
+
+    def __integrate(self, speed, angle, step, num_steps, record=True):
+        '''
+        Integrates every ball's flight over num_steps steps of its horizontal distance step (per shot arrays).
+        Along the horizontal distance s, with horizontal speed u and vertical speed w:
+        du/ds = -k|v|, dw/ds = -(g + k|v|w) / u, dz/ds = w / u
+        Returns the heights (N x num_steps + 1, or only the last column without record) and the final u and w
+        '''
+        k = self.drag_constant
+        u, w = speed * np.cos(angle), speed * np.sin(angle)
+        z = np.full(len(speed), self.release_height, dtype=float)
+        heights = [z] if record else None
+
+        def get_slopes(u, w):
+            drag = k * np.sqrt(np.square(u) + np.square(w))
+            return -drag, -(GRAVITY + drag * w) / u, w / u
+
+        for _ in range(num_steps):
+            du1, dw1, dz1 = get_slopes(u, w)
+            du2, dw2, dz2 = get_slopes(u + step * du1, w + step * dw1)
+            u = u + step * (du1 + du2) / 2
+            w = w + step * (dw1 + dw2) / 2
+            z = z + step * (dz1 + dz2) / 2
+            if record:
+                heights.append(z)
+
+        return (np.stack(heights, axis=1) if record else z), u, w
+
+    def solve_release(self, distance, num_steps=NUM_COORDINATES):
+        '''
+        Returns the release angle (radians) and speed (ft/s) that carry every ball distance feet to hoop height
+        '''
+        hoop_z = self.court.hoop_loc_z
+        rise = hoop_z - self.release_height
+        angle = (np.pi / 2 + np.arctan2(rise, distance)) / 2 + np.radians(self.arc_angle)
+
+        # without drag the speed is exact: z(d) = d tan(angle) - g d^2 / (2 v^2 cos^2(angle))
+        speed = np.sqrt(GRAVITY * np.square(distance) / (2 * np.square(np.cos(angle)) * (distance * np.tan(angle) - rise)))
+        if not self.drag_constant:
+            return angle, speed
+
+        # with drag the ball falls short, the speed is found by secant iterations on the height at the hoop
+        step = distance / num_steps
+        previous_speed, previous_miss = speed, self.__integrate(speed, angle, step, num_steps, record=False)[0] - hoop_z
+        speed = speed * 1.05
+        for _ in range(SPEED_ITERATIONS):
+            miss = self.__integrate(speed, angle, step, num_steps, record=False)[0] - hoop_z
+            with np.errstate(divide='ignore', invalid='ignore'):
+                next_speed = speed - miss * (speed - previous_speed) / (miss - previous_miss)
+            previous_speed, previous_miss = speed, miss
+            # converged shots stop moving
+            speed = np.where(np.isfinite(next_speed), next_speed, speed)
+
+        return angle, speed
+
+    def __get_flights(self, distance, num_steps):
+        '''
+        Returns the heights and final horizontal and vertical speeds of balls flying distance feet to hoop height
+        '''
+        angle, speed = self.solve_release(distance, num_steps)
+
+        return self.__integrate(speed, angle, distance / num_steps, num_steps)
+
+    @timed_stage('physics_paths')
+    def calculate_batch_paths(self, shot_start_x, shot_start_y, shot_made, team, num_coordinates=NUM_COORDINATES):
+        '''
+        Computes the shot paths of every shot in one pass, num_coordinates being one value for every shot.
+        Returns a tuple of (x, y, z, has_path) like BasketballShot.calculate_batch_paths
+        '''
+        shot_made = np.asarray(shot_made, dtype=bool)
+        start_x, start_y, hoop_y = BasketballShot.adjust_shot_and_hoop_coordinates(shot_start_x, shot_start_y, team, court=self.court)
+        hoop_x = self.court.hoop_loc_x
+        distance = np.sqrt(np.square(hoop_x - start_x) + np.square(hoop_y - start_y))
+        has_path = distance > HOOP_CYLINDER_RADIUS
+        if not self.rim_out:
+            has_path &= shot_made
+
+        # unit vectors towards the hoop, and to its left
+        with np.errstate(divide='ignore', invalid='ignore'):
+            direction_x = np.where(has_path, (hoop_x - start_x) / distance, 0)
+            direction_y = np.where(has_path, (hoop_y - start_y) / distance, 0)
+
+        # index 0 stays the floor point at the shot location, the flight takes the num_coordinates after it
+        num_shots = len(start_x)
+        num_flight_coordinates = num_coordinates - 1
+        along = np.zeros((num_shots, num_coordinates + 1))
+        across = np.zeros((num_shots, num_coordinates + 1))
+        z = np.zeros((num_shots, num_coordinates + 1))
+
+        made = has_path & shot_made
+        if made.any():
+            heights, _, _ = self.__get_flights(distance[made], num_flight_coordinates)
+            along[made, 1:] = np.linspace(0, 1, num_flight_coordinates + 1) * distance[made][:, None]
+            z[made, 1:] = heights
+
+        missed = has_path & ~shot_made
+        if missed.any():
+            along[missed, 1:], across[missed, 1:], z[missed, 1:] = self.__get_rim_outs(
+                start_x[missed], start_y[missed], distance[missed], num_flight_coordinates
+            )
+
+        x = start_x[:, None] + along * direction_x[:, None] - across * direction_y[:, None]
+        y = start_y[:, None] + along * direction_y[:, None] + across * direction_x[:, None]
+        z[~has_path] = 0
+        record_measurements(rows=num_shots, made=int(made.sum()), rim_outs=int(missed.sum()))
+
+        return x, y, z, has_path
+
+    def __get_rim_outs(self, start_x, start_y, distance, num_coordinates):
+        '''
+        Returns the distance along and across the shot line, and the height, of missed shots.
+        Each ball flies to the front or the back of the rim, then bounces back up and to one side,
+        and falls to the floor. The rim side and bounce side follow from the shot location,
+        so a shot always misses the same way
+        '''
+        cell = np.round(start_x * 10).astype(int) + np.round(start_y * 10).astype(int)
+        rim_side = np.where(cell % 2 == 0, -1, 1)
+        bounce_side = np.where(cell % 4 < 2, -1, 1)
+        rim_distance = np.maximum(distance + rim_side * RIM_RADIUS, RIM_RADIUS)
+
+        num_flight_steps = int(np.clip(round(num_coordinates * RIM_OUT_SHARE), 1, max(num_coordinates - 1, 1)))
+        num_bounce_steps = num_coordinates - num_flight_steps
+        heights, u, w = self.__get_flights(rim_distance, num_flight_steps)
+
+        # the bounce keeps restitution of the speed, turned back up and away from the hoop, without drag
+        bounce_along = -self.restitution * u * 0.5
+        bounce_across = self.restitution * u * 0.5 * bounce_side
+        bounce_up = -self.restitution * w
+        hoop_z = self.court.hoop_loc_z
+        floor_time = (bounce_up + np.sqrt(np.square(bounce_up) + 2 * GRAVITY * hoop_z)) / GRAVITY
+        time = floor_time[:, None] * np.linspace(0, 1, num_bounce_steps + 1)[1:]
+
+        along = np.concatenate([
+            np.linspace(0, 1, num_flight_steps + 1) * rim_distance[:, None],
+            rim_distance[:, None] + bounce_along[:, None] * time
+        ], axis=1)
+        across = np.concatenate([np.zeros((len(distance), num_flight_steps + 1)), bounce_across[:, None] * time], axis=1)
+        z = np.concatenate([heights, hoop_z + bounce_up[:, None] * time - GRAVITY / 2 * np.square(time)], axis=1)
+
+        return along, across, z
+
+    def batch_paths(self, shots_df, num_coordinates=NUM_COORDINATES, dtype=None, normalized=False):
+        '''
+        Returns the trajectories of every shot in a play by play dataframe, in the layout of
+        BasketballShot.batch_paths (the get_shot_path_coordinates() dataframe, or ShotPaths with normalized=True)
+        '''
+        if shots_df.empty and not normalized:
+            return pd.DataFrame(columns=SHOT_PATH_COLUMNS)
+
+        x, y, z, has_path = self.calculate_batch_paths(
+            shots_df['COORDINATE_X'].to_numpy(),
+            shots_df['COORDINATE_Y'].to_numpy(),
+            shots_df['SCORING_PLAY'].to_numpy(),
+            shots_df['SCORING_TEAM'].to_numpy(),
+            num_coordinates=num_coordinates
+        )
+
+        if normalized:
+            return ShotPaths.from_arrays(shots_df, x, y, z, has_path, num_coordinates=num_coordinates)
+
+        if dtype is not None:
+            x, y, z = x.astype(dtype), y.astype(dtype), z.astype(dtype)
+
+        return BasketballShot.paths_to_frame(shots_df, x, y, z, has_path, num_coordinates=num_coordinates)
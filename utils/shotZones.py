@@ -0,0 +1,119 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.basketballShot import BasketballShot
+from utils.courtCoordinates import CourtCoordinates
+from utils.shotDensity import TEAM_SIDES
+
+SHOT_ZONES = ['restricted_area', 'paint', 'mid_range', 'corner_three', 'above_break_three']
+THREE_POINT_ZONES = ['corner_three', 'above_break_three']
+ZONE_STATS = ['attempts', 'makes', 'points']
+
+class ShotZones:
+    '''
+    Labels shots with their court zone, using the same CourtCoordinates dimensions the court is drawn from:
+    the restricted area arc, the lane (paint) up to the free throw line, the straight corner sections of
+    the three point line and the three point arc. Every shot is folded onto the far half first, as ShotDensity does.
+    Attempts, makes and points per zone are kept per game and per team side, so a season wide zone table is a sum
+    of the cached per game tables, and only games not added yet have to be classified.
+    '''
+    def __init__(self, court=None):
+        self.court = court if court is not None else CourtCoordinates()
+        self.game_counts = {}                  # game_id -> (2 team sides, zones, attempts/makes/points) array
+        self.__lock = threading.Lock()
+
+    def classify_locations(self, x, y):
+        '''
+        Returns the SHOT_ZONES index of every folded (x, y) location
+        '''
+        court = self.court
+        offset_x = np.abs(np.asarray(x, dtype=float) - court.hoop_loc_x)
+        y = np.asarray(y, dtype=float)
+        distance = np.sqrt(np.square(offset_x) + np.square(y - court.hoop_loc_y))
+
+        # shots on the three point line are two pointers
+        corner_three = (offset_x > court.three_straight_distance) & (y <= court.three_straight_length)
+        conditions = [
+            distance <= court.restricted_area_radius,
+            (offset_x <= court.lane_width / 2) & (y <= court.free_throw_distance),
+            corner_three,
+            distance > court.three_arc_distance
+        ]
+        zones = [SHOT_ZONES.index(zone) for zone in ['restricted_area', 'paint', 'corner_three', 'above_break_three']]
+
+        return np.select(conditions, zones, default=SHOT_ZONES.index('mid_range'))
+
+    def classify(self, shots_df) -> pd.Categorical:
+        '''
+        Returns the zone of every shot in a play by play dataframe
+        '''
+        x, y = BasketballShot.get_shot_locations(shots_df, fold=True, court=self.court)
+
+        return pd.Categorical.from_codes(self.classify_locations(x, y), categories=SHOT_ZONES)
+
+    def count_shots(self, shots_df):
+        '''
+        Returns the (2 team sides, zones, attempts/makes/points) counts of a frame of shots
+        '''
+        zones = self.classify(shots_df).codes
+        side = np.where(shots_df['SCORING_TEAM'].to_numpy() == 'home', 0, 1)
+        made = shots_df['SCORING_PLAY'].to_numpy(dtype=bool)
+        shot_value = np.where(np.isin(zones, [SHOT_ZONES.index(zone) for zone in THREE_POINT_ZONES]), 3, 2)
+
+        flat_index = side * len(SHOT_ZONES) + zones
+        num_bins = 2 * len(SHOT_ZONES)
+        counts = np.stack([
+            np.bincount(flat_index, minlength=num_bins),
+            np.bincount(flat_index, weights=made, minlength=num_bins),
+            np.bincount(flat_index, weights=made * shot_value, minlength=num_bins)
+        ], axis=-1).astype(np.int64)
+
+        return counts.reshape(2, len(SHOT_ZONES), len(ZONE_STATS))
+
+    def has_game(self, game_id):
+        return game_id in self.game_counts
+
+    def get_num_shots(self, game_id):
+        '''
+        Returns the number of shots counted for a game, 0 if it was not added
+        '''
+        counts = self.game_counts.get(game_id)
+
+        return 0 if counts is None else int(counts[..., ZONE_STATS.index('attempts')].sum())
+
+    def add_game(self, game_id, game_shots_df):
+        '''
+        Classifies one game and caches its zone counts, adding a game again replaces its previous counts
+        '''
+        counts = self.count_shots(game_shots_df)
+
+        with self.__lock:
+            self.game_counts[game_id] = counts
+
+    def remove_game(self, game_id):
+        with self.__lock:
+            self.game_counts.pop(game_id)
+
+    def get_zone_table(self, game_sides=None) -> pd.DataFrame:
+        '''
+        Returns attempts, makes, points, field goal percentage and points per shot per zone.
+        Without game_sides, every cached game and both teams are counted.
+        game_sides is a list of (game_id, 'home'/'away') pairs, e.g. the games of one team and the side it played on
+        '''
+        counts = np.zeros((len(SHOT_ZONES), len(ZONE_STATS)), dtype=np.int64)
+        with self.__lock:
+            if game_sides is None:
+                for game_counts in self.game_counts.values():
+                    counts += game_counts.sum(axis=0)
+            else:
+                for game_id, side in game_sides:
+                    counts += self.game_counts[game_id][TEAM_SIDES.index(side)]
+
+        zone_df = pd.DataFrame(counts, index=pd.Index(SHOT_ZONES, name='zone'), columns=ZONE_STATS)
+        attempts = zone_df['attempts'].replace(0, np.nan)
+        zone_df['fg_pct'] = (zone_df['makes'] / attempts).round(3)
+        zone_df['points_per_shot'] = (zone_df['points'] / attempts).round(2)
+
+        return zone_df
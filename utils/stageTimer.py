@@ -0,0 +1,158 @@
+import argparse
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+# the timer of the script run executing in the current thread, if any
+_active_timer = contextvars.ContextVar('active_stage_timer', default=None)
+_log_lock = threading.Lock()
+
+class StageTimer:
+    '''
+    Records the wall time of each named stage of one script run, with measurements such as row and point counts
+    and cache hits. Stages can be nested. While the timer is active (with timer: ... or activate()), entry points decorated
+    with timed_stage record themselves into it, and work on other threads (e.g. prefetches) is left out.
+    '''
+    def __init__(self, session_id=None):
+        self.session_id = session_id
+        self.run_id = uuid.uuid4().hex
+        self.records = []
+        self.__stack = []
+        self.__token = None
+
+    def __enter__(self):
+        return self.activate()
+
+    def __exit__(self, *exc_info):
+        self.deactivate()
+
+    def activate(self):
+        '''
+        Makes this the timer decorated entry points record into, for the current thread
+        '''
+        self.__token = _active_timer.set(self)
+        return self
+
+    def deactivate(self):
+        if self.__token is not None:
+            _active_timer.reset(self.__token)
+            self.__token = None
+
+    @contextmanager
+    def stage(self, name, **measurements):
+        '''
+        Times the body of the with block as one stage. The yielded record can be updated with measurements
+        '''
+        record = {'stage': name, 'depth': len(self.__stack), 'seconds': None, **measurements}
+        self.records.append(record)
+        self.__stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self.__stack.pop()
+
+    def measure(self, **measurements):
+        '''
+        Adds measurements to the innermost running stage
+        '''
+        if self.__stack:
+            self.__stack[-1].update(measurements)
+
+    def get_summary(self) -> pd.DataFrame:
+        '''
+        Returns the stages in the order they started, nested stages indented under their parent
+        '''
+        summary_df = pd.DataFrame(self.records)
+        if summary_df.empty:
+            return summary_df
+
+        summary_df['stage'] = [' ' * 2 * depth + stage for stage, depth in zip(summary_df['stage'], summary_df['depth'])]
+        summary_df['ms'] = (summary_df['seconds'] * 1000).round(1)
+
+        return summary_df.drop(columns=['depth', 'seconds']).set_index('stage')
+
+    def write_jsonl(self, path):
+        '''
+        Appends one JSON record per stage to path
+        '''
+        timestamp = datetime.now(timezone.utc).isoformat()
+        lines = [
+            json.dumps({'timestamp': timestamp, 'session_id': self.session_id, 'run_id': self.run_id, **record}, default=str)
+            for record in self.records
+        ]
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with _log_lock, open(path, 'a') as f:
+            f.write(''.join(line + '\n' for line in lines))
+
+def get_active_timer():
+    return _active_timer.get()
+
+@contextmanager
+def timed(name, **measurements):
+    '''
+    Times the body of the with block as a stage of the active timer, does nothing without one
+    '''
+    timer = _active_timer.get()
+    if timer is None:
+        yield dict(measurements)
+        return
+
+    with timer.stage(name, **measurements) as record:
+        yield record
+
+def timed_stage(name):
+    '''
+    Decorator recording every call of a function as a stage of the active timer
+    '''
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timed(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+def record_measurements(**measurements):
+    '''
+    Adds measurements to the innermost running stage of the active timer, does nothing without one
+    '''
+    timer = _active_timer.get()
+    if timer is not None:
+        timer.measure(**measurements)
+
+def load_timings(path) -> pd.DataFrame:
+    '''
+    Reads a JSON lines file written by StageTimer.write_jsonl
+    '''
+    return pd.read_json(path, lines=True)
+
+def get_percentiles(timings_df, percentiles=(50, 90, 99)) -> pd.DataFrame:
+    '''
+    Returns the count and the wall time percentiles (in ms) of every stage
+    '''
+    grouped = timings_df.groupby('stage')['seconds']
+    percentiles_df = pd.DataFrame({'count': grouped.count()})
+    for percentile in percentiles:
+        percentiles_df[f'p{percentile}_ms'] = grouped.quantile(percentile / 100) * 1000
+
+    return percentiles_df.round(1).sort_values(f'p{percentiles[-1]}_ms', ascending=False)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarizes stage timings across sessions')
+    parser.add_argument('path', nargs='?', default='.cache/stage_timings.jsonl')
+    args = parser.parse_args()
+
+    print(get_percentiles(load_timings(args.path)).to_string())
@@ -0,0 +1,164 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+import uuid
+
+import pandas as pd
+
+from utils.basketballShot import get_geometry_parameters
+from utils.courtCoordinates import CourtCoordinates
+from utils.shotPaths import ShotPaths
+from utils.stageTimer import record_measurements, timed_stage
+from utils.trajectoryTable import get_trajectory_table
+
+STORE_FORMAT_VERSION = 3
+SHOT_INPUT_COLUMNS = ['COORDINATE_X', 'COORDINATE_Y', 'SEQUENCE_NUMBER', 'TEXT', 'SCORING_PLAY', 'SCORING_TEAM']
+
+def get_geometry_version(court=None, model_parameters=None):
+    '''
+    Returns a short hash of the BasketballShot and CourtCoordinates parameters, and of the store's file format.
+    model_parameters are the parameters of another trajectory model, e.g. PhysicsShotModel.get_parameters()
+    '''
+    court = court if court is not None else CourtCoordinates()
+    parameters = {
+        'store_format': STORE_FORMAT_VERSION,
+        'basketball_shot': get_geometry_parameters(),
+        'court': court.get_dimensions()
+    }
+    if model_parameters is not None:
+        parameters['model'] = model_parameters
+    encoded = json.dumps(parameters, sort_keys=True, default=str).encode()
+
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+class TrajectoryStore:
+    '''
+    Persists each game's computed shot paths (as ShotPaths) to disk as .npz files.
+    Entries are keyed by game_id, a hash of the game's shot rows and the geometry version,
+    so changed shots or a changed geometry are recomputed instead of being read back.
+    With a memory_cache (e.g. a SharedStore), entries read or computed once are served from memory after that.
+    A compute_paths other than the trajectory table should come with its model_parameters, which are part of the key.
+    '''
+    def __init__(self, cache_dir='.cache/trajectories', compute_paths=None, court=None, memory_cache=None, model_parameters=None):
+        self.cache_dir = cache_dir
+        self.memory_cache = memory_cache
+        self.court = court if court is not None else CourtCoordinates()
+        self.compute_paths = compute_paths if compute_paths is not None else self.__compute_table_paths
+        self.geometry_version = get_geometry_version(self.court, model_parameters)
+        self.hits = 0
+        self.misses = 0
+
+    def __compute_table_paths(self, game_shots_df):
+        '''
+        Default path computation, normalized paths from the precomputed trajectory table of the store's court
+        '''
+        return get_trajectory_table(court=self.court).get_paths(game_shots_df, normalized=True)
+
+    @staticmethod
+    def get_shots_hash(game_shots_df):
+        '''
+        Returns a hash of the shot rows that feed the shot paths
+        '''
+        row_hashes = pd.util.hash_pandas_object(game_shots_df[SHOT_INPUT_COLUMNS].astype(str), index=False)
+
+        return hashlib.sha1(row_hashes.to_numpy().tobytes()).hexdigest()[:16]
+
+    def get_path(self, game_id, game_shots_df):
+        '''
+        Returns the file an entry is stored in
+        '''
+        key = f'{self.geometry_version}-{self.get_shots_hash(game_shots_df)}'
+
+        return os.path.join(self.cache_dir, f'{game_id}-{key}.npz')
+
+    def __save(self, path, game_id, shot_paths):
+        '''
+        Writes an entry and removes the game's outdated entries. Safe when several threads or processes save
+        the same game at once: every writer has its own temporary file, and the last one to finish wins
+        '''
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # the temporary files end in .tmp, so the outdated entries glob below never matches another writer's file
+        for outdated_path in glob.glob(os.path.join(self.cache_dir, f'{game_id}-*.npz')):
+            if outdated_path != path:
+                try:
+                    os.remove(outdated_path)
+                except FileNotFoundError:
+                    pass
+
+        # write to a temporary file first so readers never see a partial entry
+        temporary_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(temporary_path, 'wb') as f:
+                shot_paths.save(f)
+            os.replace(temporary_path, path)
+        except OSError:
+            # another writer already put the same entry in place
+            if not os.path.exists(path):
+                raise
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    @timed_stage('trajectory_store')
+    def get_paths(self, game_id, game_shots_df) -> ShotPaths:
+        '''
+        Returns the game's normalized shot paths, from disk when a valid entry exists
+        '''
+        path = self.get_path(game_id, game_shots_df)
+
+        if self.memory_cache is not None:
+            shot_paths = self.memory_cache.get(path)
+            if shot_paths is not None:
+                self.hits += 1
+                record_measurements(cache_hit='memory', rows=len(shot_paths), points=len(shot_paths.coords_df))
+                return shot_paths
+
+        if os.path.exists(path):
+            self.hits += 1
+            shot_paths = ShotPaths.load(path)
+            record_measurements(cache_hit=True, rows=len(shot_paths), points=len(shot_paths.coords_df))
+        else:
+            self.misses += 1
+            shot_paths = self.compute_paths(game_shots_df)
+            self.__save(path, game_id, shot_paths)
+            record_measurements(cache_hit=False, rows=len(shot_paths), points=len(shot_paths.coords_df))
+
+        if self.memory_cache is not None:
+            shot_paths = self.memory_cache.put(path, shot_paths)
+
+        return shot_paths
+
+    def warm(self, data_source, game_ids=None):
+        '''
+        Fills the cache for every game in the schedule, or for the given game ids
+        '''
+        if game_ids is None:
+            game_ids = data_source.get_schedule()['GAME_ID'].tolist()
+
+        start = time.perf_counter()
+        hits, misses = self.hits, self.misses
+        for game_id in game_ids:
+            self.get_paths(game_id, data_source.get_game_shots(game_id))
+
+        return {
+            'games': len(game_ids),
+            'computed': self.misses - misses,
+            'already_cached': self.hits - hits,
+            'seconds': time.perf_counter() - start
+        }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fills the trajectory cache for every game in the schedule')
+    parser.add_argument('--source', choices=['local', 'snowflake'], default='local')
+    parser.add_argument('--connection', help='json file of Snowflake connection parameters, for --source snowflake')
+    parser.add_argument('--cache-dir', default='.cache/trajectories')
+    args = parser.parse_args()
+
+    from utils.dataSource import create_data_source
+
+    source = create_data_source(args.source, connection_file=args.connection)
+    print(TrajectoryStore(cache_dir=args.cache_dir).warm(source))
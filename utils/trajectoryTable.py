@@ -0,0 +1,153 @@
+from functools import lru_cache
+
+import numpy as np
+
+from utils.basketballShot import BasketballShot, NUM_COORDINATES
+from utils.courtCoordinates import CourtCoordinates
+from utils.shotPaths import ShotPaths
+
+class TrajectoryTable:
+    '''
+    Precomputed made-shot trajectories for every integer (COORDINATE_X, COORDINATE_Y) on the canonical half court.
+    Paths are stored as the away team sees them (shooting at the far hoop). A home team path is the same arc
+    rotated 180 degrees around the center of the court, (x, y) -> (50 - x, 94 - y), so one table covers both teams.
+    The paths are solved on court, a CourtCoordinates (a men's ncaa court by default).
+    Coordinates that are not on the integer grid, or that are outside of it, fall back to the exact solver.
+    '''
+    def __init__(self, x_range=(0, 50), y_range=(-4, 47), num_coordinates=NUM_COORDINATES, court=None):
+        self.court = court if court is not None else CourtCoordinates()
+        self.court_length = self.court.court_length
+        self.court_width = self.court.court_width
+        self.x_min, self.x_max = x_range
+        self.y_min, self.y_max = y_range
+        self.num_coordinates = num_coordinates
+        self.paths = None                      # (grid x, grid y, 3, num_coordinates + 1) float32 array of x, y, z paths
+        self.has_path = None                   # (grid x, grid y) bool array, False for shots inside the hoop cylinder
+
+    def build(self):
+        '''
+        Solves every arc on the grid once with the batch solver
+        '''
+        grid_x, grid_y = np.meshgrid(
+            np.arange(self.x_min, self.x_max + 1),
+            np.arange(self.y_min, self.y_max + 1),
+            indexing='ij'
+        )
+        num_shots = grid_x.size
+
+        x, y, z, has_path = BasketballShot.calculate_batch_paths(
+            grid_x.ravel(),
+            grid_y.ravel(),
+            np.ones(num_shots, dtype=bool),
+            np.full(num_shots, 'away'),
+            num_coordinates=self.num_coordinates,
+            court=self.court
+        )
+
+        self.paths = np.stack([x, y, z], axis=1).astype(np.float32).reshape(grid_x.shape + (3, self.num_coordinates + 1))
+        self.has_path = has_path.reshape(grid_x.shape)
+
+        return self
+
+    def save(self, path):
+        '''
+        Stores the table as a compressed .npz file
+        '''
+        np.savez_compressed(
+            path,
+            paths=self.paths,
+            has_path=self.has_path,
+            x_range=np.array([self.x_min, self.x_max]),
+            y_range=np.array([self.y_min, self.y_max])
+        )
+
+    @classmethod
+    def load(cls, path, court=None):
+        '''
+        Loads a table stored with save(), for the court it was built on
+        '''
+        with np.load(path) as stored:
+            paths = stored['paths']
+            table = cls(tuple(stored['x_range']), tuple(stored['y_range']), num_coordinates=paths.shape[-1] - 1, court=court)
+            table.paths = paths
+            table.has_path = stored['has_path']
+
+        return table
+
+    def lookup_paths(self, shot_start_x, shot_start_y, shot_made, team):
+        '''
+        Same contract as BasketballShot.calculate_batch_paths, answered from the table wherever the raw
+        coordinates are on the grid
+        '''
+        shot_start_x = np.asarray(shot_start_x, dtype=float)
+        shot_start_y = np.asarray(shot_start_y, dtype=float)
+        shot_made = np.asarray(shot_made, dtype=bool)
+        team = np.asarray(team)
+
+        on_grid = (
+            (shot_start_x == np.round(shot_start_x)) & (shot_start_y == np.round(shot_start_y)) &
+            (shot_start_x >= self.x_min) & (shot_start_x <= self.x_max) &
+            (shot_start_y >= self.y_min) & (shot_start_y <= self.y_max)
+        )
+
+        num_shots = len(shot_start_x)
+        x = np.empty((num_shots, self.num_coordinates + 1), dtype=np.float32)
+        y = np.empty_like(x)
+        z = np.empty_like(x)
+        has_path = np.empty(num_shots, dtype=bool)
+
+        # table lookup, reflected for the home team
+        grid_i = shot_start_x[on_grid].astype(int) - self.x_min
+        grid_j = shot_start_y[on_grid].astype(int) - self.y_min
+        paths = self.paths[grid_i, grid_j]
+        is_home = (team[on_grid] == 'home')[:, None]
+        x[on_grid] = np.where(is_home, self.court_width - paths[:, 0], paths[:, 0])
+        y[on_grid] = np.where(is_home, self.court_length - paths[:, 1], paths[:, 1])
+        z[on_grid] = paths[:, 2]
+        has_path[on_grid] = self.has_path[grid_i, grid_j] & shot_made[on_grid]
+
+        # missed shots only need the start coordinate, which is the first point of the table path
+        z[on_grid & ~has_path, 0] = 0
+
+        # exact solver for everything else
+        off_grid = ~on_grid
+        if off_grid.any():
+            x[off_grid], y[off_grid], z[off_grid], has_path[off_grid] = BasketballShot.calculate_batch_paths(
+                shot_start_x[off_grid],
+                shot_start_y[off_grid],
+                shot_made[off_grid],
+                team[off_grid],
+                num_coordinates=self.num_coordinates,
+                court=self.court
+            )
+
+        return x, y, z, has_path
+
+    def get_paths(self, shots_df, normalized=False):
+        '''
+        Table backed equivalent of BasketballShot.batch_paths, with float32 coordinates.
+        With normalized=True a ShotPaths is returned instead of a dataframe
+        '''
+        x, y, z, has_path = self.lookup_paths(
+            shots_df['COORDINATE_X'].to_numpy(),
+            shots_df['COORDINATE_Y'].to_numpy(),
+            shots_df['SCORING_PLAY'].to_numpy(),
+            shots_df['SCORING_TEAM'].to_numpy()
+        )
+
+        if normalized:
+            return ShotPaths.from_arrays(shots_df, x, y, z, has_path)
+
+        return BasketballShot.paths_to_frame(shots_df, x, y, z, has_path)
+
+def get_trajectory_table(num_coordinates=NUM_COORDINATES, court=None):
+    '''
+    Returns the process wide trajectory table of a court (a men's ncaa court by default), built on first use
+    '''
+    court = court if court is not None else CourtCoordinates()
+
+    return _get_trajectory_table(num_coordinates, court.get_dimensions_key())
+
+@lru_cache(maxsize=None)
+def _get_trajectory_table(num_coordinates, dimensions_key):
+    return TrajectoryTable(num_coordinates=num_coordinates, court=CourtCoordinates(dict(dimensions_key))).build()
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pandas as pd
+
+class WarmUp:
+    '''
+    Runs named loading steps one after the other in a background thread, e.g. when a server process starts,
+    so its first sessions find the schedule, the court and the most recent games already cached instead of
+    waiting on them. steps is a list of (name, callable) pairs. The time and error of every step are kept,
+    and a failing step does not stop the steps after it.
+    '''
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.results = []
+        self.__thread = None
+        self.__done = threading.Event()
+
+    def start(self):
+        '''
+        Starts the steps in a daemon thread, once
+        '''
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__run, name='warm_up', daemon=True)
+            self.__thread.start()
+
+        return self
+
+    def __run(self):
+        for name, step in self.steps:
+            start = time.perf_counter()
+            try:
+                step()
+                error = None
+            except Exception as e:
+                error = repr(e)
+            self.results.append({'step': name, 'seconds': time.perf_counter() - start, 'error': error})
+
+        self.__done.set()
+
+    def is_done(self):
+        return self.__done.is_set()
+
+    def wait(self, timeout=None):
+        '''
+        Blocks until every step has run or timeout seconds have passed, returns whether every step has run
+        '''
+        return self.__done.wait(timeout)
+
+    def get_stats(self) -> pd.DataFrame:
+        '''
+        Returns the steps that have run, with their time in ms and error if any
+        '''
+        stats_df = pd.DataFrame(list(self.results), columns=['step', 'seconds', 'error'])
+        stats_df['ms'] = (stats_df['seconds'] * 1000).round(1)
+
+        return stats_df.drop(columns='seconds')